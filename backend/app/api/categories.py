@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
 from app.database import get_db
 from app.schemas import CategoryInfo
-from app.cache import cache_get, cache_set
+from app.cache import cached_response
 from app.config import get_settings
 
 router = APIRouter(prefix="/api/categories", tags=["categories"])
@@ -64,15 +64,24 @@ def map_category(raw_category: str) -> str:
 
 @router.get("", response_model=list[CategoryInfo])
 async def get_categories(
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ):
     """Returns categories with market counts and featured markets."""
-    # Check cache
-    cache_key = "polynews:categories"
-    cached = await cache_get(cache_key)
-    if cached:
-        return [CategoryInfo(**c) for c in cached]
+    async def compute():
+        return await _fetch_categories(db)
 
+    return await cached_response(
+        request,
+        "polynews:categories",
+        compute,
+        ttl=settings.CATEGORY_CACHE_TTL,
+        type_=list[CategoryInfo],
+    )
+
+
+async def _fetch_categories(db: AsyncSession) -> list[CategoryInfo]:
+    """Count active markets and pick featured markets for every category."""
     categories = []
     for cat in CATEGORIES:
         # Count markets in category
@@ -87,12 +96,7 @@ async def get_categories(
         featured_query = text("""
             SELECT m.id
             FROM markets m
-            LEFT JOIN (
-                SELECT DISTINCT ON (market_id)
-                    market_id, volume, timestamp
-                FROM snapshots
-                ORDER BY market_id, timestamp DESC
-            ) s ON m.id = s.market_id
+            LEFT JOIN market_latest s ON m.id = s.market_id
             WHERE m.category = :category
                 AND m.status = 'active'
             ORDER BY COALESCE(s.volume, 0) DESC
@@ -108,11 +112,4 @@ async def get_categories(
             featured_market_ids=featured_ids,
         ))
 
-    # Cache for 1 hour
-    await cache_set(
-        cache_key,
-        [c.model_dump() for c in categories],
-        ttl=settings.CATEGORY_CACHE_TTL,
-    )
-
     return categories
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+import base64
+import json
+
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from typing import Optional
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
 
 from app.database import get_db
 from app.schemas import MarketCard, MarketDetail, FeedResponse, PricePoint
-from app.cache import cache_get, cache_set
+from app.cache import cached_response
 from app.config import get_settings
-from app.scoring import calculate_interesting_score
+from app.scoring import interesting_scores
+from app.summaries import build_market_summary
 
 router = APIRouter(prefix="/api/markets", tags=["markets"])
 settings = get_settings()
@@ -17,17 +23,51 @@ VALID_CATEGORIES = {"politics", "crypto", "sports", "tech", "other"}
 VALID_SORTS = {"trending", "interesting"}
 VALID_STATUSES = {"active", "resolved", "recently_resolved"}
 
+# Keyset sort keys per ordering: (SQL expression, Postgres type), all DESC,
+# with market_id as the final tiebreaker.
+SORT_KEYS = {
+    "trending": (("t.delta", "NUMERIC"), ("t.volume", "NUMERIC")),
+    "interesting": (("t.volume", "NUMERIC"), ("t.delta", "NUMERIC")),
+    # COALESCE to -infinity == resolution_date DESC NULLS LAST
+    "resolved": (
+        ("t.activity_at", "TIMESTAMPTZ"),
+        ("COALESCE(t.resolution_date, '-infinity'::timestamptz)", "TIMESTAMPTZ"),
+    ),
+}
+
+# Price history range -> (lookback, source). Raw snapshots cover the short
+# ranges; longer ranges read the hourly/daily rollup tiers.
+HISTORY_RANGES = {
+    "24h": (timedelta(days=1), "raw"),
+    "7d": (timedelta(days=7), "raw"),
+    "30d": (timedelta(days=30), "hourly"),
+    "90d": (timedelta(days=90), "hourly"),
+    "1y": (timedelta(days=365), "daily"),
+    "all": (None, "daily"),
+}
+
+HISTORY_TABLES = {
+    "hourly": "snapshot_rollups_hourly",
+    "daily": "snapshot_rollups_daily",
+}
+
 
 @router.get("", response_model=FeedResponse)
 async def get_markets(
+    request: Request,
     category: Optional[str] = Query(None, description="Filter by category"),
     sort: str = Query("interesting", description="Sort order: trending or interesting"),
     status: str = Query("active", description="Market status: active, resolved, recently_resolved"),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from a previous page; overrides offset"),
     db: AsyncSession = Depends(get_db),
 ):
-    """Returns paginated feed of markets with latest snapshot data."""
+    """Returns paginated feed of markets with latest snapshot data.
+
+    Pages can be walked with limit/offset or, at constant cost per page, by
+    passing back each response's next_cursor.
+    """
     # Validate params
     if category and category not in VALID_CATEGORIES:
         raise HTTPException(status_code=400, detail=f"Invalid category. Must be one of: {', '.join(VALID_CATEGORIES)}")
@@ -36,53 +76,54 @@ async def get_markets(
     if status not in VALID_STATUSES:
         raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}")
 
-    # Check cache
-    cache_key = f"polynews:feed:{category or 'all'}:{sort}:{status}:{limit}:{offset}"
-    cached = await cache_get(cache_key)
-    if cached:
-        return FeedResponse(**cached)
+    ordering = sort if status == "active" else "resolved"
+    cursor_values = _decode_cursor(cursor, ordering) if cursor else None
+
+    page_key = f"c:{cursor}" if cursor else offset
+    cache_key = f"polynews:feed:{category or 'all'}:{sort}:{status}:{limit}:{page_key}"
 
-    status_filter = "m.status = 'active'"
+    async def compute():
+        return await _fetch_markets_page(db, category, sort, status, limit, offset, cursor_values)
+
+    return await cached_response(request, cache_key, compute, ttl=settings.FEED_CACHE_TTL, type_=FeedResponse)
+
+
+async def _fetch_markets_page(
+    db: AsyncSession,
+    category: Optional[str],
+    sort: str,
+    status: str,
+    limit: int,
+    offset: int,
+    cursor_values: Optional[list[str]],
+) -> FeedResponse:
+    """Query one page of the market feed from trending_view."""
+    ordering = sort if status == "active" else "resolved"
+    sort_keys = SORT_KEYS[ordering]
+
+    status_filter = "t.status = 'active'"
     if status == "resolved":
-        status_filter = "m.status = 'resolved'"
+        status_filter = "t.status = 'resolved'"
     elif status == "recently_resolved":
-        status_filter = (
-            "m.status = 'resolved' AND COALESCE(m.closed_time, m.last_updated) >= NOW() - INTERVAL '24 hours'"
+        status_filter = "t.status = 'resolved' AND t.activity_at >= NOW() - INTERVAL '24 hours'"
+
+    order_clause = ", ".join(f"{expr} DESC" for expr, _ in sort_keys) + ", t.market_id DESC"
+
+    # Keyset predicate: rows strictly after the cursor in sort order
+    cursor_filter = ""
+    if cursor_values is not None:
+        key_exprs = ", ".join(expr for expr, _ in sort_keys)
+        key_params = ", ".join(
+            f"CAST(CAST(:k{i} AS TEXT) AS {pg_type})" for i, (_, pg_type) in enumerate(sort_keys)
         )
+        cursor_filter = f"AND ({key_exprs}, t.market_id) < ({key_params}, CAST(:cursor_id AS TEXT))"
 
-    order_clause = "delta DESC, volume DESC" if sort == "trending" else "volume DESC, delta DESC"
-    if status != "active":
-        order_clause = "COALESCE(m.closed_time, m.last_updated) DESC, m.resolution_date DESC NULLS LAST"
+    sort_key_columns = ", ".join(
+        f"CAST({expr} AS TEXT) AS sort_key_{i}" for i, (expr, _) in enumerate(sort_keys)
+    )
 
-    # Build query
+    # Build query against the precomputed ranking surface (refreshed each ingest)
     query = text("""
-        WITH latest_snap AS (
-            SELECT DISTINCT ON (s.market_id)
-                s.market_id,
-                s.yes_price AS current_price,
-                s.no_price,
-                s.volume,
-                s.open_interest,
-                s.timestamp
-            FROM snapshots s
-            ORDER BY s.market_id, s.timestamp DESC
-        ),
-        day_ago_snap AS (
-            SELECT DISTINCT ON (s.market_id)
-                s.market_id,
-                s.yes_price AS price_24h_ago
-            FROM snapshots s
-            WHERE s.timestamp <= NOW() - INTERVAL '24 hours'
-            ORDER BY s.market_id, s.timestamp DESC
-        ),
-        vol_ranks AS (
-            SELECT
-                market_id,
-                RANK() OVER (ORDER BY SUM(volume) DESC) AS volume_rank
-            FROM snapshots
-            WHERE timestamp >= NOW() - INTERVAL '24 hours'
-            GROUP BY market_id
-        )
         SELECT
             m.id,
             m.question,
@@ -92,45 +133,62 @@ async def get_markets(
             m.is_featured,
             m.image_url,
             m.slug,
-            COALESCE(ls.current_price, 0.5) AS current_price,
-            d.price_24h_ago,
-            ABS(COALESCE(ls.current_price, 0.5) - COALESCE(d.price_24h_ago, ls.current_price, 0.5)) AS delta,
-            COALESCE(ls.volume, 0) AS volume,
-            COALESCE(vr.volume_rank, 9999) AS volume_rank
-        FROM markets m
-        LEFT JOIN latest_snap ls ON m.id = ls.market_id
-        LEFT JOIN day_ago_snap d ON m.id = d.market_id
-        LEFT JOIN vol_ranks vr ON m.id = vr.market_id
+            t.current_price,
+            t.price_24h_ago,
+            t.delta,
+            t.volume,
+            t.volume_rank,
+            {sort_key_columns}
+        FROM trending_view t
+        JOIN markets m ON m.id = t.market_id
         WHERE {status_filter}
         {category_filter}
+        {cursor_filter}
         ORDER BY {order_clause}
         LIMIT :limit OFFSET :offset
     """.format(
+        sort_key_columns=sort_key_columns,
         status_filter=status_filter,
-        category_filter="AND m.category = :category" if category else "",
+        category_filter="AND t.category = :category" if category else "",
+        cursor_filter=cursor_filter,
         order_clause=order_clause,
     ))
 
     # Count query
     count_query = text("""
-        SELECT COUNT(*) FROM markets m
+        SELECT COUNT(*) FROM trending_view t
         WHERE {status_filter}
         {category_filter}
     """.format(
         status_filter=status_filter,
-        category_filter="AND m.category = :category" if category else "",
+        category_filter="AND t.category = :category" if category else "",
     ))
 
-    params = {"limit": limit, "offset": offset}
+    # One extra row tells whether another page follows.
+    params = {"limit": limit + 1, "offset": 0 if cursor_values is not None else offset}
     if category:
         params["category"] = category
+    if cursor_values is not None:
+        params.update({f"k{i}": value for i, value in enumerate(cursor_values[:-1])})
+        params["cursor_id"] = cursor_values[-1]
 
     result = await db.execute(query, params)
     rows = result.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
     count_result = await db.execute(count_query, {"category": category} if category else {})
     total = count_result.scalar() or 0
 
+    # Cursor for the page after this one, taken before any in-page re-sort
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = _encode_cursor(
+            ordering,
+            [getattr(last, f"sort_key_{i}") for i in range(len(sort_keys))] + [last.id],
+        )
+
     markets = []
     for row in rows:
         card = MarketCard(
@@ -147,49 +205,77 @@ async def get_markets(
             image_url=row.image_url,
             slug=row.slug,
         )
-
-        # Calculate interesting score for sorting only on active feed.
-        if sort == "interesting" and status == "active":
-            card._interesting_score = calculate_interesting_score(
-                delta=float(row.delta) if row.delta else 0,
-                volume=float(row.volume),
-                volume_rank=int(row.volume_rank),
-                resolution_date=row.resolution_date,
-                current_price=float(row.current_price),
-                total_markets=total,
-            )
-
         markets.append(card)
 
-    # Sort by interesting score if applicable
-    if sort == "interesting" and status == "active":
-        markets.sort(key=lambda m: getattr(m, "_interesting_score", 0), reverse=True)
+    # Re-sort the page by interesting score, only on the active feed.
+    if sort == "interesting" and status == "active" and rows:
+        scores = interesting_scores(
+            delta=[float(row.delta) if row.delta else 0.0 for row in rows],
+            volume_rank=[int(row.volume_rank) for row in rows],
+            resolution_ts=[
+                row.resolution_date.timestamp() if row.resolution_date else np.nan
+                for row in rows
+            ],
+            current_price=[float(row.current_price) for row in rows],
+            total_markets=total,
+        )
+        markets = [markets[i] for i in np.argsort(-scores, kind="stable")]
 
-    response = FeedResponse(
+    return FeedResponse(
         markets=markets,
         total=total,
         limit=limit,
         offset=offset,
+        next_cursor=next_cursor,
     )
 
-    # Cache the response
-    await cache_set(cache_key, response.model_dump(), ttl=settings.FEED_CACHE_TTL)
 
-    return response
+def _encode_cursor(ordering: str, values: list[str]) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor."""
+    payload = json.dumps({"o": ordering, "k": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, ordering: str) -> list[str]:
+    """Decode a cursor, rejecting ones issued for a different ordering."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["k"]
+        valid = (
+            payload["o"] == ordering
+            and isinstance(values, list)
+            and len(values) == len(SORT_KEYS[ordering]) + 1
+            and all(isinstance(v, str) for v in values)
+        )
+    except (ValueError, TypeError, KeyError):
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
 
 
 @router.get("/{market_id}", response_model=MarketDetail)
 async def get_market_detail(
+    request: Request,
     market_id: str,
+    history_range: str = Query("7d", alias="range", description="Price history range: 24h, 7d, 30d, 90d, 1y, all"),
     db: AsyncSession = Depends(get_db),
 ):
-    """Returns single market detail with 7-day price history."""
-    # Check cache
-    cache_key = f"polynews:market:{market_id}"
-    cached = await cache_get(cache_key)
-    if cached:
-        return MarketDetail(**cached)
+    """Returns single market detail with price history for the requested range."""
+    if history_range not in HISTORY_RANGES:
+        raise HTTPException(status_code=400, detail=f"Invalid range. Must be one of: {', '.join(HISTORY_RANGES)}")
+
+    cache_key = f"polynews:market:{market_id}:{history_range}"
+
+    async def compute():
+        return await _fetch_market_detail(db, market_id, history_range)
+
+    return await cached_response(request, cache_key, compute, ttl=settings.MARKET_CACHE_TTL, type_=MarketDetail)
+
 
+async def _fetch_market_detail(db: AsyncSession, market_id: str, history_range: str) -> MarketDetail:
+    """Load one market with its latest values, baselines and price history."""
     # Get market info
     market_query = text("""
         SELECT
@@ -205,48 +291,73 @@ async def get_market_detail(
     if not market:
         raise HTTPException(status_code=404, detail="Market not found")
 
-    # Get latest snapshot
+    # Get latest values
     latest_query = text("""
         SELECT yes_price, no_price, volume, open_interest, timestamp
-        FROM snapshots
+        FROM market_latest
         WHERE market_id = :market_id
-        ORDER BY timestamp DESC
-        LIMIT 1
     """)
     latest_result = await db.execute(latest_query, {"market_id": market_id})
     latest = latest_result.fetchone()
 
-    # Get 24h ago snapshot
-    day_ago_query = text("""
-        SELECT yes_price
-        FROM snapshots
+    # Get 24h / 7d ago baselines
+    baseline_query = text("""
+        SELECT price_24h_ago, price_7d_ago
+        FROM market_baselines
         WHERE market_id = :market_id
-            AND timestamp <= NOW() - INTERVAL '24 hours'
-        ORDER BY timestamp DESC
-        LIMIT 1
     """)
-    day_ago_result = await db.execute(day_ago_query, {"market_id": market_id})
-    day_ago = day_ago_result.fetchone()
-
-    # Get 7-day price history
-    history_query = text("""
-        SELECT timestamp, yes_price AS price
-        FROM snapshots
-        WHERE market_id = :market_id
-            AND timestamp >= NOW() - INTERVAL '7 days'
-        ORDER BY timestamp ASC
-    """)
-    history_result = await db.execute(history_query, {"market_id": market_id})
+    baseline_result = await db.execute(baseline_query, {"market_id": market_id})
+    baseline = baseline_result.fetchone()
+
+    # Get price history from the tier matching the range
+    lookback, source = HISTORY_RANGES[history_range]
+    if source == "raw":
+        history_query = text("""
+            SELECT timestamp, yes_price AS price
+            FROM snapshots
+            WHERE market_id = :market_id
+                AND timestamp >= :since
+            ORDER BY timestamp ASC
+        """)
+    else:
+        window_clause = "AND bucket >= :since" if lookback else ""
+        history_query = text(f"""
+            SELECT bucket AS timestamp, close_price AS price
+            FROM {HISTORY_TABLES[source]}
+            WHERE market_id = :market_id
+                {window_clause}
+            ORDER BY bucket ASC
+        """)
+    since = datetime.now(timezone.utc) - lookback if lookback else None
+    history_result = await db.execute(
+        history_query, {"market_id": market_id, "since": since}
+    )
     history_rows = history_result.fetchall()
 
     current_price = float(latest.yes_price) if latest else 0.5
-    price_24h_ago = float(day_ago.yes_price) if day_ago else None
+    price_24h_ago = (
+        float(baseline.price_24h_ago)
+        if baseline and baseline.price_24h_ago is not None
+        else None
+    )
+    price_7d_ago = (
+        float(baseline.price_7d_ago)
+        if baseline and baseline.price_7d_ago is not None
+        else None
+    )
     delta = abs(current_price - price_24h_ago) if price_24h_ago is not None else None
+    volume = float(latest.volume) if latest else 0
+    open_interest = float(latest.open_interest) if latest else 0
 
     price_history = [
         PricePoint(timestamp=row.timestamp, price=float(row.price))
         for row in history_rows
     ]
+    # Rollups end at the last complete bucket; close the chart at the live value.
+    if source != "raw" and latest and (
+        not price_history or price_history[-1].timestamp < latest.timestamp
+    ):
+        price_history.append(PricePoint(timestamp=latest.timestamp, price=current_price))
 
     detail = MarketDetail(
         id=market.id,
@@ -255,9 +366,18 @@ async def get_market_detail(
         category=market.category,
         current_price=current_price,
         price_24h_ago=price_24h_ago,
+        price_7d_ago=price_7d_ago,
         delta=delta,
-        volume=float(latest.volume) if latest else 0,
-        open_interest=float(latest.open_interest) if latest else 0,
+        volume=volume,
+        open_interest=open_interest,
+        summary=build_market_summary(
+            current_price=current_price,
+            price_24h_ago=price_24h_ago,
+            price_7d_ago=price_7d_ago,
+            volume=volume,
+            open_interest=open_interest,
+            resolution_date=market.resolution_date,
+        ),
         resolution_date=market.resolution_date,
         created_at=market.created_at,
         status=market.status,
@@ -269,7 +389,4 @@ async def get_market_detail(
         price_history=price_history,
     )
 
-    # Cache
-    await cache_set(cache_key, detail.model_dump(), ttl=settings.MARKET_CACHE_TTL)
-
     return detail
@@ -1,7 +1,18 @@
+import asyncio
+import hashlib
 import json
 import logging
+import random
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+import orjson
 import redis.asyncio as aioredis
-from typing import Optional, Any
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from typing import Awaitable, Callable, Optional, Any
 from app.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -41,16 +52,353 @@ async def cache_delete(key: str) -> None:
         logger.exception("Cache delete failure for key: %s", key)
 
 
-async def cache_delete_pattern(pattern: str) -> None:
-    """Delete all keys matching pattern."""
+# Every cached response key embeds the current generation. Ingestion bumps
+# it once per run, which invalidates all cached responses in O(1); entries
+# from older generations age out by TTL.
+GENERATION_KEY = "polynews:gen"
+
+# Ingestion publishes each new generation here so API workers switch at once.
+INVALIDATION_CHANNEL = "polynews:cache:invalidate"
+
+_generation = 0
+_generation_checked_at = float("-inf")
+
+
+def versioned_key(key: str, generation: int) -> str:
+    return f"{key}:g{generation}"
+
+
+def _set_generation(generation: int) -> None:
+    global _generation, _generation_checked_at
+    _generation = generation
+    _generation_checked_at = time.monotonic()
+
+
+async def current_generation() -> int:
+    """Return the cache generation, re-reading Redis if pub/sub may have lagged."""
+    if time.monotonic() - _generation_checked_at >= settings.CACHE_GENERATION_REFRESH:
+        try:
+            _set_generation(int(await redis_client.get(GENERATION_KEY) or 0))
+        except Exception:
+            logger.exception("Failed to read cache generation")
+    return _generation
+
+
+# Generations are reserved from a separate counter, so concurrent ingestion
+# runs never build under the same number, and only switched to if newer than
+# the current one, so polynews:gen never moves backwards.
+GENERATION_RESERVED_KEY = "polynews:gen:reserved"
+
+# KEYS[1] = generation, KEYS[2] = reservation counter
+_RESERVE_GENERATION_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local reserved = tonumber(redis.call('GET', KEYS[2]) or '0')
+local generation = math.max(current, reserved) + 1
+redis.call('SET', KEYS[2], generation)
+return generation
+"""
+
+# KEYS[1] = generation, KEYS[2..] = entry keys
+# ARGV[1] = new generation, ARGV[2] = entry ttl, ARGV[3..] = entry payloads
+# Returns the generation in effect afterwards.
+_ADVANCE_GENERATION_SCRIPT = """
+local generation = tonumber(ARGV[1])
+for i = 2, #KEYS do
+    redis.call('SET', KEYS[i], ARGV[i + 1], 'EX', ARGV[2])
+end
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if generation > current then
+    redis.call('SET', KEYS[1], generation)
+    return generation
+end
+return current
+"""
+
+
+def reserve_generation(rds) -> int:
+    """Reserve a generation number no other run will build under (sync client)."""
+    return int(rds.eval(_RESERVE_GENERATION_SCRIPT, 2, GENERATION_KEY, GENERATION_RESERVED_KEY))
+
+
+def advance_generation(rds, generation: int, entries: Optional[dict] = None, ttl: int = 0) -> int:
+    """
+    Write ``entries`` and switch to ``generation`` if it is newer (sync client).
+
+    Both happen in one script, so readers move to the new generation with its
+    entries already in place. Returns the generation in effect afterwards.
+    """
+    entries = entries or {}
+    return int(rds.eval(
+        _ADVANCE_GENERATION_SCRIPT,
+        1 + len(entries),
+        GENERATION_KEY,
+        *entries.keys(),
+        generation,
+        ttl,
+        *entries.values(),
+    ))
+
+
+# Compare-and-delete so a lock is only released by the worker holding it.
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class LocalCache:
+    """In-process LRU of serialized responses, bounded by entries and bytes.
+
+    Sits in front of Redis in each API worker. Entries are only held while
+    fresh, and keys carry the cache generation, so a new generation makes
+    old entries unreachable until LRU evicts them. Stale-while-revalidate is
+    left to the Redis tier. Used from the
+    event loop thread only, so no locking.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: OrderedDict[str, tuple[Any, int, float]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, _, fresh_until = entry
+        if time.monotonic() >= fresh_until:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, size: int, fresh_for: float) -> None:
+        if fresh_for <= 0 or size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (value, size, time.monotonic() + fresh_for)
+        self.total_bytes += size
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+
+local_cache = LocalCache(
+    max_entries=settings.CACHE_L1_MAX_ENTRIES,
+    max_bytes=settings.CACHE_L1_MAX_BYTES,
+)
+
+# Cached responses are stored as raw bytes: "<etag>\n<json body>".
+_entry_client = aioredis.from_url(settings.REDIS_URL)
+
+# Recomputes in flight in this process, keyed by cache key.
+_inflight: dict[str, asyncio.Future] = {}
+
+
+@dataclass(frozen=True, slots=True)
+class CachedBody:
+    """A JSON response body serialized once, with its content hash."""
+
+    body: bytes
+    etag: str
+
+
+@lru_cache(maxsize=None)
+def _adapter(type_) -> TypeAdapter:
+    return TypeAdapter(type_)
+
+
+def serialize_body(value: Any, type_: Any) -> CachedBody:
+    """Serialize a response value with orjson and hash it for the ETag."""
+    body = orjson.dumps(_adapter(type_).dump_python(value, mode="json"))
+    return CachedBody(body=body, etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+
+def encode_entry(cached_body: CachedBody) -> bytes:
+    return cached_body.etag.encode() + b"\n" + cached_body.body
+
+
+def decode_entry(raw: bytes) -> Optional[CachedBody]:
+    """Parse a stored entry; anything in an older format counts as a miss."""
+    etag, sep, body = raw.partition(b"\n")
+    if not sep or not etag.startswith(b'"'):
+        return None
+    return CachedBody(body=body, etag=etag.decode())
+
+
+def jittered_ttl(ttl: int) -> int:
+    """Spread expiries so keys written together do not expire together."""
+    return ttl + int(random.uniform(0, ttl * settings.CACHE_TTL_JITTER))
+
+
+async def cached_response(
+    request: Request,
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    ttl: int,
+    type_: Any,
+) -> Response:
+    """Serve a cached JSON body with an ETag, or 304 if the client has it."""
+    cached_body = await cached(key, compute, ttl=ttl, type_=type_)
+    headers = {"ETag": cached_body.etag}
+    if_none_match = request.headers.get("if-none-match", "")
+    if cached_body.etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached_body.body, media_type="application/json", headers=headers)
+
+
+async def cached(
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    ttl: int,
+    type_: Any,
+    stale_ttl: int = settings.CACHE_STALE_TTL,
+) -> CachedBody:
+    """
+    Return the serialized ``type_`` value for key, recomputing it at most once at a time.
+
+    ``key`` is qualified with the current cache generation. Fresh bodies are
+    served from the in-process LocalCache, then from Redis. Redis entries are
+    stored for a jittered ``ttl`` plus a ``stale_ttl`` soft-expiry window.
+    Within that window, or when only the previous generation's entry exists,
+    the stale body is returned immediately while a single request (per key,
+    across processes via a Redis lock) recomputes it. On a cold miss,
+    concurrent requests wait for that one recompute instead of running their own.
+    """
+    generation = await current_generation()
+    previous_key = versioned_key(key, generation - 1)
+    key = versioned_key(key, generation)
+
+    value = local_cache.get(key)
+    if value is not None:
+        return value
+
+    stale = None
     try:
-        keys = []
-        async for key in redis_client.scan_iter(match=pattern):
-            keys.append(key)
-        if keys:
-            await redis_client.delete(*keys)
+        pipe = _entry_client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.ttl(key)
+        pipe.get(previous_key)
+        raw, remaining, previous = await pipe.execute()
+        stale = decode_entry(raw) if raw else None
+        # remaining == -1: no expiry set, always fresh
+        if stale is not None and (remaining < 0 or remaining > stale_ttl):
+            fresh_for = ttl if remaining < 0 else remaining - stale_ttl
+            local_cache.set(key, stale, size=len(raw), fresh_for=fresh_for)
+            return stale
+        if stale is None and previous:
+            stale = decode_entry(previous)
     except Exception:
-        logger.exception("Cache pattern delete failure for pattern: %s", pattern)
+        logger.exception("Cache read failure for key: %s", key)
+
+    inflight = _inflight.get(key)
+    if inflight is not None:
+        if stale is not None:
+            return stale
+        return await asyncio.shield(inflight)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        value = await _compute_single_flight(key, compute, ttl, stale_ttl, type_, stale)
+    except BaseException as exc:
+        future.set_exception(exc)
+        future.exception()  # waiters re-raise it; don't warn if there are none
+        raise
+    else:
+        future.set_result(value)
+        return value
+    finally:
+        _inflight.pop(key, None)
+
+
+async def _compute_single_flight(key, compute, ttl, stale_ttl, type_, stale):
+    """Recompute under a Redis lock, or reuse the lock holder's result."""
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    try:
+        locked = bool(
+            await _entry_client.set(lock_key, token, nx=True, ex=settings.CACHE_LOCK_TIMEOUT)
+        )
+    except Exception:
+        logger.exception("Cache lock failure for key: %s", key)
+        locked = False
+        contended = False  # Redis unavailable: compute without a lock
+    else:
+        contended = not locked
+
+    if contended:
+        if stale is not None:
+            return stale
+        # Another process is recomputing; wait for its result.
+        deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            try:
+                raw = await _entry_client.get(key)
+            except Exception:
+                break
+            value = decode_entry(raw) if raw else None
+            if value is not None:
+                return value
+        logger.warning("Timed out waiting for cache recompute of %s", key)
+
+    try:
+        value = serialize_body(await compute(), type_)
+        fresh_for = jittered_ttl(ttl)
+        entry = encode_entry(value)
+        try:
+            await _entry_client.set(key, entry, ex=fresh_for + stale_ttl)
+        except Exception:
+            logger.exception("Cache write failure for key: %s", key)
+        local_cache.set(key, value, size=len(entry), fresh_for=fresh_for)
+        return value
+    finally:
+        if locked:
+            try:
+                await _entry_client.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+            except Exception:
+                logger.exception("Cache lock release failure for key: %s", key)
+
+
+async def close_clients() -> None:
+    """Close the Redis clients used by the API process."""
+    await redis_client.close()
+    await _entry_client.close()
+
+
+async def listen_for_invalidations() -> None:
+    """Follow cache generations published by ingestion.
+
+    Runs for the lifetime of the app. Entries keyed by an older generation
+    simply stop being read, locally and in Redis. If the subscription drops,
+    it resubscribes; current_generation() polls Redis in the meantime.
+    """
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            _set_generation(int(await redis_client.get(GENERATION_KEY) or 0))
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    _set_generation(int(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Cache invalidation subscription failed, resubscribing")
+            await asyncio.sleep(1)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
 
 
 async def get_last_ingestion_time() -> Optional[str]:
@@ -1,5 +1,6 @@
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_init, worker_process_shutdown
 from app.config import get_settings
 
 settings = get_settings()
@@ -27,9 +28,27 @@ celery_app.conf.beat_schedule = {
         "task": "polynews.ingest_markets",
         "schedule": settings.INGESTION_INTERVAL,  # 120 seconds = 2 minutes
     },
+    "rollup-snapshots": {
+        "task": "polynews.rollup_snapshots",
+        "schedule": settings.ROLLUP_INTERVAL,  # 3600 seconds = 1 hour
+    },
 }
 
 
+@worker_process_init.connect
+def init_worker_connections(**kwargs):
+    """Open pooled DB, Redis and HTTP connections once per worker process."""
+    from app.ingestion.resources import init_resources
+    init_resources()
+
+
+@worker_process_shutdown.connect
+def close_worker_connections(**kwargs):
+    """Close the worker's pooled connections on shutdown."""
+    from app.ingestion.resources import close_resources
+    close_resources()
+
+
 @celery_app.task(name="polynews.ingest_markets", bind=True, max_retries=3)
 def ingest_markets(self):
     """Celery task wrapper for market ingestion."""
@@ -39,3 +58,34 @@ def ingest_markets(self):
     except Exception as exc:
         # Exponential backoff: 60s, 180s, 540s
         raise self.retry(exc=exc, countdown=60 * (3 ** self.request.retries))
+
+
+@celery_app.task(name="polynews.rollup_snapshots", bind=True, max_retries=3)
+def rollup_snapshots(self):
+    """Celery task wrapper for snapshot rollups and retention."""
+    try:
+        from app.ingestion.tasks import rollup_snapshots_task
+        rollup_snapshots_task()
+    except Exception as exc:
+        raise self.retry(exc=exc, countdown=300)
+
+
+@celery_app.task(name="polynews.backfill_snapshots", bind=True, max_retries=3)
+def backfill_snapshots(
+    self, source, path=None, market_ids=None, start=None, end=None, name=None, restart=False
+):
+    """Celery task wrapper for historical snapshot backfills (resumes on retry)."""
+    try:
+        from app.ingestion.backfill import backfill_snapshots_task
+        return backfill_snapshots_task(
+            source,
+            path=path,
+            market_ids=market_ids,
+            start=start,
+            end=end,
+            name=name,
+            # Only the first attempt discards the checkpoint; retries resume.
+            restart=restart and self.request.retries == 0,
+        )
+    except Exception as exc:
+        raise self.retry(exc=exc, countdown=60)
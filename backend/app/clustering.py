@@ -1,11 +1,28 @@
-"""Market clustering: group related markets (e.g. Bitcoin price thresholds)."""
+"""Market clustering: group related markets (e.g. Bitcoin price thresholds).
+
+Two kinds of cluster are computed at ingest time (see
+``app.ingestion.clusters``) and stored in ``market_clusters`` /
+``cluster_markets``; the feed only groups its rows by the stored cluster.
+
+- threshold: questions identical up to a ``$`` threshold and date.
+- related: near-duplicate questions/descriptions, found with MinHash
+  signatures and locality-sensitive hashing in near-linear time.
+"""
 
 import re
 import logging
-from collections import defaultdict
+import zlib
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Clusters need at least this many markets, both stored and per feed.
+MIN_CLUSTER_SIZE = 3
+
 # Patterns for extracting threshold values from market questions
 THRESHOLD_PATTERNS = [
     # "Will the price of Bitcoin be above $60,000 on February 13?"
@@ -26,93 +43,111 @@ THRESHOLD_PATTERNS = [
 ]
 
 
+# Questions without one of these words cannot match a threshold pattern.
+THRESHOLD_KEYWORDS = ("above", "exceed")
+
+_WILL_PREFIX = re.compile(r'^will\s+')
+
+# One pass over the key: threshold values, dates and whitespace runs.
+_KEY_TOKENS = re.compile(
+    r'(\$[\d,]+(?:\.\d+)?)'
+    r'|((?:january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2})'
+    r'|(\s+)',
+    re.IGNORECASE,
+)
+_KEY_REPLACEMENTS = (None, 'THRESHOLD', 'DATE', ' ')
+
+# Questions rarely change, so keys are memoized across ingestion runs.
+CLUSTER_KEY_CACHE_SIZE = 16384
+
+
 def _normalize_title(title: str) -> str:
     """Normalize a market title for clustering comparison."""
-    t = title.lower().strip()
-    # Remove "will " prefix
-    t = re.sub(r'^will\s+', '', t)
-    # Remove question mark
+    t = _WILL_PREFIX.sub('', title.lower().strip())
     t = t.rstrip('?').strip()
-    # Replace threshold values with THRESHOLD
-    t = re.sub(r'\$[\d,]+(?:\.\d+)?', 'THRESHOLD', t)
-    # Normalize dates to generic
-    t = re.sub(
-        r'(?:january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2}',
-        'DATE',
-        t,
-        flags=re.IGNORECASE,
-    )
-    # Remove extra whitespace
-    t = re.sub(r'\s+', ' ', t).strip()
-    return t
+    return _KEY_TOKENS.sub(lambda m: _KEY_REPLACEMENTS[m.lastindex], t).strip()
 
 
-def _extract_threshold(title: str) -> float | None:
-    """Extract the numeric threshold value from a market title."""
-    for pattern in THRESHOLD_PATTERNS:
-        match = pattern.search(title)
-        if match:
-            try:
-                value_str = match.group(2).replace(',', '')
-                return float(value_str)
-            except (ValueError, IndexError):
-                continue
-    return None
+@lru_cache(maxsize=CLUSTER_KEY_CACHE_SIZE)
+def cluster_key(question: str) -> Optional[tuple[str, float, Optional[str]]]:
+    """
+    Return (normalized title, threshold, subject) for a threshold market.
 
+    Markets sharing a normalized title are thresholds of the same question.
+    The subject and threshold come from the first matching pattern. Returns
+    None for questions without a threshold.
+    """
+    lowered = question.lower()
+    if not any(keyword in lowered for keyword in THRESHOLD_KEYWORDS):
+        return None
 
-def _extract_subject(title: str) -> str | None:
-    """Extract the subject (e.g., 'Bitcoin') from a threshold market title."""
+    subject = None
     for pattern in THRESHOLD_PATTERNS:
-        match = pattern.search(title)
-        if match:
-            return match.group(1).strip()
+        match = pattern.search(question)
+        if not match:
+            continue
+        if subject is None:
+            subject = match.group(1).strip()
+        try:
+            threshold = float(match.group(2).replace(',', ''))
+        except ValueError:
+            continue
+        return _normalize_title(question), threshold, subject
     return None
 
 
+def cluster_title(subject: Optional[str]) -> str:
+    return f"{subject} Price Outlook" if subject else "Related Markets"
+
+
 def cluster_markets(markets: list[dict]) -> list[dict]:
     """
-    Group markets that represent thresholds of the same underlying question.
+    Group markets by the clusters stored at ingest time.
 
     Args:
-        markets: list of dicts with at least 'id', 'question', 'probability', 'headline'
+        markets: list of dicts with at least 'id', 'headline' and, for
+            clustered markets, '_cluster' = (cluster_id, title, sort_value,
+            cluster_type); sort_value is the threshold for threshold
+            clusters and the volume rank for related ones
 
     Returns:
-        list of cluster dicts: { id, title, tag, markets: [...] }
+        list of cluster dicts: { id, title, tag, markets: [...] }, keeping
+        clusters with MIN_CLUSTER_SIZE+ of the given markets
     """
-    # Group by normalized title
-    groups: dict[str, list[dict]] = defaultdict(list)
+    groups: dict[int, list[dict]] = defaultdict(list)
+    titles: dict[int, str] = {}
+    types: dict[int, str] = {}
 
     for market in markets:
-        normalized = _normalize_title(market["question"])
-        threshold = _extract_threshold(market["question"])
-
-        if threshold is not None:
-            groups[normalized].append({
-                **market,
-                "_threshold": threshold,
-            })
+        stored = market.get("_cluster")
+        if stored is None:
+            continue
+        cluster_id, title, _, cluster_type = stored
+        groups[cluster_id].append({**market})
+        titles[cluster_id] = title
+        types[cluster_id] = cluster_type
 
-    # Only keep groups with 3+ markets
     clusters = []
-    cluster_id = 1
-
-    for normalized_title, group in groups.items():
-        if len(group) < 3:
+    for cluster_id, group in groups.items():
+        if len(group) < MIN_CLUSTER_SIZE:
             continue
 
-        # Sort by threshold value ascending
-        group.sort(key=lambda m: m["_threshold"])
+        # Sort by threshold (or volume rank) ascending
+        group.sort(key=lambda m: m["_cluster"][2])
 
-        # Generate a cluster title
-        subject = _extract_subject(group[0]["question"])
-        if subject:
-            title = f"{subject} Price Outlook"
-        else:
-            title = "Related Markets"
+        if types[cluster_id] == "related":
+            # Near-duplicate questions keep their own headlines.
+            clusters.append({
+                "id": cluster_id,
+                "title": titles[cluster_id],
+                "tag": "RELATED",
+                "markets": group,
+            })
+            continue
 
         # Clean up: generate compact headlines for cluster items
         for m in group:
-            threshold = m["_threshold"]
+            threshold = m["_cluster"][2]
             if threshold >= 1000:
                 m["headline"] = f"Above ${threshold:,.0f}"
             else:
@@ -120,10 +155,150 @@ def cluster_markets(markets: list[dict]) -> list[dict]:
 
         clusters.append({
             "id": cluster_id,
-            "title": title,
+            "title": titles[cluster_id],
             "tag": "STORY",
             "markets": group,
         })
-        cluster_id += 1
 
     return clusters
+
+
+# ── Related (near-duplicate) markets ──
+
+RELATED_NUM_PERM = 64  # MinHash signature length
+RELATED_BANDS = 16  # LSH bands of RELATED_NUM_PERM / RELATED_BANDS rows each
+RELATED_SIMILARITY = 0.5  # estimated Jaccard similarity needed to link two markets
+RELATED_MAX_DOC_FREQ = 0.05  # tokens in more of the markets than this are ignored
+RELATED_MAX_BUCKET = 50  # LSH buckets larger than this are treated as noise
+RELATED_MAX_CLUSTER = 20  # linking stops growing a related cluster past this
+RELATED_DESCRIPTION_CHARS = 400  # description prefix included in the token set
+RELATED_CHUNK_TOKENS = 65536  # tokens gathered per signature chunk (bounds memory)
+
+_WORD = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset(
+    "a an and any are as at be before between by does for from has have if in into is it "
+    "its market of on or other than that the this to will with yes no resolve resolves "
+    "resolved".split()
+)
+
+
+def related_tokens(question: str, description: Optional[str]) -> set[str]:
+    """Return the word tokens compared between markets."""
+    text = f"{question} {(description or '')[:RELATED_DESCRIPTION_CHARS]}".lower()
+    return {t for t in _WORD.findall(text) if len(t) > 1 and t not in STOPWORDS}
+
+
+def minhash_signatures(token_sets: list[set[str]], seed: int = 1) -> np.ndarray:
+    """
+    Compute a (documents, RELATED_NUM_PERM) MinHash signature matrix.
+
+    Each vocabulary token is hashed once (crc32) and permuted with
+    multiply-shift hashing; a document's signature is the column-wise
+    minimum over its tokens. Empty documents get all-max signatures.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**63, size=RELATED_NUM_PERM, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63, size=RELATED_NUM_PERM, dtype=np.uint64)
+
+    vocabulary: dict[str, int] = {}
+    token_ids: list[int] = []
+    lengths = np.zeros(len(token_sets), dtype=np.int64)
+    for i, tokens in enumerate(token_sets):
+        lengths[i] = len(tokens)
+        token_ids.extend(vocabulary.setdefault(t, len(vocabulary)) for t in tokens)
+
+    signatures = np.full((len(token_sets), RELATED_NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+    if not vocabulary:
+        return signatures
+
+    token_hashes = np.fromiter(
+        (zlib.crc32(t.encode()) for t in vocabulary), dtype=np.uint64, count=len(vocabulary)
+    )
+    permuted = ((token_hashes[:, None] * a + b) >> np.uint64(32)).astype(np.uint32)
+    token_ids = np.asarray(token_ids, dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    # Gather documents in chunks so at most ~RELATED_CHUNK_TOKENS rows of
+    # permuted hashes are materialized at once.
+    doc = 0
+    while doc < len(token_sets):
+        end = doc
+        while end < len(token_sets) and (
+            end == doc or starts[end] + lengths[end] - starts[doc] <= RELATED_CHUNK_TOKENS
+        ):
+            end += 1
+        docs = np.arange(doc, end)[lengths[doc:end] > 0]
+        if len(docs):
+            rows = permuted[token_ids[starts[doc]:starts[end - 1] + lengths[end - 1]]]
+            signatures[docs] = np.minimum.reduceat(rows, starts[docs] - starts[doc], axis=0)
+        doc = end
+    return signatures
+
+
+def lsh_candidate_pairs(signatures: np.ndarray) -> np.ndarray:
+    """Return (i, j) index pairs sharing at least one LSH band bucket."""
+    rows_per_band = signatures.shape[1] // RELATED_BANDS
+    pairs = set()
+    for band in range(RELATED_BANDS):
+        block = np.ascontiguousarray(signatures[:, band * rows_per_band:(band + 1) * rows_per_band])
+        keys = block.view(np.dtype((np.void, block.itemsize * rows_per_band))).ravel()
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        for bucket in np.flatnonzero((counts > 1) & (counts <= RELATED_MAX_BUCKET)):
+            members = order[bounds[bucket]:bounds[bucket + 1]].tolist()
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return np.array(sorted(pairs), dtype=np.int64).reshape(-1, 2)
+
+
+def related_groups(documents: list[tuple[str, Optional[str]]]) -> list[list[int]]:
+    """
+    Group near-duplicate (question, description) documents.
+
+    Tokens shared by more than RELATED_MAX_DOC_FREQ of the documents (and
+    more than RELATED_MAX_BUCKET of them) are dropped as boilerplate.
+    Candidate pairs from LSH are kept when their estimated similarity
+    reaches RELATED_SIMILARITY and linked strongest first, never growing a
+    group past RELATED_MAX_CLUSTER, so chains of near-duplicates cannot
+    merge into one huge cluster. Returns index groups of MIN_CLUSTER_SIZE+.
+    """
+    token_sets = [related_tokens(question, description) for question, description in documents]
+    document_frequency = Counter(t for tokens in token_sets for t in tokens)
+    # Small candidate sets keep shared tokens; a token in fewer documents than
+    # a bucket may hold can still define a real group.
+    max_frequency = max(RELATED_MAX_BUCKET, int(len(documents) * RELATED_MAX_DOC_FREQ))
+    common = {t for t, count in document_frequency.items() if count > max_frequency}
+    token_sets = [tokens - common for tokens in token_sets]
+
+    signatures = minhash_signatures(token_sets)
+    pairs = lsh_candidate_pairs(signatures)
+    if not len(pairs):
+        return []
+    similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    keep = similarity >= RELATED_SIMILARITY
+    pairs, similarity = pairs[keep], similarity[keep]
+    pairs = pairs[np.argsort(-similarity, kind="stable")]
+
+    parent = list(range(len(documents)))
+    size = [1] * len(documents)
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j in pairs.tolist():
+        if not (token_sets[i] and token_sets[j]):
+            continue
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j and size[root_i] + size[root_j] <= RELATED_MAX_CLUSTER:
+            parent[root_i] = root_j
+            size[root_j] += size[root_i]
+
+    components: dict[int, list[int]] = defaultdict(list)
+    for i in range(len(documents)):
+        components[find(i)].append(i)
+    return [group for group in components.values() if len(group) >= MIN_CLUSTER_SIZE]
@@ -14,6 +14,9 @@ class Settings(BaseSettings):
     POLYMARKET_API_URL: str = "https://gamma-api.polymarket.com"
     POLYMARKET_RATE_LIMIT: int = 100  # requests per minute
     POLYMARKET_DAILY_LIMIT: int = 10000
+    POLYMARKET_RATE_BURST: int = 20  # token bucket capacity shared by all workers
+    POLYMARKET_MAX_CONCURRENCY: int = 8  # parallel page requests per client
+    POLYMARKET_CLOB_URL: str = "https://clob.polymarket.com"  # price history for backfills
 
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000"
@@ -23,13 +26,37 @@ class Settings(BaseSettings):
     FEED_CACHE_TTL: int = 90  # 90 seconds
     CATEGORY_CACHE_TTL: int = 3600  # 1 hour
     MARKET_CACHE_TTL: int = 90  # 90 seconds
+    CACHE_STALE_TTL: int = 30  # serve stale values this long while one request recomputes
+    CACHE_TTL_JITTER: float = 0.1  # up to +10% random TTL spread
+    CACHE_LOCK_TIMEOUT: int = 10  # seconds a recompute lock is held at most
+    CACHE_GENERATION_REFRESH: int = 5  # re-read polynews:gen at most this often (pub/sub fallback)
+    CACHE_L1_MAX_ENTRIES: int = 512  # per-worker in-process cache bound
+    CACHE_L1_MAX_BYTES: int = 64 * 1024 * 1024  # 64 MB of serialized responses
+    EDITORIAL_FEED_TTL: int = 1800  # prebuilt layouts, replaced every ingestion run
     INGESTION_INTERVAL: int = 120  # 2 minutes in seconds
     MAX_ACTIVE_PAGES: int = 5
     MAX_RESOLVED_PAGES: int = 6
     RESOLVED_FETCH_BATCH_SIZE: int = 250
     RECENTLY_RESOLVED_WINDOW_HOURS: int = 24
+    RESOLVED_SPECULATIVE_PAGES: int = 3  # resolved pages kept in flight ahead of the reader
     STALE_ACTIVE_RECONCILE_LIMIT: int = 100
     STALE_ACTIVE_RECHECK_MINUTES: int = 60
+    RECONCILE_BATCH_SIZE: int = 50  # market IDs per multi-ID Gamma lookup
+    INGESTION_DELTA_ENABLED: bool = True  # fetch only markets updated since the last run
+    INGESTION_FULL_SWEEP_MINUTES: int = 30  # full re-fetch between delta runs
+    INGESTION_DELTA_OVERLAP_SECONDS: int = 120  # re-read window behind the updatedAt watermark
+    INGESTION_POOL_RECYCLE: int = 1800  # seconds before a pooled DB connection is replaced
+    INGESTION_REDIS_HEALTH_CHECK_INTERVAL: int = 30  # seconds idle before Redis is pinged
+    INGESTION_WRITE_BATCH_SIZE: int = 500  # markets per multi-row write
+    SNAPSHOT_HEARTBEAT_MINUTES: int = 30  # force a snapshot for unchanged markets
+    SNAPSHOT_PARTITION_DAYS_AHEAD: int = 3  # daily snapshot partitions created in advance
+    SNAPSHOT_RETENTION_DAYS: int = 14  # raw snapshot horizon once rolled up (0 = keep)
+    ROLLUP_INTERVAL: int = 3600  # hourly/daily rollup cadence in seconds
+    ROLLUP_HOURLY_RETENTION_DAYS: int = 90  # hourly tier horizon (daily is kept)
+    BACKFILL_CHUNK_SIZE: int = 50000  # snapshot rows per COPY + checkpoint
+    BACKFILL_HISTORY_FIDELITY: int = 60  # minutes between CLOB price history points
+    BACKFILL_RATE_LIMIT: int = 20  # CLOB backfill share of POLYMARKET_RATE_LIMIT per minute
+    BACKFILL_DAILY_LIMIT: int = 2000  # CLOB backfill share of POLYMARKET_DAILY_LIMIT
 
     # Staleness threshold (seconds)
     STALENESS_THRESHOLD: int = 300  # 5 minutes
@@ -1,11 +1,20 @@
-"""Editorial logic: newsworthiness scoring, hero selection, section assignment."""
+"""Editorial logic: newsworthiness scoring, hero selection, section assignment.
 
+A feed build ranks the same few hundred markets for the hero, sections,
+ticker and movers. ``FeedRanking`` computes their sort keys once, and each
+selector takes only the handful of markets it shows with ``heapq`` partial
+selection instead of sorting the whole list.
+"""
+
+import heapq
 import math
 import os
 import re
 import logging
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Iterator, Optional
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -55,54 +64,113 @@ def compute_newsworthiness(
     return round(score, 2)
 
 
-def select_hero_markets(markets: list[dict]) -> tuple[Optional[dict], list[dict]]:
+def newsworthiness_scores(
+    change_pct: np.ndarray,
+    volume: np.ndarray,
+    avg_daily_change: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Batch form of ``compute_newsworthiness`` over column arrays."""
+    abs_change = np.abs(np.asarray(change_pct, dtype=np.float64))
+    movement = 100 / (1 + np.exp(-SIGMOID_STEEPNESS * (abs_change - SIGMOID_MIDPOINT)))
+
+    volume_log = np.log10(np.maximum(np.asarray(volume, dtype=np.float64), 1))
+    significance = np.minimum(100, volume_log / MAX_VOLUME_LOG * 100)
+
+    volatility_bonus = np.zeros_like(abs_change)
+    if avg_daily_change is not None:
+        avg = np.nan_to_num(np.asarray(avg_daily_change, dtype=np.float64))
+        has_avg = avg > 0
+        volatility_bonus[has_avg] = np.minimum(20, abs_change[has_avg] / avg[has_avg] * 4)
+
+    score = (
+        movement * WEIGHT_MOVEMENT
+        + significance * WEIGHT_SIGNIFICANCE
+        + volatility_bonus * WEIGHT_VOLATILITY
+    )
+    return np.round(score, 2)
+
+
+class FeedRanking:
+    """Sort keys for one feed build, computed once and shared by every selector."""
+
+    def __init__(self, markets: list[dict]):
+        self.markets = markets
+        self.abs_change = [abs(m.get("change_pct", 0)) for m in markets]
+        self.volume = [m.get("volume", 0) for m in markets]
+        self.questions = [m.get("question", "").lower() for m in markets]
+        self._movers: list[dict] = []
+        self._movers_count = 0
+
+    def top(self, count: int, indices, key) -> list[dict]:
+        """The ``count`` largest markets among ``indices``, in full-sort order."""
+        return [self.markets[i] for i in heapq.nlargest(count, indices, key=key)]
+
+    def movers(self, count: int) -> list[dict]:
+        """Top ``count`` markets by absolute 24h change (shared by ticker and movers)."""
+        if count > self._movers_count:
+            self._movers = self.top(count, range(len(self.markets)), self.abs_change.__getitem__)
+            self._movers_count = count
+        return self._movers[:count]
+
+
+def _iter_descending(scores) -> Iterator[int]:
+    """Yield indices by descending score, ties in index order, popping a heap lazily."""
+    heap = [(-score, i) for i, score in enumerate(scores)]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[1]
+
+
+def select_hero_markets(
+    markets: list[dict],
+    ranking: Optional[FeedRanking] = None,
+) -> tuple[Optional[dict], list[dict]]:
     """
     Select top 3 most newsworthy markets for the hero section.
 
     Args:
         markets: list of market dicts with 'change_pct', 'volume', 'category', 'cluster_id', 'id'
+        ranking: precomputed keys for ``markets``, shared with the other selectors
 
     Returns:
         (primary, [secondary1, secondary2])
     """
+    ranking = ranking or FeedRanking(markets)
+
     # Filter: must have meaningful recent movement
-    eligible = [m for m in markets if abs(m.get("change_pct", 0)) >= MIN_CHANGE_THRESHOLD]
+    eligible = [i for i, change in enumerate(ranking.abs_change) if change >= MIN_CHANGE_THRESHOLD]
 
     if not eligible:
         # Fallback: just take top 3 by volume
-        by_volume = sorted(markets, key=lambda m: m.get("volume", 0), reverse=True)
+        by_volume = ranking.top(3, range(len(markets)), ranking.volume.__getitem__)
         primary = by_volume[0] if by_volume else None
         secondary = by_volume[1:3]
         return primary, secondary
 
-    # Score and sort
-    scored = [
-        (m, compute_newsworthiness(m.get("change_pct", 0), m.get("volume", 0)))
-        for m in eligible
-    ]
-    scored.sort(key=lambda x: x[1], reverse=True)
+    # Score in one pass; markets are then pulled off a heap in score order
+    # only as far as deduplication and category diversity need.
+    scores = newsworthiness_scores(
+        [ranking.abs_change[i] for i in eligible],
+        [ranking.volume[i] for i in eligible],
+    )
 
-    # Deduplicate clusters
     seen_clusters = set()
     deduplicated = []
-    for market, score in scored:
-        cluster_id = market.get("cluster_id") or market["id"]
-        if cluster_id not in seen_clusters:
-            seen_clusters.add(cluster_id)
-            deduplicated.append((market, score))
-
-    if not deduplicated:
-        return None, []
-
-    hero_1 = deduplicated[0][0]
-    hero_1_cat = hero_1.get("category", "")
-    remaining = deduplicated[1:]
-
-    # Pick with category diversity
+    hero_1_cat = None
     hero_2 = None
     hero_3 = None
-
-    for market, score in remaining:
+    for position in _iter_descending(scores.tolist()):
+        market = markets[eligible[position]]
+        cluster_id = market.get("cluster_id") or market["id"]
+        if cluster_id in seen_clusters:
+            continue
+        seen_clusters.add(cluster_id)
+        deduplicated.append(market)
+        if len(deduplicated) == 1:
+            hero_1_cat = market.get("category", "")
+            continue
+
+        # Pick with category diversity
         if hero_2 is None and market.get("category", "") != hero_1_cat:
             hero_2 = market
         elif hero_3 is None and market.get("category", "") != hero_1_cat and market is not hero_2:
@@ -110,11 +178,14 @@ def select_hero_markets(markets: list[dict]) -> tuple[Optional[dict], list[dict]
         if hero_2 and hero_3:
             break
 
+    hero_1 = deduplicated[0]
+    remaining = deduplicated[1:]
+
     # Fallback
     if hero_2 is None and remaining:
-        hero_2 = remaining[0][0]
+        hero_2 = remaining[0]
     if hero_3 is None:
-        candidates = [m for m, _ in remaining if m is not hero_2]
+        candidates = [m for m in remaining if m is not hero_2]
         if candidates:
             hero_3 = candidates[0]
 
@@ -135,88 +206,106 @@ TECH_KEYWORDS = {
     "ethereum", "crypto", "tesla", "openai", "meta", "amazon",
 }
 
+# Substring match against any keyword, one regex scan per question
+_GEOPOLITICS_RE = re.compile("|".join(sorted(GEOPOLITICS_KEYWORDS)))
+_TECH_RE = re.compile("|".join(sorted(TECH_KEYWORDS)))
+
 
-def assign_sections(markets: list[dict], hero_ids: set[str]) -> list[dict]:
+def assign_sections(
+    markets: list[dict],
+    hero_ids: set[str],
+    ranking: Optional[FeedRanking] = None,
+) -> list[dict]:
     """
     Assign remaining markets to editorial sections.
     Returns list of section dicts with label, type, card_variant, grid_cols, markets.
     """
+    ranking = ranking or FeedRanking(markets)
+    abs_change, volume, questions = ranking.abs_change, ranking.volume, ranking.questions
+
+    def by_movement(i):
+        return abs_change[i], volume[i]
+
     # Remove hero markets
-    remaining = [m for m in markets if m["id"] not in hero_ids]
+    remaining = [i for i, m in enumerate(markets) if m["id"] not in hero_ids]
 
     sections = []
 
     # High Confidence (>= 90% probability)
-    high_conf = [
-        m for m in remaining
-        if m.get("probability", 0) >= 90
-    ]
-    high_conf.sort(key=lambda m: (m.get("probability", 0), m.get("volume", 0)), reverse=True)
+    high_conf = ranking.top(
+        6,
+        (i for i in remaining if markets[i].get("probability", 0) >= 90),
+        lambda i: (markets[i].get("probability", 0), volume[i]),
+    )
     if high_conf:
         sections.append({
             "label": "High Confidence \u00b7 >90%",
             "type": "default",
             "card_variant": "compact",
             "grid_cols": 3,
-            "markets": high_conf[:6],
+            "markets": high_conf,
         })
-    high_conf_ids = {m["id"] for m in high_conf[:6]}
+    high_conf_ids = {m["id"] for m in high_conf}
 
     # Geopolitics
-    geo = [
-        m for m in remaining
-        if m["id"] not in high_conf_ids and (
-            m.get("category") in ("politics",)
-            or any(kw in m.get("question", "").lower() for kw in GEOPOLITICS_KEYWORDS)
-        )
-    ]
-    geo.sort(key=lambda m: (abs(m.get("change_pct", 0)), m.get("volume", 0)), reverse=True)
+    geo = ranking.top(
+        4,
+        (
+            i for i in remaining
+            if markets[i]["id"] not in high_conf_ids and (
+                markets[i].get("category") in ("politics",)
+                or _GEOPOLITICS_RE.search(questions[i])
+            )
+        ),
+        by_movement,
+    )
     if geo:
         sections.append({
             "label": "Geopolitics & Conflict",
             "type": "default",
             "card_variant": "mini",
             "grid_cols": 2,
-            "markets": geo[:4],
+            "markets": geo,
         })
-    geo_ids = {m["id"] for m in geo[:4]}
+    geo_ids = {m["id"] for m in geo}
 
     # Tech & Markets
-    tech = [
-        m for m in remaining
-        if m["id"] not in high_conf_ids and m["id"] not in geo_ids and (
-            m.get("category") in ("tech", "crypto")
-            or any(kw in m.get("question", "").lower() for kw in TECH_KEYWORDS)
-        )
-    ]
-    tech.sort(key=lambda m: (abs(m.get("change_pct", 0)), m.get("volume", 0)), reverse=True)
+    tech = ranking.top(
+        4,
+        (
+            i for i in remaining
+            if markets[i]["id"] not in high_conf_ids and markets[i]["id"] not in geo_ids and (
+                markets[i].get("category") in ("tech", "crypto")
+                or _TECH_RE.search(questions[i])
+            )
+        ),
+        by_movement,
+    )
     if tech:
         sections.append({
             "label": "Tech & Markets",
             "type": "default",
             "card_variant": "medium",
             "grid_cols": 2,
-            "markets": tech[:4],
+            "markets": tech,
         })
 
     return sections
 
 
-def select_ticker(markets: list[dict], count: int = 8) -> list[dict]:
+def select_ticker(
+    markets: list[dict],
+    count: int = 8,
+    ranking: Optional[FeedRanking] = None,
+) -> list[dict]:
     """Select top markets by absolute 24h change for the ticker."""
-    sorted_markets = sorted(
-        markets,
-        key=lambda m: abs(m.get("change_pct", 0)),
-        reverse=True,
-    )
-    return sorted_markets[:count]
+    return (ranking or FeedRanking(markets)).movers(count)
 
 
-def select_movers(markets: list[dict], count: int = 8) -> list[dict]:
+def select_movers(
+    markets: list[dict],
+    count: int = 8,
+    ranking: Optional[FeedRanking] = None,
+) -> list[dict]:
     """Select biggest movers for the sidebar."""
-    sorted_markets = sorted(
-        markets,
-        key=lambda m: abs(m.get("change_pct", 0)),
-        reverse=True,
-    )
-    return sorted_markets[:count]
+    return (ranking or FeedRanking(markets)).movers(count)
@@ -0,0 +1,315 @@
+"""Editorial feed layout, built once per ingestion run and served from Redis.
+
+The layout for ``all`` and every category is assembled at the end of
+``ingest_markets_task`` and written to Redis under the next cache generation
+in the same MULTI/EXEC that bumps it, so readers always see a complete set
+from one run. The API endpoint only falls
+back to building a layout itself when the prebuilt one is missing.
+"""
+
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.cache import (
+    advance_generation,
+    encode_entry,
+    reserve_generation,
+    serialize_body,
+    versioned_key,
+)
+from app.config import get_settings
+from app.schemas import (
+    EditorialFeedResponse,
+    EditorialMarket,
+    TickerItem,
+    StoryClusterSchema,
+    FeedSectionSchema,
+    HeroSection,
+    FeedMeta,
+)
+from app.editorial import (
+    FeedRanking,
+    select_hero_markets,
+    assign_sections,
+    select_ticker,
+    select_movers,
+)
+from app.headlines import to_headline
+from app.card_summaries import get_summary_for_card
+from app.clustering import cluster_markets
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+VALID_CATEGORIES = {"politics", "crypto", "sports", "tech", "other"}
+FEED_SCOPES = ("all", *sorted(VALID_CATEGORIES))
+
+# ── Active markets from the precomputed ranking surface ──
+ACTIVE_MARKETS_SQL = """
+    SELECT
+        m.id,
+        m.question,
+        m.category,
+        m.resolution_date,
+        m.status,
+        m.slug,
+        m.image_url,
+        t.current_price,
+        t.price_24h_ago,
+        t.volume,
+        c.cluster_id,
+        c.cluster_title,
+        c.cluster_type,
+        c.sort_value
+    FROM trending_view t
+    JOIN markets m ON m.id = t.market_id
+    LEFT JOIN (
+        SELECT
+            cm.market_id,
+            mc.id AS cluster_id,
+            mc.title AS cluster_title,
+            mc.cluster_type,
+            cm.sort_value
+        FROM cluster_markets cm
+        JOIN market_clusters mc ON mc.id = cm.cluster_id
+    ) c ON c.market_id = m.id
+    WHERE t.status = 'active'
+    {category_clause}
+    ORDER BY t.volume DESC
+    LIMIT 500
+"""
+
+ACTIVE_COUNT_SQL = """
+    SELECT COUNT(*) FROM trending_view t WHERE t.status = 'active' {category_clause}
+"""
+
+RECENTLY_RESOLVED_SQL = text("""
+    SELECT
+        m.id,
+        m.question,
+        m.category,
+        m.resolution_date,
+        m.status,
+        m.slug,
+        m.image_url,
+        t.current_price,
+        NULL::numeric AS price_24h_ago,
+        t.volume
+    FROM trending_view t
+    JOIN markets m ON m.id = t.market_id
+    WHERE t.status = 'resolved'
+        AND t.activity_at >= NOW() - INTERVAL '24 hours'
+    ORDER BY t.activity_at DESC
+    LIMIT 10
+""")
+
+LAST_SYNC_SQL = text("SELECT MAX(timestamp) FROM market_latest")
+
+
+def feed_scope(category: Optional[str]) -> str:
+    """Map a requested category to its layout; unknown categories get ``all``."""
+    return category if category in VALID_CATEGORIES else "all"
+
+
+def feed_cache_key(scope: str) -> str:
+    return f"polynews:editorial_feed:{scope}"
+
+
+def feed_queries(scope: str):
+    """Return (active query, count query, params) for a feed scope."""
+    category_clause = ""
+    params: dict = {}
+    if scope != "all":
+        category_clause = "AND t.category = :category"
+        params["category"] = scope
+    return (
+        text(ACTIVE_MARKETS_SQL.format(category_clause=category_clause)),
+        text(ACTIVE_COUNT_SQL.format(category_clause=category_clause)),
+        params,
+    )
+
+
+def build_editorial_market(row) -> dict:
+    """Convert a raw DB row to an editorial market dict."""
+    current_price = float(row.current_price)
+    price_24h_ago = float(row.price_24h_ago) if row.price_24h_ago is not None else None
+
+    # Calculate signed change in percentage points
+    if price_24h_ago is not None:
+        change_pct = (current_price - price_24h_ago) * 100
+    else:
+        change_pct = 0.0
+
+    probability = round(current_price * 100)
+    volume = float(row.volume)
+
+    headline = to_headline(row.question, probability)
+    summary = get_summary_for_card(
+        probability=probability,
+        change_pct=change_pct,
+        volume=volume,
+    )
+
+    return {
+        "id": row.id,
+        "question": row.question,
+        "headline": headline,
+        "summary": summary,
+        "category": row.category,
+        "current_price": current_price,
+        "probability": probability,
+        "price_24h_ago": price_24h_ago,
+        "change_24h": round(change_pct, 1),
+        "change_pct": round(abs(change_pct), 1),  # absolute, for scoring
+        "volume": volume,
+        "resolution_date": row.resolution_date.isoformat() if row.resolution_date else None,
+        "status": row.status,
+        "slug": row.slug,
+        "image_url": row.image_url,
+        "cluster_id": None,
+        # Stored cluster (id, title, threshold or volume rank, type), if any
+        "_cluster": (
+            (row.cluster_id, row.cluster_title, row.sort_value, row.cluster_type)
+            if getattr(row, "cluster_id", None) is not None
+            else None
+        ),
+    }
+
+
+def to_editorial_market(m: dict) -> EditorialMarket:
+    """Convert internal dict to Pydantic schema (strips internal fields like change_pct)."""
+    return EditorialMarket(
+        id=m["id"],
+        question=m["question"],
+        headline=m["headline"],
+        summary=m["summary"],
+        category=m["category"],
+        current_price=m["current_price"],
+        probability=m["probability"],
+        price_24h_ago=m["price_24h_ago"],
+        change_24h=m["change_24h"],
+        volume=m["volume"],
+        resolution_date=m["resolution_date"],
+        status=m["status"],
+        slug=m["slug"],
+        image_url=m["image_url"],
+        cluster_id=m.get("cluster_id"),
+    )
+
+
+def assemble_editorial_feed(rows, total_count: int, resolved_rows, last_sync) -> EditorialFeedResponse:
+    """Lay out hero, clusters, sections, ticker and movers from fetched rows."""
+    # Build editorial market dicts
+    all_markets = [build_editorial_market(row) for row in rows]
+
+    # ── Clustering (stored at ingest; grouped here per feed) ──
+    raw_clusters = cluster_markets(all_markets)
+    clustered_market_ids = set()
+    clusters = []
+    for c in raw_clusters:
+        cluster_market_objs = [to_editorial_market(m) for m in c["markets"]]
+        clusters.append(StoryClusterSchema(
+            id=c["id"],
+            title=c["title"],
+            tag=c["tag"],
+            markets=cluster_market_objs,
+        ))
+        for m in c["markets"]:
+            clustered_market_ids.add(m["id"])
+            m["cluster_id"] = c["id"]
+
+    # ── Hero selection (sort keys computed once for every selector) ──
+    ranking = FeedRanking(all_markets)
+    primary, secondary = select_hero_markets(all_markets, ranking)
+    hero_ids = set()
+    if primary:
+        hero_ids.add(primary["id"])
+    for s in secondary:
+        hero_ids.add(s["id"])
+
+    hero = HeroSection(
+        primary=to_editorial_market(primary) if primary else None,
+        secondary=[to_editorial_market(s) for s in secondary],
+    )
+
+    # ── Section assignment ──
+    raw_sections = assign_sections(all_markets, hero_ids, ranking)
+    sections = [
+        FeedSectionSchema(
+            label=sec["label"],
+            type=sec["type"],
+            card_variant=sec["card_variant"],
+            grid_cols=sec["grid_cols"],
+            markets=[to_editorial_market(m) for m in sec["markets"]],
+        )
+        for sec in raw_sections
+    ]
+
+    # ── Ticker ──
+    ticker_markets = select_ticker(all_markets, ranking=ranking)
+    ticker = [
+        TickerItem(
+            label=m["headline"][:40],
+            change=m["change_24h"],
+            probability=m["probability"],
+        )
+        for m in ticker_markets
+    ]
+
+    # ── Movers (sidebar) ──
+    mover_markets = select_movers(all_markets, ranking=ranking)
+    movers = [to_editorial_market(m) for m in mover_markets]
+
+    # ── Recently resolved ──
+    recently_resolved = [
+        to_editorial_market(build_editorial_market(r))
+        for r in resolved_rows
+    ]
+
+    meta = FeedMeta(
+        total_markets=total_count,
+        last_sync=last_sync,
+        sources_status={"polymarket": "connected"},
+    )
+
+    return EditorialFeedResponse(
+        hero=hero,
+        clusters=clusters,
+        sections=sections,
+        ticker=ticker,
+        movers=movers,
+        recently_resolved=recently_resolved,
+        meta=meta,
+    )
+
+
+def build_editorial_feed(session: Session, scope: str) -> EditorialFeedResponse:
+    """Build one layout with a synchronous session (ingestion side)."""
+    query, count_query, params = feed_queries(scope)
+    rows = session.execute(query, params).fetchall()
+    total_count = session.execute(count_query, params).scalar() or 0
+    resolved_rows = session.execute(RECENTLY_RESOLVED_SQL).fetchall()
+    last_sync = session.execute(LAST_SYNC_SQL).scalar()
+    return assemble_editorial_feed(rows, total_count, resolved_rows, last_sync)
+
+
+def publish_editorial_feeds(session: Session, rds) -> int:
+    """
+    Build every layout for a newly reserved cache generation and switch to it.
+
+    The layouts and the generation switch are written in one script, so
+    readers move to the new generation with its feeds already in place; a
+    run that finishes after a newer one leaves the newer generation current.
+    Returns the generation in effect afterwards.
+    """
+    generation = reserve_generation(rds)
+    payloads = {
+        versioned_key(feed_cache_key(scope), generation): encode_entry(
+            serialize_body(build_editorial_feed(session, scope), EditorialFeedResponse)
+        )
+        for scope in FEED_SCOPES
+    }
+    return advance_generation(rds, generation, payloads, settings.EDITORIAL_FEED_TTL)
@@ -0,0 +1,428 @@
+"""Historical snapshot backfill.
+
+Loads price history into ``snapshots`` from a local JSONL or Parquet dump, or
+from the CLOB price-history endpoint for markets already in ``markets``.
+Rows are streamed into a temporary staging table with ``COPY`` in chunks of
+BACKFILL_CHUNK_SIZE and moved into ``snapshots`` with
+``ON CONFLICT (market_id, timestamp) DO NOTHING``, so re-running a backfill
+never duplicates or overwrites history. Each chunk commits together with a
+checkpoint in ``backfill_checkpoints``; an interrupted run resumes after the
+last committed chunk.
+
+The hourly/daily rollups for each chunk's markets and days are rebuilt in
+the same transaction as its checkpoint, so retention can never drop
+backfilled raw history that has not been rolled up. Price baselines are reset with the
+final checkpoint so the next ingestion recomputes them.
+
+    python -m app.ingestion.backfill jsonl /data/history.jsonl
+    python -m app.ingestion.backfill parquet /data/history.parquet
+    python -m app.ingestion.backfill gamma --start 2026-01-01 --end 2026-02-01 [--market-id ID ...]
+
+JSONL lines and Parquet rows carry ``market_id``, ``timestamp`` (ISO-8601 or
+Unix seconds) and ``yes_price``, plus optional ``no_price`` (default
+``1 - yes_price``), ``volume`` and ``open_interest`` (default 0). CLOB
+history is price-only: its rows take volume and open interest from the
+market's nearest existing snapshot and never move ``market_latest``. Rows for
+markets missing from ``markets`` are skipped.
+"""
+
+import argparse
+import csv
+import io
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.ingestion.baselines import reset_baselines
+from app.ingestion.normalize import parse_timestamp
+from app.ingestion.partitions import ensure_snapshot_partitions
+from app.ingestion.rollups import ensure_rollup_tables, rollup_range
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# (market_id, timestamp, yes_price, no_price, volume, open_interest)
+HistoryRow = tuple[str, datetime, float, float, float, float]
+
+STAGING_TABLE = "snapshot_backfill_staging"
+
+INSERT_FROM_STAGING_SQL = text(f"""
+    INSERT INTO snapshots (market_id, timestamp, yes_price, no_price, volume, open_interest)
+    SELECT s.market_id, s.timestamp, s.yes_price, s.no_price, s.volume, s.open_interest
+    FROM {STAGING_TABLE} s
+    JOIN markets m ON m.id = s.market_id
+    ON CONFLICT (market_id, timestamp) DO NOTHING
+""")
+
+# Price-only rows carry volume/open interest from the nearest earlier snapshot
+# (or the nearest later one for history before any), so they never show up
+# as zero volume in snapshots or rollups.
+INSERT_PRICE_ONLY_FROM_STAGING_SQL = text(f"""
+    INSERT INTO snapshots (market_id, timestamp, yes_price, no_price, volume, open_interest)
+    SELECT
+        s.market_id,
+        s.timestamp,
+        s.yes_price,
+        s.no_price,
+        COALESCE(prev.volume, next.volume, 0),
+        COALESCE(prev.open_interest, next.open_interest, 0)
+    FROM {STAGING_TABLE} s
+    JOIN markets m ON m.id = s.market_id
+    LEFT JOIN LATERAL (
+        SELECT volume, open_interest FROM snapshots p
+        WHERE p.market_id = s.market_id AND p.timestamp <= s.timestamp
+        ORDER BY p.timestamp DESC
+        LIMIT 1
+    ) prev ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT volume, open_interest FROM snapshots n
+        WHERE n.market_id = s.market_id AND n.timestamp > s.timestamp
+        ORDER BY n.timestamp ASC
+        LIMIT 1
+    ) next ON TRUE
+    ON CONFLICT (market_id, timestamp) DO NOTHING
+""")
+
+# Backfilled rows only move market_latest forward, never back.
+UPSERT_LATEST_FROM_STAGING_SQL = text(f"""
+    INSERT INTO market_latest (market_id, yes_price, no_price, volume, open_interest, timestamp)
+    SELECT DISTINCT ON (s.market_id)
+        s.market_id, s.yes_price, s.no_price, s.volume, s.open_interest, s.timestamp
+    FROM {STAGING_TABLE} s
+    JOIN markets m ON m.id = s.market_id
+    ORDER BY s.market_id, s.timestamp DESC
+    ON CONFLICT (market_id) DO UPDATE SET
+        yes_price = EXCLUDED.yes_price,
+        no_price = EXCLUDED.no_price,
+        volume = EXCLUDED.volume,
+        open_interest = EXCLUDED.open_interest,
+        timestamp = EXCLUDED.timestamp
+    WHERE market_latest.timestamp < EXCLUDED.timestamp
+""")
+
+SAVE_CHECKPOINT_SQL = text("""
+    INSERT INTO backfill_checkpoints (name, position, rows_loaded, completed, updated_at)
+    VALUES (:name, :position, :rows_loaded, :completed, NOW())
+    ON CONFLICT (name) DO UPDATE SET
+        position = EXCLUDED.position,
+        rows_loaded = EXCLUDED.rows_loaded,
+        completed = EXCLUDED.completed,
+        updated_at = EXCLUDED.updated_at
+""")
+
+
+def ensure_backfill_tables(session: Session):
+    """Create the checkpoint table on deployments that predate it."""
+    session.execute(text("""
+        CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+            name TEXT PRIMARY KEY,
+            position BIGINT NOT NULL DEFAULT 0,
+            rows_loaded BIGINT NOT NULL DEFAULT 0,
+            completed BOOLEAN NOT NULL DEFAULT FALSE,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """))
+
+
+def iter_jsonl(path: str) -> Iterator[tuple[int, Optional[HistoryRow]]]:
+    """Yield (line number, row) for a JSONL dump; unparseable lines yield None."""
+    with open(path, "rb") as dump:
+        for position, line in enumerate(dump, start=1):
+            if not line.strip():
+                yield position, None
+                continue
+            try:
+                yield position, _history_row(orjson.loads(line))
+            except (orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+                yield position, None
+
+
+def iter_parquet(path: str) -> Iterator[tuple[int, Optional[HistoryRow]]]:
+    """Yield (row number, row) for a Parquet dump, one record batch at a time."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet backfills require pyarrow (pip install pyarrow)") from e
+
+    position = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=settings.BACKFILL_CHUNK_SIZE):
+        for record in batch.to_pylist():
+            position += 1
+            try:
+                yield position, _history_row(record)
+            except (KeyError, TypeError, ValueError):
+                yield position, None
+
+
+def iter_clob_history(
+    client,
+    market_ids: list[str],
+    start: datetime,
+    end: datetime,
+) -> Iterator[tuple[int, Optional[HistoryRow]]]:
+    """Yield (market number, row) for each market's CLOB price history."""
+    for position, market_id in enumerate(market_ids, start=1):
+        try:
+            history = client.fetch_price_history(market_id, start, end)
+        except Exception as e:
+            logger.warning("Skipping price history for market %s: %s", market_id, e)
+            yield position, None
+            continue
+        for timestamp, price in history:
+            # Volume/open interest are filled in from existing snapshots on load
+            yield position, (market_id, timestamp, price, 1 - price, 0.0, 0.0)
+        if not history:
+            yield position, None
+
+
+def run_backfill(
+    engine,
+    name: str,
+    rows: Iterator[tuple[int, Optional[HistoryRow]]],
+    chunk_size: int = settings.BACKFILL_CHUNK_SIZE,
+    restart: bool = False,
+    price_only: bool = False,
+) -> int:
+    """
+    Load ``rows`` into snapshots, resuming from the checkpoint named ``name``.
+
+    ``rows`` yields (position, row) with non-decreasing positions; every row
+    of a position is committed in the same chunk, and the checkpoint records
+    the last committed position. ``price_only`` sources carry no volume or
+    open interest of their own. Returns the number of snapshots inserted.
+    """
+    with Session(engine) as session:
+        ensure_backfill_tables(session)
+        ensure_rollup_tables(session)
+        if restart:
+            session.execute(text("DELETE FROM backfill_checkpoints WHERE name = :name"), {"name": name})
+        checkpoint = session.execute(
+            text("SELECT position, rows_loaded, completed FROM backfill_checkpoints WHERE name = :name"),
+            {"name": name},
+        ).first()
+        session.commit()
+
+    resume_after = checkpoint.position if checkpoint else 0
+    rows_loaded = checkpoint.rows_loaded if checkpoint else 0
+    if checkpoint and checkpoint.completed:
+        logger.info("Backfill %s already completed (%s rows); use restart to rerun", name, rows_loaded)
+        return 0
+    if resume_after:
+        logger.info("Resuming backfill %s after position %s", name, resume_after)
+
+    inserted = 0
+    skipped = 0
+    chunk: list[HistoryRow] = []
+    position = last_position = resume_after
+
+    for position, row in rows:
+        if position <= resume_after:
+            continue
+        # Flush only between positions so a checkpoint never splits one.
+        if len(chunk) >= chunk_size and position != last_position:
+            inserted += _load_chunk(engine, name, chunk, last_position, rows_loaded + inserted, price_only)
+            chunk = []
+        last_position = position
+        if row is None or not 0 <= row[2] <= 1 or not 0 <= row[3] <= 1:
+            skipped += 1
+            continue
+        chunk.append(row)
+
+    inserted += _load_chunk(
+        engine, name, chunk, last_position, rows_loaded + inserted, price_only, completed=True
+    )
+    if skipped:
+        logger.warning("Backfill %s skipped %s unparseable or out-of-range rows", name, skipped)
+
+    logger.info("Backfill %s complete: %s snapshots inserted", name, inserted)
+    return inserted
+
+
+def _load_chunk(
+    engine,
+    name: str,
+    chunk: list[HistoryRow],
+    position: int,
+    rows_loaded: int,
+    price_only: bool = False,
+    completed: bool = False,
+) -> int:
+    """
+    COPY one chunk through the staging table and checkpoint it atomically.
+
+    The chunk's rollups are rebuilt in the same transaction, and the final
+    (``completed``) chunk also resets baselines if anything was loaded.
+    """
+    with Session(engine) as session:
+        inserted = 0
+        if chunk:
+            timestamps = [row[1] for row in chunk]
+            ensure_snapshot_partitions(session, min(timestamps).date(), max(timestamps).date())
+
+            session.execute(text(f"""
+                CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+                    market_id TEXT NOT NULL,
+                    timestamp TIMESTAMPTZ NOT NULL,
+                    yes_price DECIMAL(5,4) NOT NULL,
+                    no_price DECIMAL(5,4) NOT NULL,
+                    volume DECIMAL(20,2) NOT NULL,
+                    open_interest DECIMAL(20,2) NOT NULL
+                ) ON COMMIT DELETE ROWS
+            """))
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for market_id, timestamp, yes_price, no_price, volume, open_interest in chunk:
+                writer.writerow((market_id, timestamp.isoformat(), yes_price, no_price, volume, open_interest))
+            buffer.seek(0)
+            cursor = session.connection().connection.dbapi_connection.cursor()
+            try:
+                cursor.copy_expert(f"COPY {STAGING_TABLE} FROM STDIN WITH (FORMAT csv)", buffer)
+            finally:
+                cursor.close()
+
+            if price_only:
+                inserted = session.execute(INSERT_PRICE_ONLY_FROM_STAGING_SQL).rowcount
+            else:
+                inserted = session.execute(INSERT_FROM_STAGING_SQL).rowcount
+                session.execute(UPSERT_LATEST_FROM_STAGING_SQL)
+
+            # Whole UTC days, so every rebuilt daily bucket sees all its hours,
+            # for just the chunk's markets
+            day_start = min(timestamps).replace(hour=0, minute=0, second=0, microsecond=0)
+            day_end = max(timestamps).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+            rollup_range(session, day_start, day_end, sorted({row[0] for row in chunk}))
+
+        if completed and rows_loaded + inserted > 0:
+            reset_baselines(session)
+
+        session.execute(
+            SAVE_CHECKPOINT_SQL,
+            {
+                "name": name,
+                "position": position,
+                "rows_loaded": rows_loaded + inserted,
+                "completed": completed,
+            },
+        )
+        session.commit()
+
+    if chunk:
+        logger.info(
+            "Backfill %s: %s of %s rows inserted through position %s",
+            name,
+            inserted,
+            len(chunk),
+            position,
+        )
+    return inserted
+
+
+def _history_row(record: dict) -> HistoryRow:
+    timestamp = record["timestamp"]
+    if isinstance(timestamp, (int, float)):
+        timestamp = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    elif isinstance(timestamp, str):
+        timestamp = parse_timestamp(timestamp)
+    elif isinstance(timestamp, datetime) and timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    if not isinstance(timestamp, datetime):
+        raise ValueError("invalid timestamp")
+    # Partitions and rollup buckets are UTC days; keep the source offset out.
+    timestamp = timestamp.astimezone(timezone.utc)
+
+    yes_price = float(record["yes_price"])
+    no_price = record.get("no_price")
+    return (
+        str(record["market_id"]),
+        timestamp,
+        yes_price,
+        1 - yes_price if no_price is None else float(no_price),
+        float(record.get("volume") or 0),
+        float(record.get("open_interest") or 0),
+    )
+
+
+def _parse_day(value: str) -> datetime:
+    parsed = parse_timestamp(value)
+    if parsed is None:
+        raise argparse.ArgumentTypeError(f"invalid date: {value}")
+    return parsed
+
+
+def backfill_snapshots_task(
+    source: str,
+    path: Optional[str] = None,
+    market_ids: Optional[list[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    name: Optional[str] = None,
+    restart: bool = False,
+) -> int:
+    """Run one backfill from ``source`` ("jsonl", "parquet" or "gamma")."""
+    from app.ingestion.resources import get_backfill_polymarket_client, get_sync_engine
+
+    engine = get_sync_engine()
+    price_only = False
+    if source == "jsonl":
+        rows = iter_jsonl(path)
+        name = name or f"jsonl:{path}"
+    elif source == "parquet":
+        rows = iter_parquet(path)
+        name = name or f"parquet:{path}"
+    elif source == "gamma":
+        end_at = _parse_day(end) if end else datetime.now(timezone.utc)
+        start_at = _parse_day(start) if start else end_at - timedelta(days=30)
+        if not market_ids:
+            # Sorted so positions stay stable when an interrupted run resumes.
+            with Session(engine) as session:
+                market_ids = list(session.execute(text("SELECT id FROM markets ORDER BY id")).scalars())
+        rows = iter_clob_history(get_backfill_polymarket_client(), market_ids, start_at, end_at)
+        name = name or f"gamma:{start_at:%Y%m%d}-{end_at:%Y%m%d}"
+        price_only = True
+    else:
+        raise ValueError(f"Unknown backfill source: {source}")
+
+    return run_backfill(engine, name, rows, restart=restart, price_only=price_only)
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.ingestion.backfill",
+        description="Bulk-load historical snapshots.",
+    )
+    parser.add_argument("source", choices=("jsonl", "parquet", "gamma"))
+    parser.add_argument("path", nargs="?", help="dump file for jsonl/parquet sources")
+    parser.add_argument(
+        "--market-id",
+        action="append",
+        dest="market_ids",
+        help="gamma: market to load (repeatable; default all)",
+    )
+    parser.add_argument("--start", type=_parse_day, help="gamma: ISO start (default 30 days before end)")
+    parser.add_argument("--end", type=_parse_day, help="gamma: ISO end (default now)")
+    parser.add_argument("--name", help="checkpoint name (default derived from the source)")
+    parser.add_argument("--restart", action="store_true", help="ignore any existing checkpoint")
+    args = parser.parse_args(argv)
+    if args.source != "gamma" and not args.path:
+        parser.error(f"{args.source} backfills need a path")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    backfill_snapshots_task(
+        args.source,
+        path=args.path,
+        market_ids=args.market_ids,
+        start=args.start.isoformat() if args.start else None,
+        end=args.end.isoformat() if args.end else None,
+        name=args.name,
+        restart=args.restart,
+    )
+
+
+if __name__ == "__main__":
+    main()
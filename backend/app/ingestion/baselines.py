@@ -0,0 +1,86 @@
+"""Rolling price baselines (24h and 7d ago) maintained at ingest time.
+
+For each lookback L, a market's baseline is the price of its newest snapshot
+at or before ``now - L``. As ``now`` advances, that value can only change if a
+snapshot landed between the previous cutoff and the new one, so each update
+reads just that narrow slice of ``snapshots`` (via the timestamp index) and
+records the new cutoff in ``baseline_watermarks``. Readers get every baseline
+with a primary-key join on ``market_baselines``.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# market_baselines column -> lookback
+LOOKBACKS = {
+    "price_24h_ago": timedelta(hours=24),
+    "price_7d_ago": timedelta(days=7),
+}
+
+
+def ensure_baseline_tables(session: Session):
+    """Create the baseline tables on deployments that predate them."""
+    session.execute(text("""
+        CREATE TABLE IF NOT EXISTS market_baselines (
+            market_id TEXT PRIMARY KEY REFERENCES markets(id) ON DELETE CASCADE,
+            price_24h_ago DECIMAL(5,4),
+            price_7d_ago DECIMAL(5,4),
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """))
+    session.execute(text("""
+        CREATE TABLE IF NOT EXISTS baseline_watermarks (
+            lookback TEXT PRIMARY KEY,
+            cutoff TIMESTAMPTZ NOT NULL
+        )
+    """))
+
+
+def update_baselines(session: Session, now: datetime):
+    """Advance every lookback baseline to ``now``."""
+    watermarks = {
+        row.lookback: row.cutoff
+        for row in session.execute(text("SELECT lookback, cutoff FROM baseline_watermarks"))
+    }
+
+    for column, lookback in LOOKBACKS.items():
+        cutoff = now - lookback
+        previous = watermarks.get(column)
+        if previous is not None and cutoff <= previous:
+            continue
+
+        # First run (no watermark) scans all history once; later runs only
+        # read snapshots that crossed the cutoff since the previous run.
+        window_clause = "AND timestamp > :previous" if previous is not None else ""
+        session.execute(
+            text(f"""
+                INSERT INTO market_baselines (market_id, {column}, updated_at)
+                SELECT DISTINCT ON (market_id) market_id, yes_price, :now
+                FROM snapshots
+                WHERE timestamp <= :cutoff
+                    {window_clause}
+                ORDER BY market_id, timestamp DESC
+                ON CONFLICT (market_id) DO UPDATE SET
+                    {column} = EXCLUDED.{column},
+                    updated_at = EXCLUDED.updated_at
+            """),
+            {"now": now, "cutoff": cutoff, "previous": previous},
+        )
+        session.execute(
+            text("""
+                INSERT INTO baseline_watermarks (lookback, cutoff)
+                VALUES (:lookback, :cutoff)
+                ON CONFLICT (lookback) DO UPDATE SET cutoff = EXCLUDED.cutoff
+            """),
+            {"lookback": column, "cutoff": cutoff},
+        )
+
+
+def reset_baselines(session: Session):
+    """Force a full recompute on the next update (e.g. after history is backfilled)."""
+    session.execute(text("DELETE FROM baseline_watermarks"))
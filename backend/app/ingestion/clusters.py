@@ -0,0 +1,279 @@
+"""Story clusters, maintained at ingest time.
+
+Each market's question is parsed once into a cluster key (its normalized
+title), threshold and subject, cached in ``market_cluster_keys`` together
+with the question it was parsed from. Every run only re-parses markets whose
+question is new or changed, then rebuilds ``market_clusters`` /
+``cluster_markets`` for just the keys those markets left or joined. A key
+becomes a cluster once it has MIN_CLUSTER_SIZE markets; ``sort_value`` holds
+each market's threshold.
+
+Related clusters group the remaining active markets whose question and
+description are near-duplicates (MinHash/LSH, see ``app.clustering``). They
+are recomputed each run but only the difference is written back; each is
+keyed by its lowest market ID so cluster IDs stay stable while membership is
+unchanged. ``sort_value`` is the member's volume rank and the title is the
+top-volume member's question. The editorial feed shows them as RELATED
+clusters alongside the threshold STORY clusters.
+"""
+
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.clustering import (
+    MIN_CLUSTER_SIZE,
+    RELATED_DESCRIPTION_CHARS,
+    cluster_key,
+    cluster_title,
+    related_groups,
+)
+
+logger = logging.getLogger(__name__)
+
+CHANGED_QUESTIONS_SQL = text("""
+    SELECT m.id, m.question, k.cluster_key AS previous_key
+    FROM markets m
+    LEFT JOIN market_cluster_keys k ON k.market_id = m.id
+    WHERE k.market_id IS NULL OR k.question IS DISTINCT FROM m.question
+""")
+
+UPSERT_KEYS_SQL = text("""
+    INSERT INTO market_cluster_keys (market_id, question, cluster_key, sort_value, subject)
+    SELECT t.market_id, t.question, t.cluster_key, t.sort_value, t.subject
+    FROM unnest(
+        CAST(:market_id AS TEXT[]),
+        CAST(:question AS TEXT[]),
+        CAST(:cluster_key AS TEXT[]),
+        CAST(:sort_value AS DOUBLE PRECISION[]),
+        CAST(:subject AS TEXT[])
+    ) AS t(market_id, question, cluster_key, sort_value, subject)
+    ON CONFLICT (market_id) DO UPDATE SET
+        question = EXCLUDED.question,
+        cluster_key = EXCLUDED.cluster_key,
+        sort_value = EXCLUDED.sort_value,
+        subject = EXCLUDED.subject
+""")
+
+# Keys with enough markets, and the subject of their lowest threshold.
+QUALIFYING_KEYS_SQL = text("""
+    SELECT DISTINCT ON (cluster_key) cluster_key, subject
+    FROM market_cluster_keys
+    WHERE cluster_key = ANY(CAST(:keys AS TEXT[]))
+        AND cluster_key IN (
+            SELECT cluster_key FROM market_cluster_keys
+            WHERE cluster_key = ANY(CAST(:keys AS TEXT[]))
+            GROUP BY cluster_key
+            HAVING COUNT(*) >= :min_size
+        )
+    ORDER BY cluster_key, sort_value, market_id
+""")
+
+
+# Active markets outside threshold clusters, highest volume first.
+RELATED_CANDIDATES_SQL = text("""
+    SELECT m.id, m.question, LEFT(m.description, :description_chars) AS description
+    FROM markets m
+    LEFT JOIN market_latest l ON l.market_id = m.id
+    WHERE m.status = 'active'
+        AND NOT EXISTS (
+            SELECT 1
+            FROM cluster_markets cm
+            JOIN market_clusters c ON c.id = cm.cluster_id
+            WHERE cm.market_id = m.id AND c.cluster_type = 'threshold'
+        )
+    ORDER BY COALESCE(l.volume, 0) DESC, m.id
+""")
+
+
+def ensure_cluster_tables(session: Session):
+    """Create the cluster key cache and key column on deployments that predate them."""
+    session.execute(text("""
+        CREATE TABLE IF NOT EXISTS market_cluster_keys (
+            market_id TEXT PRIMARY KEY REFERENCES markets(id) ON DELETE CASCADE,
+            question TEXT NOT NULL,
+            cluster_key TEXT,
+            sort_value DOUBLE PRECISION,
+            subject TEXT
+        )
+    """))
+    session.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_market_cluster_keys_key ON market_cluster_keys(cluster_key)"
+    ))
+    session.execute(text("ALTER TABLE market_clusters ADD COLUMN IF NOT EXISTS cluster_key TEXT"))
+    session.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_market_clusters_key ON market_clusters(cluster_key)"
+    ))
+
+
+def update_clusters(session: Session) -> int:
+    """Re-parse new or changed questions and rebuild the clusters they touch.
+
+    Returns the number of markets re-parsed.
+    """
+    changed = session.execute(CHANGED_QUESTIONS_SQL).fetchall()
+    if not changed:
+        return 0
+
+    columns = {"market_id": [], "question": [], "cluster_key": [], "sort_value": [], "subject": []}
+    touched_keys = set()
+    for row in changed:
+        parsed = cluster_key(row.question)
+        key, threshold, subject = parsed if parsed else (None, None, None)
+        columns["market_id"].append(row.id)
+        columns["question"].append(row.question)
+        columns["cluster_key"].append(key)
+        columns["sort_value"].append(threshold)
+        columns["subject"].append(subject)
+        touched_keys.update(k for k in (key, row.previous_key) if k is not None)
+    session.execute(UPSERT_KEYS_SQL, columns)
+
+    if touched_keys:
+        _rebuild_clusters(session, sorted(touched_keys))
+
+    logger.info(
+        "Parsed %s new or changed questions, %s cluster keys touched",
+        len(changed),
+        len(touched_keys),
+    )
+    return len(changed)
+
+
+def _rebuild_clusters(session: Session, keys: list[str]):
+    """Recreate membership for ``keys``, dropping keys below MIN_CLUSTER_SIZE."""
+    qualifying = session.execute(
+        QUALIFYING_KEYS_SQL, {"keys": keys, "min_size": MIN_CLUSTER_SIZE}
+    ).fetchall()
+
+    session.execute(
+        text("""
+            DELETE FROM market_clusters
+            WHERE cluster_key = ANY(CAST(:keys AS TEXT[]))
+                AND NOT (cluster_key = ANY(CAST(:qualifying AS TEXT[])))
+        """),
+        {"keys": keys, "qualifying": [row.cluster_key for row in qualifying]},
+    )
+    if not qualifying:
+        return
+
+    session.execute(
+        text("""
+            INSERT INTO market_clusters (cluster_key, title, cluster_type, updated_at)
+            SELECT t.cluster_key, t.title, 'threshold', NOW()
+            FROM unnest(CAST(:cluster_key AS TEXT[]), CAST(:title AS TEXT[])) AS t(cluster_key, title)
+            ON CONFLICT (cluster_key) DO UPDATE SET
+                title = EXCLUDED.title,
+                updated_at = EXCLUDED.updated_at
+        """),
+        {
+            "cluster_key": [row.cluster_key for row in qualifying],
+            "title": [cluster_title(row.subject) for row in qualifying],
+        },
+    )
+    session.execute(
+        text("""
+            DELETE FROM cluster_markets
+            WHERE cluster_id IN (
+                SELECT id FROM market_clusters WHERE cluster_key = ANY(CAST(:keys AS TEXT[]))
+            )
+        """),
+        {"keys": keys},
+    )
+    session.execute(
+        text("""
+            INSERT INTO cluster_markets (cluster_id, market_id, sort_value)
+            SELECT c.id, k.market_id, k.sort_value
+            FROM market_cluster_keys k
+            JOIN market_clusters c ON c.cluster_key = k.cluster_key
+            WHERE k.cluster_key = ANY(CAST(:keys AS TEXT[]))
+        """),
+        {"keys": keys},
+    )
+
+
+def update_related_clusters(session: Session) -> int:
+    """Recompute related clusters over active non-threshold markets.
+
+    Returns the number of related clusters stored.
+    """
+    rows = session.execute(
+        RELATED_CANDIDATES_SQL, {"description_chars": RELATED_DESCRIPTION_CHARS}
+    ).fetchall()
+    groups = related_groups([(row.question, row.description) for row in rows])
+
+    clusters = {"cluster_key": [], "title": []}
+    members = {"cluster_key": [], "market_id": [], "sort_value": []}
+    for group in groups:
+        # Rows are in volume order, so the group's first index is its top market.
+        group.sort()
+        key = f"related:{min(rows[i].id for i in group)}"
+        clusters["cluster_key"].append(key)
+        clusters["title"].append(rows[group[0]].question)
+        for rank, i in enumerate(group, start=1):
+            members["cluster_key"].append(key)
+            members["market_id"].append(rows[i].id)
+            members["sort_value"].append(rank)
+
+    # Apply only the difference from the stored clusters, so unchanged
+    # clusters and memberships are not rewritten every run.
+    session.execute(
+        text("""
+            DELETE FROM market_clusters
+            WHERE cluster_type = 'related'
+                AND NOT (cluster_key = ANY(CAST(:keys AS TEXT[])))
+        """),
+        {"keys": clusters["cluster_key"]},
+    )
+    if groups:
+        _store_related_memberships(session, clusters, members)
+
+    logger.info("Stored %s related clusters over %s active markets", len(groups), len(rows))
+    return len(groups)
+
+
+def _store_related_memberships(session: Session, clusters: dict, members: dict):
+    """Upsert related clusters and add, move or drop only changed memberships."""
+    session.execute(
+        text("""
+            INSERT INTO market_clusters (cluster_key, title, cluster_type, updated_at)
+            SELECT t.cluster_key, t.title, 'related', NOW()
+            FROM unnest(CAST(:cluster_key AS TEXT[]), CAST(:title AS TEXT[])) AS t(cluster_key, title)
+            ON CONFLICT (cluster_key) DO UPDATE SET
+                title = EXCLUDED.title,
+                updated_at = EXCLUDED.updated_at
+            WHERE market_clusters.title IS DISTINCT FROM EXCLUDED.title
+        """),
+        clusters,
+    )
+    session.execute(
+        text("""
+            DELETE FROM cluster_markets cm
+            USING market_clusters c
+            WHERE c.id = cm.cluster_id
+                AND c.cluster_type = 'related'
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM unnest(CAST(:cluster_key AS TEXT[]), CAST(:market_id AS TEXT[]))
+                        AS t(cluster_key, market_id)
+                    WHERE t.cluster_key = c.cluster_key AND t.market_id = cm.market_id
+                )
+        """),
+        members,
+    )
+    session.execute(
+        text("""
+            INSERT INTO cluster_markets (cluster_id, market_id, sort_value)
+            SELECT c.id, t.market_id, t.sort_value
+            FROM unnest(
+                CAST(:cluster_key AS TEXT[]),
+                CAST(:market_id AS TEXT[]),
+                CAST(:sort_value AS DOUBLE PRECISION[])
+            ) AS t(cluster_key, market_id, sort_value)
+            JOIN market_clusters c ON c.cluster_key = t.cluster_key
+            ON CONFLICT (cluster_id, market_id) DO UPDATE SET
+                sort_value = EXCLUDED.sort_value
+            WHERE cluster_markets.sort_value IS DISTINCT FROM EXCLUDED.sort_value
+        """),
+        members,
+    )
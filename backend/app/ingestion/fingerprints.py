@@ -0,0 +1,112 @@
+"""Change detection for snapshot writes.
+
+A snapshot row is only appended when a market's prices, volume or open
+interest differ from the last row written for it, or when the last write is
+older than SNAPSHOT_HEARTBEAT_MINUTES. The last-written fingerprint and its
+write time are kept per market in one Redis hash, so every worker process
+shares the same view.
+
+Storage becomes sparse but stays exact for readers: the newest snapshot at
+or before any instant still carries the market's values at that instant,
+and the heartbeat bounds how old the newest row can be.
+
+An entry older than the heartbeat no longer suppresses any write, so after
+each full sweep those entries (markets that dropped out of the feeds) are
+pruned to keep the hash bounded by the set of live markets.
+"""
+
+import logging
+from datetime import datetime
+
+from app.ingestion.normalize import NormalizedMarket
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINTS_KEY = "polynews:snapshot:fingerprints"
+PRUNE_BATCH_SIZE = 1000
+
+
+def snapshot_fingerprint(market_data: NormalizedMarket) -> str:
+    """Fingerprint a market's snapshot values at the precision they are stored with."""
+    return (
+        f"{float(market_data.yes_price):.4f}:"
+        f"{float(market_data.no_price):.4f}:"
+        f"{float(market_data.volume):.2f}:"
+        f"{float(market_data.open_interest):.2f}"
+    )
+
+
+class SnapshotFingerprints:
+    """Redis-backed record of the last snapshot written per market."""
+
+    def __init__(self, rds, heartbeat_seconds: int):
+        self.rds = rds
+        self.heartbeat_seconds = heartbeat_seconds
+
+    def changed(self, markets: list[NormalizedMarket], now: datetime) -> set[str]:
+        """
+        Return IDs of markets that need a new snapshot.
+
+        If Redis cannot be read, every market is treated as changed.
+        """
+        ids = [m.id for m in markets]
+        if not ids:
+            return set()
+        try:
+            stored = self.rds.hmget(FINGERPRINTS_KEY, ids)
+        except Exception:
+            logger.exception("Failed to read snapshot fingerprints, writing all snapshots")
+            return set(ids)
+
+        now_ts = now.timestamp()
+        changed = set()
+        for market_data, entry in zip(markets, stored):
+            if not entry:
+                changed.add(market_data.id)
+                continue
+            fingerprint, _, written_at = entry.rpartition("|")
+            try:
+                stale = now_ts - float(written_at) >= self.heartbeat_seconds
+            except ValueError:
+                stale = True
+            if stale or fingerprint != snapshot_fingerprint(market_data):
+                changed.add(market_data.id)
+        return changed
+
+    def remember(self, markets: list[NormalizedMarket], now: datetime) -> None:
+        """Record fingerprints for snapshots that were committed."""
+        if not markets:
+            return
+        now_ts = now.timestamp()
+        try:
+            self.rds.hset(
+                FINGERPRINTS_KEY,
+                mapping={
+                    m.id: f"{snapshot_fingerprint(m)}|{now_ts}"
+                    for m in markets
+                },
+            )
+        except Exception:
+            logger.exception("Failed to store snapshot fingerprints")
+
+    def prune(self, now: datetime) -> int:
+        """Delete entries older than the heartbeat. Returns the number removed."""
+        cutoff = now.timestamp() - self.heartbeat_seconds
+        expired = []
+        removed = 0
+        try:
+            for market_id, entry in self.rds.hscan_iter(FINGERPRINTS_KEY, count=PRUNE_BATCH_SIZE):
+                try:
+                    written_at = float(entry.rpartition("|")[2])
+                except ValueError:
+                    written_at = 0.0
+                if written_at < cutoff:
+                    expired.append(market_id)
+                if len(expired) >= PRUNE_BATCH_SIZE:
+                    removed += self.rds.hdel(FINGERPRINTS_KEY, *expired)
+                    expired = []
+            if expired:
+                removed += self.rds.hdel(FINGERPRINTS_KEY, *expired)
+        except Exception:
+            logger.exception("Failed to prune snapshot fingerprints")
+        return removed
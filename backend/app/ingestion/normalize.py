@@ -0,0 +1,128 @@
+"""Normalization of raw Gamma market dicts.
+
+``normalize_market`` turns one raw Gamma market into a compact, slotted
+``NormalizedMarket`` record. It runs for every market on every cycle (and
+for every row of a backfill), so JSON-in-string fields are decoded with
+orjson, and timestamps, outcome lists and category mappings are memoized:
+most of them repeat from one cycle to the next.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+
+import orjson
+
+from app.api.categories import map_category
+
+
+@dataclass(slots=True)
+class NormalizedMarket:
+    """One market as written to ``markets`` and ``snapshots``."""
+
+    id: str
+    question: str
+    description: str
+    category: str
+    resolution_date: Optional[datetime]
+    closed_time: Optional[datetime]
+    resolution_status: Optional[str]
+    created_at: datetime
+    status: str
+    outcomes: Optional[tuple]
+    image_url: Optional[str]
+    slug: Optional[str]
+    yes_price: float
+    no_price: float
+    volume: float
+    open_interest: float
+
+
+@lru_cache(maxsize=65536)
+def parse_timestamp(value: str) -> Optional[datetime]:
+    """Parse a Gamma ISO-8601 timestamp, returning None if it is invalid."""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (ValueError, AttributeError, TypeError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+@lru_cache(maxsize=1024)
+def _parse_outcomes(value: str) -> Optional[tuple]:
+    try:
+        outcomes = orjson.loads(value)
+    except orjson.JSONDecodeError:
+        return None
+    return tuple(outcomes) if isinstance(outcomes, list) else outcomes
+
+
+_map_category = lru_cache(maxsize=1024)(map_category)
+
+
+def _timestamp(value) -> Optional[datetime]:
+    return parse_timestamp(value) if value and isinstance(value, str) else None
+
+
+def _float(value) -> float:
+    try:
+        return float(value or 0)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _prices(outcome_prices) -> tuple[float, float]:
+    if isinstance(outcome_prices, str) and outcome_prices:
+        try:
+            outcome_prices = orjson.loads(outcome_prices)
+        except orjson.JSONDecodeError:
+            return 0.5, 0.5
+    if isinstance(outcome_prices, list) and len(outcome_prices) >= 2:
+        try:
+            return float(outcome_prices[0]), float(outcome_prices[1])
+        except (ValueError, TypeError):
+            pass
+    return 0.5, 0.5
+
+
+def normalize_market(raw: dict) -> NormalizedMarket:
+    """Normalize raw Polymarket data to our schema."""
+    yes_price, no_price = _prices(raw.get("outcomePrices"))
+
+    outcomes = raw.get("outcomes")
+    if not outcomes:
+        outcomes = None
+    elif isinstance(outcomes, str):
+        outcomes = _parse_outcomes(outcomes)
+    elif isinstance(outcomes, list):
+        outcomes = tuple(outcomes)
+
+    active_value = raw.get("active")
+    resolution_status = raw.get("umaResolutionStatus")
+    is_resolved = (
+        bool(raw.get("closed"))
+        or not (True if active_value is None else bool(active_value))
+        or str(resolution_status).lower() == "resolved"
+    )
+
+    return NormalizedMarket(
+        id=str(raw.get("id", "")),
+        question=raw.get("question", ""),
+        description=raw.get("description", ""),
+        category=_map_category(raw.get("category", "") or raw.get("groupItemTitle", "") or ""),
+        resolution_date=_timestamp(raw.get("endDate")),
+        closed_time=_timestamp(raw.get("closedTime")),
+        resolution_status=resolution_status,
+        created_at=_timestamp(raw.get("createdAt")) or datetime.now(timezone.utc),
+        status="resolved" if is_resolved else "active",
+        outcomes=outcomes,
+        image_url=raw.get("image", None),
+        slug=raw.get("slug", None),
+        yes_price=yes_price,
+        no_price=no_price,
+        volume=_float(raw.get("volume", 0)),
+        open_interest=_float(raw.get("liquidity", 0)),
+    )
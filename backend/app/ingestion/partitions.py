@@ -0,0 +1,224 @@
+"""Daily range partitions for the snapshots table.
+
+``snapshots`` is range-partitioned on ``timestamp`` with one partition per UTC
+day, named ``snapshots_pYYYYMMDD``. Ingestion creates partitions a few days
+ahead of time; retention detaches and drops whole partitions, which is far
+cheaper than deleting rows and leaves nothing behind for vacuum.
+
+Deployments whose ``snapshots`` table predates partitioning keep working
+(every helper here is a no-op on an unpartitioned table, and ingestion logs a
+warning) until they are converted once with:
+
+    python -m app.ingestion.partitions convert
+
+The conversion swaps in a partitioned ``snapshots`` table, then moves the old
+rows over one UTC day at a time, newest first, deleting each day from the old
+table in the same transaction so an interrupted run can simply be rerun.
+"""
+
+import argparse
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "snapshots_p"
+LEGACY_TABLE = "snapshots_unpartitioned"
+
+# Keep in sync with init.sql.
+SNAPSHOTS_DDL = (
+    """
+    CREATE TABLE snapshots (
+        market_id TEXT NOT NULL REFERENCES markets(id) ON DELETE CASCADE,
+        timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        yes_price DECIMAL(5,4) NOT NULL,
+        no_price DECIMAL(5,4) NOT NULL,
+        volume DECIMAL(20,2) NOT NULL DEFAULT 0,
+        open_interest DECIMAL(20,2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (market_id, timestamp)
+    ) PARTITION BY RANGE (timestamp)
+    """,
+    "CREATE INDEX idx_snapshots_timestamp ON snapshots(timestamp DESC)",
+    "CREATE INDEX idx_snapshots_market_time ON snapshots(market_id, timestamp DESC)",
+)
+
+_unpartitioned_warned = False
+
+
+def snapshots_partitioned(session: Session) -> bool:
+    """Return True if snapshots is a partitioned table."""
+    return bool(session.execute(text("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table
+            WHERE partrelid = to_regclass('snapshots')
+        )
+    """)).scalar())
+
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def existing_partitions(session: Session) -> dict[date, str]:
+    """Map each attached daily partition to its table name."""
+    rows = session.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass('snapshots')
+    """)).fetchall()
+
+    partitions = {}
+    for row in rows:
+        name = row.relname
+        if not name.startswith(PARTITION_PREFIX):
+            continue
+        try:
+            day = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()
+        except ValueError:
+            continue
+        partitions[day] = name
+    return partitions
+
+
+def ensure_snapshot_partitions(session: Session, start: date, end: date) -> int:
+    """Create any missing daily partitions for ``start`` through ``end`` inclusive."""
+    global _unpartitioned_warned
+    if not snapshots_partitioned(session):
+        if not _unpartitioned_warned:
+            logger.warning(
+                "snapshots is not partitioned; retention falls back to row deletes. "
+                "Convert it once with: python -m app.ingestion.partitions convert"
+            )
+            _unpartitioned_warned = True
+        return 0
+
+    existing = existing_partitions(session)
+    created = 0
+    day = start
+    while day <= end:
+        if day not in existing:
+            lower = datetime.combine(day, time.min, tzinfo=timezone.utc)
+            upper = lower + timedelta(days=1)
+            session.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {partition_name(day)}
+                PARTITION OF snapshots
+                FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')
+            """))
+            created += 1
+        day += timedelta(days=1)
+
+    if created:
+        logger.info("Created %s snapshot partitions through %s", created, end.isoformat())
+    return created
+
+
+def drop_snapshot_partitions_before(session: Session, cutoff: date) -> list[str]:
+    """Detach and drop every daily partition that ends on or before ``cutoff``."""
+    if not snapshots_partitioned(session):
+        return []
+
+    dropped = []
+    for day, name in sorted(existing_partitions(session).items()):
+        if day + timedelta(days=1) > cutoff:
+            break
+        session.execute(text(f"ALTER TABLE snapshots DETACH PARTITION {name}"))
+        session.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+
+    if dropped:
+        logger.info("Dropped %s snapshot partitions before %s", len(dropped), cutoff.isoformat())
+    return dropped
+
+
+def convert_snapshots_to_partitioned(engine, days_ahead: int = 3) -> int:
+    """
+    Move an unpartitioned snapshots table into daily partitions (one-off).
+
+    Safe to rerun after an interruption. Returns the number of rows moved.
+    """
+    from app.ingestion.trending import ensure_trending_view
+
+    with Session(engine) as session:
+        if not snapshots_partitioned(session):
+            logger.info("Swapping in a partitioned snapshots table")
+            session.execute(text("LOCK TABLE snapshots IN ACCESS EXCLUSIVE MODE"))
+            # The view depends on the old table; it is rebuilt on the new one.
+            session.execute(text("DROP MATERIALIZED VIEW IF EXISTS trending_view"))
+            session.execute(text(f"ALTER TABLE snapshots RENAME TO {LEGACY_TABLE}"))
+            # Free the index (and primary key) names for the new table.
+            for index in session.execute(
+                text("SELECT indexname FROM pg_indexes WHERE tablename = :table"),
+                {"table": LEGACY_TABLE},
+            ).scalars().all():
+                session.execute(text(f"ALTER INDEX {index} RENAME TO {index}_unpartitioned"))
+            for statement in SNAPSHOTS_DDL:
+                session.execute(text(statement))
+            ensure_trending_view(session)
+            session.commit()
+
+        if session.execute(text(f"SELECT to_regclass('{LEGACY_TABLE}')")).scalar() is None:
+            return 0
+
+        first, last = session.execute(
+            text(f"SELECT MIN(timestamp), MAX(timestamp) FROM {LEGACY_TABLE}")
+        ).one()
+        today = datetime.now(timezone.utc).date()
+        first_day = first.astimezone(timezone.utc).date() if first else today
+        last_day = last.astimezone(timezone.utc).date() if last else today
+        ensure_snapshot_partitions(session, first_day, max(last_day, today + timedelta(days=days_ahead)))
+        session.commit()
+
+    moved = 0
+    day: Optional[date] = last_day if first else None
+    while day is not None and day >= first_day:
+        lower = datetime.combine(day, time.min, tzinfo=timezone.utc)
+        bounds = {"lower": lower, "upper": lower + timedelta(days=1)}
+        with Session(engine) as session:
+            moved += session.execute(
+                text(f"""
+                    INSERT INTO snapshots (market_id, timestamp, yes_price, no_price, volume, open_interest)
+                    SELECT market_id, timestamp, yes_price, no_price, volume, open_interest
+                    FROM {LEGACY_TABLE}
+                    WHERE timestamp >= :lower AND timestamp < :upper
+                    ON CONFLICT (market_id, timestamp) DO NOTHING
+                """),
+                bounds,
+            ).rowcount
+            session.execute(
+                text(f"DELETE FROM {LEGACY_TABLE} WHERE timestamp >= :lower AND timestamp < :upper"),
+                bounds,
+            )
+            session.commit()
+        day -= timedelta(days=1)
+
+    with Session(engine) as session:
+        session.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+        session.commit()
+    logger.info("Moved %s snapshots into daily partitions", moved)
+    return moved
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.ingestion.partitions",
+        description="Snapshot partition maintenance.",
+    )
+    parser.add_argument("command", choices=("convert",))
+    parser.parse_args(argv)
+
+    from app.config import get_settings
+    from app.ingestion.resources import get_sync_engine
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    convert_snapshots_to_partitioned(
+        get_sync_engine(), days_ahead=get_settings().SNAPSHOT_PARTITION_DAYS_AHEAD
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,15 @@
 """Polymarket API client for market data ingestion."""
 
-import json
 import httpx
 import logging
-from typing import Optional
+import orjson
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Generator, Iterator, Optional
 from datetime import datetime, timezone
 
 from app.config import get_settings
-from app.api.categories import map_category
+from app.ingestion.normalize import NormalizedMarket, normalize_market, parse_timestamp
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -17,12 +19,16 @@ class PolymarketClient:
     """Synchronous client for Polymarket's Gamma API.
 
     Uses httpx.Client (sync) so it works safely in Celery workers
-    and background threads without event loop issues.
+    and background threads without event loop issues. Page fetches can be
+    fanned out over a bounded thread pool; every request first takes a
+    token from the optional shared rate limiter.
     """
 
     BASE_URL = settings.POLYMARKET_API_URL
 
-    def __init__(self):
+    def __init__(self, rate_limiter=None, max_workers: int = settings.POLYMARKET_MAX_CONCURRENCY):
+        self.rate_limiter = rate_limiter
+        self.max_workers = max(max_workers, 1)
         self.client = httpx.Client(
             base_url=self.BASE_URL,
             timeout=30.0,
@@ -30,11 +36,184 @@ class PolymarketClient:
                 "Accept": "application/json",
                 "User-Agent": "FTS/1.0",
             },
+            limits=httpx.Limits(max_connections=self.max_workers),
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="polymarket",
         )
 
     def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
         self.client.close()
 
+    def _get(self, path: str, params=None) -> httpx.Response:
+        """Issue a GET after taking a token from the shared rate limiter."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        return self.client.get(path, params=params)
+
+    def iter_active_pages(
+        self,
+        batch_size: int,
+        max_pages: int,
+    ) -> Iterator[list[NormalizedMarket]]:
+        """
+        Fetch active markets (by volume), one page per worker in flight.
+
+        Yields pages in offset order and stops at the first empty page.
+        """
+        for _, markets in self._iter_page_window(
+            lambda offset: self.fetch_markets(
+                limit=batch_size,
+                offset=offset,
+                active=True,
+                closed=False,
+                order="volume",
+                ascending=False,
+            ),
+            batch_size,
+            max_pages,
+            self.max_workers,
+        ):
+            if not markets:
+                return
+            yield markets
+
+    def iter_resolved_pages(
+        self,
+        batch_size: int,
+        max_pages: int,
+        cutoff: datetime,
+        speculative_pages: int = settings.RESOLVED_SPECULATIVE_PAGES,
+    ) -> Iterator[list[NormalizedMarket]]:
+        """
+        Fetch recently resolved markets, newest first, until ``cutoff``.
+
+        Up to ``speculative_pages`` pages are kept in flight so that the
+        common case (cutoff reached within the first few pages) costs one
+        round-trip. Pages are yielded in offset order and fetching stops
+        once a page reaches closed_time older than the cutoff.
+        """
+        for p, markets in self._iter_page_window(
+            lambda offset: self.fetch_recently_resolved_markets(limit=batch_size, offset=offset),
+            batch_size,
+            max_pages,
+            speculative_pages,
+        ):
+            if not markets:
+                return
+            yield markets
+
+            closed_times = [m.closed_time for m in markets if m.closed_time]
+            if closed_times:
+                oldest_closed_time = min(closed_times)
+                if oldest_closed_time < cutoff:
+                    logger.info(
+                        "Resolved fetch reached cutoff at offset %s (oldest closed_time=%s)",
+                        (p + 1) * batch_size,
+                        oldest_closed_time.isoformat(),
+                    )
+                    return
+            elif len(markets) < batch_size:
+                return
+
+    def iter_updated_pages(
+        self,
+        closed: bool,
+        since: datetime,
+        batch_size: int,
+        max_pages: int,
+        volume_min: Optional[float] = None,
+        speculative_pages: int = 1,
+    ) -> Generator[list[NormalizedMarket], None, bool]:
+        """
+        Fetch open (or closed) markets updated at or after ``since``, newest first.
+
+        Gamma has no updatedAt filter, so pages are ordered by updatedAt and
+        fetched until one reaches a market older than ``since``. Deltas
+        usually fit in one page, so pages are requested one at a time unless
+        ``speculative_pages`` says otherwise. Only markets updated since
+        ``since`` are yielded.
+
+        The generator returns True once it has reached ``since`` (or the end
+        of the feed), and False if ``max_pages`` ran out first.
+        """
+        params = {
+            "order": "updatedAt",
+            "ascending": "false",
+            "closed": str(closed).lower(),
+        }
+        if not closed:
+            params["active"] = "true"
+        if volume_min:
+            params["volume_num_min"] = volume_min
+
+        for p, raw_markets in self._iter_page_window(
+            lambda offset: self._fetch_raw_market_list(
+                {**params, "limit": batch_size, "offset": offset}
+            ),
+            batch_size,
+            max_pages,
+            speculative_pages,
+        ):
+            markets = []
+            reached_since = False
+            for raw in raw_markets:
+                updated_at = raw.get("updatedAt")
+                updated_at = parse_timestamp(updated_at) if isinstance(updated_at, str) else None
+                if updated_at is not None and updated_at < since:
+                    reached_since = True
+                    continue
+                if raw.get("question"):
+                    markets.append(normalize_market(raw))
+
+            if markets:
+                yield markets
+            if reached_since or len(raw_markets) < batch_size:
+                return True
+
+        logger.warning(
+            "Updated-market fetch (closed=%s) hit %s pages before reaching %s",
+            closed,
+            max_pages,
+            since.isoformat(),
+        )
+        return False
+
+    def _iter_page_window(
+        self,
+        fetch_page: Callable[[int], list],
+        batch_size: int,
+        max_pages: int,
+        speculative_pages: int,
+    ) -> Iterator[tuple[int, list]]:
+        """
+        Yield (page, result) in offset order, ``speculative_pages`` at a time.
+
+        At most that many requests (capped at the pool size) are in flight:
+        each time the caller takes a page, the next offset is requested. The
+        caller stops fetching by returning from its loop; requests still in
+        flight are cancelled.
+        """
+        window = max(1, min(speculative_pages, self.max_workers))
+        in_flight: deque[tuple[int, Future]] = deque()
+        next_page = 0
+        try:
+            while True:
+                while next_page < max_pages and len(in_flight) < window:
+                    in_flight.append(
+                        (next_page, self._executor.submit(fetch_page, next_page * batch_size))
+                    )
+                    next_page += 1
+                if not in_flight:
+                    return
+                page, future = in_flight.popleft()
+                yield page, future.result()
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+
     def fetch_markets(
         self,
         limit: int = 100,
@@ -43,33 +222,53 @@ class PolymarketClient:
         closed: Optional[bool] = False,
         order: str = "volume",
         ascending: bool = False,
-    ) -> list[dict]:
+    ) -> list[NormalizedMarket]:
         """
         Fetch markets from Polymarket Gamma API.
 
         Returns normalized market data ready for database insertion.
         """
+        params = {
+            "limit": limit,
+            "offset": offset,
+            "order": order,
+            "ascending": str(ascending).lower(),
+        }
+        if active is not None:
+            params["active"] = str(active).lower()
+        if closed is not None:
+            params["closed"] = str(closed).lower()
+
+        return self._fetch_market_list(params)
+
+    def fetch_markets_by_ids(self, market_ids: list[str]) -> list[NormalizedMarket]:
+        """Fetch several markets in one Gamma request (repeated ``id`` params)."""
+        params = [("id", market_id) for market_id in market_ids]
+        params.append(("limit", len(market_ids)))
+        return self._fetch_market_list(params)
+
+    def _fetch_market_list(self, params) -> list[NormalizedMarket]:
+        """GET /markets with the given params and normalize the result list."""
+        return [
+            normalize_market(m)
+            for m in self._fetch_raw_market_list(params)
+            if m.get("question")
+        ]
+
+    def _fetch_raw_market_list(self, params) -> list[dict]:
+        """GET /markets with the given params and return the raw result list."""
         try:
-            params = {
-                "limit": limit,
-                "offset": offset,
-                "order": order,
-                "ascending": str(ascending).lower(),
-            }
-            if active is not None:
-                params["active"] = str(active).lower()
-            if closed is not None:
-                params["closed"] = str(closed).lower()
-
-            response = self.client.get("/markets", params=params)
+            response = self._get("/markets", params=params)
             response.raise_for_status()
 
-            raw_markets = response.json()
+            # Parsed straight from the body bytes; callers normalize and drop
+            # the raw dicts page by page.
+            raw_markets = orjson.loads(response.content)
             if not isinstance(raw_markets, list):
                 logger.warning("Unexpected response format from Polymarket API")
                 return []
 
-            return [self._normalize_market(m) for m in raw_markets if m.get("question")]
+            return raw_markets
 
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 429:
@@ -85,7 +284,7 @@ class PolymarketClient:
         self,
         limit: int = 100,
         offset: int = 0,
-    ) -> list[dict]:
+    ) -> list[NormalizedMarket]:
         """Fetch recently closed/resolved markets.
 
         Gamma ordering can vary between deployments. We prefer closedTime ordering
@@ -113,127 +312,131 @@ class PolymarketClient:
                 )
             raise
 
-    def fetch_market(self, market_id: str) -> Optional[dict]:
+    def fetch_market(self, market_id: str) -> Optional[NormalizedMarket]:
         """Fetch a single market by ID."""
         try:
-            response = self.client.get(f"/markets/{market_id}")
-            response.raise_for_status()
-            data = response.json()
-            if data and data.get("question"):
-                return self._normalize_market(data)
-            return None
+            return self._fetch_market_or_raise(market_id)
         except Exception as e:
             logger.error(f"Error fetching market {market_id}: {e}")
             return None
 
-    def _normalize_market(self, raw: dict) -> dict:
-        """Normalize raw Polymarket data to our schema."""
-        # Parse outcome prices
-        outcome_prices = raw.get("outcomePrices", "")
-        yes_price = 0.5
-        no_price = 0.5
-
-        if isinstance(outcome_prices, str) and outcome_prices:
-            try:
-                prices = json.loads(outcome_prices)
-                if isinstance(prices, list) and len(prices) >= 2:
-                    yes_price = float(prices[0])
-                    no_price = float(prices[1])
-            except (json.JSONDecodeError, ValueError, IndexError):
-                pass
-        elif isinstance(outcome_prices, list) and len(outcome_prices) >= 2:
-            try:
-                yes_price = float(outcome_prices[0])
-                no_price = float(outcome_prices[1])
-            except (ValueError, IndexError):
-                pass
-
-        # Parse volume
-        volume = 0.0
-        try:
-            volume = float(raw.get("volume", 0) or 0)
-        except (ValueError, TypeError):
-            pass
+    def _fetch_market_or_raise(self, market_id: str) -> NormalizedMarket:
+        """Fetch a single market by ID, raising on any failure."""
+        response = self._get(f"/markets/{market_id}")
+        if response.status_code == 429:
+            logger.warning("Rate limited by Polymarket API")
+            raise RateLimitError("Polymarket API rate limit exceeded")
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        if not data or not data.get("question"):
+            raise LookupError(f"Market {market_id} not found in Gamma response")
+        return normalize_market(data)
 
-        # Parse liquidity / open interest
-        open_interest = 0.0
-        try:
-            open_interest = float(raw.get("liquidity", 0) or 0)
-        except (ValueError, TypeError):
-            pass
-
-        # Parse dates
-        resolution_date = None
-        if raw.get("endDate"):
-            try:
-                resolution_date = datetime.fromisoformat(
-                    raw["endDate"].replace("Z", "+00:00")
-                )
-            except (ValueError, AttributeError):
-                pass
-
-        closed_time = None
-        if raw.get("closedTime"):
-            try:
-                closed_time = datetime.fromisoformat(
-                    raw["closedTime"].replace("Z", "+00:00")
-                )
-            except (ValueError, AttributeError):
-                pass
-
-        created_at = datetime.now(timezone.utc)
-        if raw.get("createdAt"):
-            try:
-                created_at = datetime.fromisoformat(
-                    raw["createdAt"].replace("Z", "+00:00")
-                )
-            except (ValueError, AttributeError):
-                pass
-
-        # Map category
-        raw_category = raw.get("category", "") or raw.get("groupItemTitle", "") or ""
-        category = map_category(raw_category)
-
-        # Parse outcomes
-        outcomes = None
-        if raw.get("outcomes"):
-            try:
-                if isinstance(raw["outcomes"], str):
-                    outcomes = json.loads(raw["outcomes"])
-                else:
-                    outcomes = raw["outcomes"]
-            except Exception:
-                pass
-
-        active_value = raw.get("active")
-        closed_value = raw.get("closed")
-        resolution_status = raw.get("umaResolutionStatus")
-        is_active = True if active_value is None else bool(active_value)
-        is_closed = bool(closed_value)
-        is_resolved = (
-            is_closed
-            or not is_active
-            or str(resolution_status).lower() == "resolved"
+    def fetch_price_history(
+        self,
+        market_id: str,
+        start: datetime,
+        end: datetime,
+        fidelity: int = settings.BACKFILL_HISTORY_FIDELITY,
+    ) -> list[tuple[datetime, float]]:
+        """
+        Fetch a market's YES price history from the CLOB as (time, price) pairs.
+
+        The market's YES token is looked up on Gamma first. ``fidelity`` is
+        the spacing between points in minutes.
+        """
+        response = self._get(f"/markets/{market_id}")
+        response.raise_for_status()
+        token_ids = orjson.loads(response.content).get("clobTokenIds") or []
+        if isinstance(token_ids, str):
+            token_ids = orjson.loads(token_ids)
+        if not token_ids:
+            raise LookupError(f"Market {market_id} has no CLOB token")
+
+        response = self._get(
+            f"{settings.POLYMARKET_CLOB_URL}/prices-history",
+            params={
+                "market": token_ids[0],
+                "startTs": int(start.timestamp()),
+                "endTs": int(end.timestamp()),
+                "fidelity": fidelity,
+            },
         )
+        response.raise_for_status()
+        return [
+            (datetime.fromtimestamp(point["t"], tz=timezone.utc), float(point["p"]))
+            for point in orjson.loads(response.content).get("history", [])
+        ]
 
-        return {
-            "id": str(raw.get("id", "")),
-            "question": raw.get("question", ""),
-            "description": raw.get("description", ""),
-            "category": category,
-            "resolution_date": resolution_date,
-            "closed_time": closed_time,
-            "resolution_status": resolution_status,
-            "created_at": created_at,
-            "status": "resolved" if is_resolved else "active",
-            "outcomes": outcomes,
-            "image_url": raw.get("image", None),
-            "slug": raw.get("slug", None),
-            "yes_price": yes_price,
-            "no_price": no_price,
-            "volume": volume,
-            "open_interest": open_interest,
-        }
+    def iter_markets_by_ids(
+        self,
+        market_ids: list[str],
+        batch_size: int = settings.RECONCILE_BATCH_SIZE,
+    ) -> Iterator[tuple[str, Optional[NormalizedMarket], Optional[str]]]:
+        """
+        Look up markets by ID, yielding (market_id, market, error) as results arrive.
+
+        IDs are first requested in multi-ID batches. Any ID a batch does not
+        return (or whose batch request fails) is retried with a direct lookup.
+        All requests fan out over the thread pool under the shared rate limiter.
+        Exactly one of ``market`` and ``error`` is set for each yielded ID.
+
+        A RateLimitError from any lookup stops the whole run: IDs not yet
+        yielded are left as they are, for the next run to pick up.
+        """
+        pending = {}
+        yielded = 0
+        for start in range(0, len(market_ids), max(batch_size, 1)):
+            chunk = market_ids[start:start + max(batch_size, 1)]
+            pending[self._executor.submit(self.fetch_markets_by_ids, chunk)] = ("batch", chunk)
+
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, target = pending.pop(future)
+
+                    if kind == "batch":
+                        try:
+                            found = {m.id: m for m in future.result()}
+                        except RateLimitError:
+                            self._log_lookups_deferred(len(market_ids) - yielded)
+                            return
+                        except Exception as e:
+                            logger.warning(
+                                "Batched lookup of %s markets failed, falling back to direct lookups: %s",
+                                len(target),
+                                e,
+                            )
+                            found = {}
+                        for market_id in target:
+                            if market_id in found:
+                                yielded += 1
+                                yield market_id, found[market_id], None
+                            else:
+                                single = self._executor.submit(self._fetch_market_or_raise, market_id)
+                                pending[single] = ("single", market_id)
+                        continue
+
+                    try:
+                        market, error = future.result(), None
+                    except RateLimitError:
+                        self._log_lookups_deferred(len(market_ids) - yielded)
+                        return
+                    except Exception as e:
+                        market, error = None, str(e)
+                    yielded += 1
+                    yield target, market, error
+        finally:
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def _log_lookups_deferred(remaining: int):
+        logger.warning(
+            "Rate limited during market lookups by ID; %s markets left for the next run",
+            remaining,
+        )
 
 
 class RateLimitError(Exception):
@@ -0,0 +1,134 @@
+"""Shared request budget for the Polymarket API.
+
+A token bucket stored in Redis so that every worker thread and Celery
+process draws from the same POLYMARKET_RATE_LIMIT budget. Each granted
+token also increments the ``polynews:requests:daily`` counter in the same
+atomic script, so the daily count reported by /api/health always matches
+the requests that were actually allowed through.
+"""
+
+import logging
+import threading
+import time
+
+from app.config import get_settings
+from app.ingestion.polymarket import RateLimitError
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+BUCKET_KEY = "polynews:ratelimit:polymarket"
+DAILY_COUNTER_KEY = "polynews:requests:daily"
+BACKFILL_BUCKET_KEY = "polynews:ratelimit:polymarket:backfill"
+BACKFILL_DAILY_COUNTER_KEY = "polynews:requests:daily:backfill"
+DAILY_COUNTER_TTL = 86400
+
+# KEYS[1] = bucket hash, KEYS[2] = daily counter
+# ARGV = capacity, refill rate (tokens/sec), now (sec), daily limit, daily ttl
+# Returns {1, 0} when granted, {0, wait_seconds} when empty, {-1, 0} when
+# the daily budget is exhausted. Wait is returned as a string because Lua
+# numbers are truncated to integers on the way back to the client.
+_ACQUIRE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local daily_limit = tonumber(ARGV[4])
+local daily_ttl = tonumber(ARGV[5])
+
+local used = tonumber(redis.call('GET', KEYS[2]) or '0')
+if daily_limit > 0 and used >= daily_limit then
+    return {-1, '0'}
+end
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local granted = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    granted = 1
+    -- The daily window starts with the first request; refreshing the TTL on
+    -- every request would keep the counter alive forever.
+    if redis.call('INCRBY', KEYS[2], 1) == 1 or redis.call('TTL', KEYS[2]) < 0 then
+        redis.call('EXPIRE', KEYS[2], daily_ttl)
+    end
+else
+    wait = (1 - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return {granted, tostring(wait)}
+"""
+
+
+class RateLimiter:
+    """Blocking token bucket shared across threads and processes via Redis.
+
+    If Redis is unavailable the limiter fails open (requests proceed), in line
+    with how the rest of ingestion treats Redis counters as best-effort.
+    """
+
+    def __init__(
+        self,
+        rds,
+        rate_per_minute: int = settings.POLYMARKET_RATE_LIMIT,
+        burst: int = settings.POLYMARKET_RATE_BURST,
+        daily_limit: int = settings.POLYMARKET_DAILY_LIMIT,
+        daily_ttl: int = DAILY_COUNTER_TTL,
+        bucket_key: str = BUCKET_KEY,
+        daily_counter_key: str = DAILY_COUNTER_KEY,
+    ):
+        self.rds = rds
+        self.rate = max(rate_per_minute, 1) / 60.0
+        self.capacity = max(burst, 1)
+        self.daily_limit = daily_limit
+        self.daily_ttl = daily_ttl
+        self.keys = [bucket_key, daily_counter_key]
+        self._script = rds.register_script(_ACQUIRE_SCRIPT)
+        self._lock = threading.Lock()
+        self._redis_failed = False
+
+    def acquire(self) -> None:
+        """Block until a request token is available.
+
+        Raises RateLimitError when the daily request budget is exhausted.
+        """
+        while True:
+            try:
+                status, wait = self._script(
+                    keys=self.keys,
+                    args=[self.capacity, self.rate, time.time(), self.daily_limit, self.daily_ttl],
+                )
+            except Exception:
+                with self._lock:
+                    if not self._redis_failed:
+                        logger.exception("Rate limiter unavailable, allowing requests through")
+                        self._redis_failed = True
+                return
+
+            status = int(status)
+            if status == 1:
+                return
+            if status == -1:
+                raise RateLimitError("Polymarket daily request budget exhausted")
+            time.sleep(min(float(wait), 5.0))
+
+
+class CappedRateLimiter:
+    """Draw from a private capped budget first, then from the shared one.
+
+    Used by backfills so they can never take more than their own share of
+    the shared Polymarket budget away from ingestion.
+    """
+
+    def __init__(self, cap: RateLimiter, shared: RateLimiter):
+        self.cap = cap
+        self.shared = shared
+
+    def acquire(self) -> None:
+        self.cap.acquire()
+        self.shared.acquire()
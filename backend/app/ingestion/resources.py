@@ -0,0 +1,123 @@
+"""Process-lifetime connections for ingestion.
+
+The sync SQLAlchemy engine, the sync Redis client and the PolymarketClient
+are created once per process and reused by every task run, so steady-state
+cycles start with warm Postgres, Redis and HTTP keep-alive connections.
+
+Celery workers build them on ``worker_process_init`` (after the prefork,
+so no connection is shared with the parent) and tear them down on
+``worker_process_shutdown``; any other process creates them lazily on first
+use. Pooled connections are health-checked before reuse.
+"""
+
+import logging
+import threading
+from typing import Optional
+
+import redis
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from app.config import get_settings
+from app.ingestion.polymarket import PolymarketClient
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_lock = threading.RLock()
+_engine: Optional[Engine] = None
+_redis: Optional[redis.Redis] = None
+_polymarket: Optional[PolymarketClient] = None
+_backfill_polymarket: Optional[PolymarketClient] = None
+
+
+def get_sync_engine() -> Engine:
+    """Return the process-wide synchronous SQLAlchemy engine."""
+    global _engine
+    with _lock:
+        if _engine is None:
+            _engine = create_engine(
+                settings.DATABASE_URL_SYNC,
+                pool_pre_ping=True,
+                pool_recycle=settings.INGESTION_POOL_RECYCLE,
+            )
+        return _engine
+
+
+def get_sync_redis() -> redis.Redis:
+    """Return the process-wide synchronous Redis client."""
+    global _redis
+    with _lock:
+        if _redis is None:
+            _redis = redis.from_url(
+                settings.REDIS_URL,
+                decode_responses=True,
+                health_check_interval=settings.INGESTION_REDIS_HEALTH_CHECK_INTERVAL,
+            )
+        return _redis
+
+
+def get_polymarket_client() -> PolymarketClient:
+    """Return the process-wide PolymarketClient, rate limited through Redis."""
+    global _polymarket
+    with _lock:
+        if _polymarket is None:
+            from app.ingestion.ratelimit import RateLimiter
+            _polymarket = PolymarketClient(rate_limiter=RateLimiter(get_sync_redis()))
+        return _polymarket
+
+
+def get_backfill_polymarket_client() -> PolymarketClient:
+    """Return a PolymarketClient for backfills, capped at the backfill share of the budget."""
+    global _backfill_polymarket
+    with _lock:
+        if _backfill_polymarket is None:
+            from app.ingestion.ratelimit import (
+                BACKFILL_BUCKET_KEY,
+                BACKFILL_DAILY_COUNTER_KEY,
+                CappedRateLimiter,
+                RateLimiter,
+            )
+            rds = get_sync_redis()
+            _backfill_polymarket = PolymarketClient(
+                rate_limiter=CappedRateLimiter(
+                    RateLimiter(
+                        rds,
+                        rate_per_minute=settings.BACKFILL_RATE_LIMIT,
+                        burst=1,
+                        daily_limit=settings.BACKFILL_DAILY_LIMIT,
+                        bucket_key=BACKFILL_BUCKET_KEY,
+                        daily_counter_key=BACKFILL_DAILY_COUNTER_KEY,
+                    ),
+                    RateLimiter(rds),
+                ),
+                max_workers=1,
+            )
+        return _backfill_polymarket
+
+
+def init_resources():
+    """Create fresh connections in a newly forked worker process."""
+    global _engine, _redis, _polymarket, _backfill_polymarket
+    with _lock:
+        # Anything inherited from the parent belongs to the parent's sockets.
+        if _engine is not None:
+            _engine.dispose(close=False)
+        _engine = _redis = _polymarket = _backfill_polymarket = None
+        get_sync_engine()
+        get_polymarket_client()
+    logger.info("Ingestion connections initialised")
+
+
+def close_resources():
+    """Close every process-lifetime connection."""
+    global _engine, _redis, _polymarket, _backfill_polymarket
+    with _lock:
+        for client in (_polymarket, _backfill_polymarket):
+            if client is not None:
+                client.close()
+        if _engine is not None:
+            _engine.dispose()
+        if _redis is not None:
+            _redis.close()
+        _engine = _redis = _polymarket = _backfill_polymarket = None
@@ -0,0 +1,215 @@
+"""Snapshot rollup tiers and raw-history retention.
+
+Raw snapshots are aggregated into hourly OHLC rows per market, and hourly
+rows into daily ones. Each run re-aggregates from the newest existing bucket
+(which may have been partial) up to the last complete hour/day, so runs are
+idempotent and cheap. Raw snapshots older than SNAPSHOT_RETENTION_DAYS are
+then removed, but never past what the hourly tier already covers.
+
+Buckets are truncated in UTC regardless of the session TimeZone, matching
+the UTC hour/day bounds computed here and the daily snapshot partitions.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.ingestion.partitions import drop_snapshot_partitions_before, snapshots_partitioned
+
+logger = logging.getLogger(__name__)
+
+# Raw snapshots are deleted in chunks on unpartitioned tables.
+RAW_DELETE_BATCH_SIZE = 50000
+
+
+def ensure_rollup_tables(session: Session):
+    """Create the rollup tables on deployments that predate them."""
+    for table in ("snapshot_rollups_hourly", "snapshot_rollups_daily"):
+        session.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                market_id TEXT NOT NULL REFERENCES markets(id) ON DELETE CASCADE,
+                bucket TIMESTAMPTZ NOT NULL,
+                open_price DECIMAL(5,4) NOT NULL,
+                high_price DECIMAL(5,4) NOT NULL,
+                low_price DECIMAL(5,4) NOT NULL,
+                close_price DECIMAL(5,4) NOT NULL,
+                volume DECIMAL(20,2) NOT NULL DEFAULT 0,
+                open_interest DECIMAL(20,2) NOT NULL DEFAULT 0,
+                samples INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (market_id, bucket)
+            )
+        """))
+        session.execute(
+            text(f"CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table}(bucket DESC)")
+        )
+
+
+def _market_clause(market_ids: Optional[list[str]]) -> str:
+    return "AND market_id = ANY(CAST(:market_ids AS TEXT[]))" if market_ids is not None else ""
+
+
+def rollup_hourly(
+    session: Session,
+    start: datetime,
+    end: datetime,
+    market_ids: Optional[list[str]] = None,
+):
+    """Aggregate raw snapshots in [start, end) into hourly buckets (optionally for some markets)."""
+    session.execute(
+        text(f"""
+            INSERT INTO snapshot_rollups_hourly (market_id, bucket, open_price, high_price,
+                low_price, close_price, volume, open_interest, samples)
+            SELECT
+                market_id,
+                date_trunc('hour', timestamp, 'UTC') AS bucket,
+                (array_agg(yes_price ORDER BY timestamp ASC))[1],
+                MAX(yes_price),
+                MIN(yes_price),
+                (array_agg(yes_price ORDER BY timestamp DESC))[1],
+                (array_agg(volume ORDER BY timestamp DESC))[1],
+                (array_agg(open_interest ORDER BY timestamp DESC))[1],
+                COUNT(*)
+            FROM snapshots
+            WHERE timestamp >= date_trunc('hour', CAST(:start AS TIMESTAMPTZ), 'UTC')
+                AND timestamp < :end
+                {_market_clause(market_ids)}
+            GROUP BY market_id, date_trunc('hour', timestamp, 'UTC')
+            ON CONFLICT (market_id, bucket) DO UPDATE SET
+                open_price = EXCLUDED.open_price,
+                high_price = EXCLUDED.high_price,
+                low_price = EXCLUDED.low_price,
+                close_price = EXCLUDED.close_price,
+                volume = EXCLUDED.volume,
+                open_interest = EXCLUDED.open_interest,
+                samples = EXCLUDED.samples
+        """),
+        {"start": start, "end": end, "market_ids": market_ids},
+    )
+
+
+def rollup_daily(
+    session: Session,
+    start: datetime,
+    end: datetime,
+    market_ids: Optional[list[str]] = None,
+):
+    """Aggregate hourly rollups in [start, end) into daily buckets (optionally for some markets)."""
+    session.execute(
+        text(f"""
+            INSERT INTO snapshot_rollups_daily (market_id, bucket, open_price, high_price,
+                low_price, close_price, volume, open_interest, samples)
+            SELECT
+                market_id,
+                date_trunc('day', bucket, 'UTC') AS day_bucket,
+                (array_agg(open_price ORDER BY bucket ASC))[1],
+                MAX(high_price),
+                MIN(low_price),
+                (array_agg(close_price ORDER BY bucket DESC))[1],
+                (array_agg(volume ORDER BY bucket DESC))[1],
+                (array_agg(open_interest ORDER BY bucket DESC))[1],
+                SUM(samples)
+            FROM snapshot_rollups_hourly
+            WHERE bucket >= date_trunc('day', CAST(:start AS TIMESTAMPTZ), 'UTC')
+                AND bucket < :end
+                {_market_clause(market_ids)}
+            GROUP BY market_id, date_trunc('day', bucket, 'UTC')
+            ON CONFLICT (market_id, bucket) DO UPDATE SET
+                open_price = EXCLUDED.open_price,
+                high_price = EXCLUDED.high_price,
+                low_price = EXCLUDED.low_price,
+                close_price = EXCLUDED.close_price,
+                volume = EXCLUDED.volume,
+                open_interest = EXCLUDED.open_interest,
+                samples = EXCLUDED.samples
+        """),
+        {"start": start, "end": end, "market_ids": market_ids},
+    )
+
+
+def rollup_range(
+    session: Session,
+    start: datetime,
+    end: datetime,
+    market_ids: Optional[list[str]] = None,
+):
+    """Rebuild both tiers for [start, end), e.g. after history is backfilled."""
+    rollup_hourly(session, start, end, market_ids)
+    rollup_daily(session, start, end, market_ids)
+
+
+def rollup_pending(session: Session, now: datetime) -> Optional[datetime]:
+    """
+    Roll up everything since the newest existing buckets.
+
+    Returns the end of the hourly coverage (exclusive), or None if there is
+    no raw history yet.
+    """
+    hour_end = now.replace(minute=0, second=0, microsecond=0)
+    day_end = hour_end.replace(hour=0)
+
+    hourly_start = session.execute(
+        text("SELECT MAX(bucket) FROM snapshot_rollups_hourly")
+    ).scalar()
+    if hourly_start is None:
+        hourly_start = session.execute(text("SELECT MIN(timestamp) FROM snapshots")).scalar()
+    if hourly_start is None:
+        return None
+    if hourly_start < hour_end:
+        rollup_hourly(session, hourly_start, hour_end)
+
+    daily_start = session.execute(
+        text("SELECT MAX(bucket) FROM snapshot_rollups_daily")
+    ).scalar()
+    if daily_start is None:
+        daily_start = session.execute(text("SELECT MIN(bucket) FROM snapshot_rollups_hourly")).scalar()
+    if daily_start is not None and daily_start < day_end:
+        rollup_daily(session, daily_start, day_end)
+
+    return hour_end
+
+
+def apply_retention(
+    session: Session,
+    now: datetime,
+    raw_retention_days: int,
+    hourly_retention_days: int,
+    rolled_through: datetime,
+):
+    """Drop raw snapshots and hourly rollups past their horizons.
+
+    Raw rows are only removed up to ``rolled_through`` so nothing is deleted
+    before it has been aggregated. Daily rollups are kept indefinitely.
+    """
+    if raw_retention_days > 0:
+        raw_cutoff = min(now - timedelta(days=raw_retention_days), rolled_through)
+        if snapshots_partitioned(session):
+            drop_snapshot_partitions_before(session, raw_cutoff.date())
+        else:
+            deleted = 0
+            while True:
+                result = session.execute(
+                    text("""
+                        DELETE FROM snapshots
+                        WHERE ctid IN (
+                            SELECT ctid FROM snapshots
+                            WHERE timestamp < :cutoff
+                            LIMIT :batch
+                        )
+                    """),
+                    {"cutoff": raw_cutoff, "batch": RAW_DELETE_BATCH_SIZE},
+                )
+                session.commit()
+                deleted += result.rowcount
+                if result.rowcount < RAW_DELETE_BATCH_SIZE:
+                    break
+            if deleted:
+                logger.info("Deleted %s raw snapshots older than %s", deleted, raw_cutoff.isoformat())
+
+    if hourly_retention_days > 0:
+        session.execute(
+            text("DELETE FROM snapshot_rollups_hourly WHERE bucket < :cutoff"),
+            {"cutoff": now - timedelta(days=hourly_retention_days)},
+        )
@@ -5,28 +5,29 @@ It uses sync httpx (via PolymarketClient) and sync Redis so it runs
 safely in Celery workers and background threads.
 """
 
-import json
 import logging
 from datetime import datetime, timezone, timedelta
 
-import redis
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from app.cache import INVALIDATION_CHANNEL, advance_generation, reserve_generation
 from app.config import get_settings
+from app.editorial_feed import publish_editorial_feeds
+from app.ingestion.baselines import ensure_baseline_tables, update_baselines
+from app.ingestion.clusters import ensure_cluster_tables, update_clusters, update_related_clusters
+from app.ingestion.fingerprints import SnapshotFingerprints
+from app.ingestion.partitions import ensure_snapshot_partitions
+from app.ingestion.resources import get_polymarket_client, get_sync_engine, get_sync_redis
+from app.ingestion.rollups import apply_retention, ensure_rollup_tables, rollup_pending
+from app.ingestion.trending import ensure_trending_view
+from app.ingestion.writer import MarketWriteBatcher, record_ingestion_errors
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-
-def get_sync_engine():
-    """Create a synchronous SQLAlchemy engine."""
-    return create_engine(settings.DATABASE_URL_SYNC, pool_pre_ping=True)
-
-
-def get_sync_redis():
-    """Create a synchronous Redis client."""
-    return redis.from_url(settings.REDIS_URL, decode_responses=True)
+# Per-feed updatedAt high-water marks for delta ingestion.
+WATERMARKS_KEY = "polynews:ingest:watermarks"
 
 
 def ingest_markets_task():
@@ -40,200 +41,127 @@ def ingest_markets_task():
     logger.info("Starting market ingestion...")
     engine = get_sync_engine()
     rds = get_sync_redis()
+    client = get_polymarket_client()
     now = datetime.now(timezone.utc)
 
     try:
         # Ensure schema additions exist before writes (safe for repeated runs).
         with Session(engine) as session:
             _ensure_markets_schema(session)
+            _maintain_snapshot_partitions(session, now)
             session.commit()
 
-        # Fetch markets from Polymarket (sync HTTP)
-        from app.ingestion.polymarket import PolymarketClient
-        client = PolymarketClient()
+        # Markets are written in set-based batches (one statement per table
+        # per batch) as pages arrive, so only one batch is held in memory.
+        # Snapshots are skipped for markets unchanged since their last write.
+        fingerprints = SnapshotFingerprints(
+            rds,
+            heartbeat_seconds=settings.SNAPSHOT_HEARTBEAT_MINUTES * 60,
+        )
+        batcher = MarketWriteBatcher(
+            engine,
+            now,
+            batch_size=settings.INGESTION_WRITE_BATCH_SIZE,
+            fingerprints=fingerprints,
+        )
+
+        # Reconcile stale active rows (past resolution date) by direct ID
+        # lookup first, so the direct lookup wins over any feed copy.
+        with Session(engine) as session:
+            stale_market_ids = _get_stale_active_market_ids(
+                session,
+                settings.STALE_ACTIVE_RECONCILE_LIMIT,
+                settings.STALE_ACTIVE_RECHECK_MINUTES,
+            )
+
+        reconciled_markets = 0
+        reconcile_failures: list[tuple[str, str]] = []
+        if stale_market_ids:
+            logger.info(
+                "Reconciling %s stale active markets by ID",
+                len(stale_market_ids),
+            )
+        for market_id, refreshed, error in client.iter_markets_by_ids(stale_market_ids):
+            if refreshed:
+                batcher.add(refreshed)
+                reconciled_markets += 1
+            else:
+                reconcile_failures.append((market_id, f"Reconcile lookup failed: {error}"))
+        # Write the direct lookups before the feeds stream in; the batcher
+        # drops later copies of markets it has already written.
+        batcher.flush()
+        if stale_market_ids:
+            logger.info(
+                "Reconciled stale active markets: %s refreshed, %s failed",
+                reconciled_markets,
+                len(reconcile_failures),
+            )
+        if reconcile_failures:
+            with Session(engine) as session:
+                record_ingestion_errors(session, reconcile_failures)
+                session.commit()
 
-        all_markets_by_id: dict[str, dict] = {}
-        active_batch_size = 100
-        resolved_batch_size = settings.RESOLVED_FETCH_BATCH_SIZE
-        max_active_pages = settings.MAX_ACTIVE_PAGES
-        max_resolved_pages = settings.MAX_RESOLVED_PAGES
+        # Fetch markets from Polymarket (sync HTTP over the process-wide
+        # client, pages fetched concurrently under a token bucket shared with
+        # every other worker). Between periodic full sweeps only markets
+        # updated since the last run's watermark are fetched.
         resolved_cutoff = now - timedelta(hours=settings.RECENTLY_RESOLVED_WINDOW_HOURS)
+        watermarks = _load_watermarks(rds)
+        full_sweep = _full_sweep_due(watermarks, now)
+        delta_truncated = False
+
+        if full_sweep:
+            active_volume_floor = _fetch_full_sweep(client, resolved_cutoff, batcher)
+        else:
+            active_volume_floor = watermarks.get("active_volume_floor", 0.0)
+            delta_truncated = _fetch_delta(
+                client, watermarks, active_volume_floor, resolved_cutoff, batcher
+            )
+        batcher.flush()
 
-        try:
-            active_offset = 0
-            for _ in range(max_active_pages):
-                markets = client.fetch_markets(
-                    limit=active_batch_size,
-                    offset=active_offset,
-                    active=True,
-                    closed=False,
-                    order="volume",
-                    ascending=False,
-                )
-                if not markets:
-                    break
-                for market in markets:
-                    all_markets_by_id[market["id"]] = market
-                active_offset += active_batch_size
-
-                # Track API request count
-                _increment_counter(rds, "polynews:requests:daily", ttl=86400)
-
-            resolved_offset = 0
-            for _ in range(max_resolved_pages):
-                markets = client.fetch_recently_resolved_markets(
-                    limit=resolved_batch_size,
-                    offset=resolved_offset,
-                )
-                if not markets:
-                    break
-
-                for market in markets:
-                    all_markets_by_id[market["id"]] = market
-
-                resolved_offset += resolved_batch_size
-
-                # Track API request count
-                _increment_counter(rds, "polynews:requests:daily", ttl=86400)
-
-                # Stop once we have likely covered recently closed markets.
-                closed_times = [m.get("closed_time") for m in markets if m.get("closed_time")]
-                if closed_times:
-                    oldest_closed_time = min(closed_times)
-                    if oldest_closed_time < resolved_cutoff:
-                        logger.info(
-                            "Resolved fetch reached cutoff at offset %s (oldest closed_time=%s)",
-                            resolved_offset,
-                            oldest_closed_time.isoformat(),
-                        )
-                        break
-                elif len(markets) < resolved_batch_size:
-                    break
-
-            # Reconcile stale active rows (past resolution date) by direct ID lookup.
-            with Session(engine) as session:
-                stale_market_ids = _get_stale_active_market_ids(
-                    session,
-                    settings.STALE_ACTIVE_RECONCILE_LIMIT,
-                    settings.STALE_ACTIVE_RECHECK_MINUTES,
-                )
-
-            reconciled_requests = 0
-            reconciled_markets = 0
-            if stale_market_ids:
-                logger.info(
-                    "Reconciling %s stale active markets by ID",
-                    len(stale_market_ids),
-                )
-            for market_id in stale_market_ids:
-                refreshed = client.fetch_market(market_id)
-                reconciled_requests += 1
-                if refreshed:
-                    all_markets_by_id[market_id] = refreshed
-                    reconciled_markets += 1
-            if reconciled_requests:
-                _increment_counter(
-                    rds,
-                    "polynews:requests:daily",
-                    count=reconciled_requests,
-                    ttl=86400,
-                )
-                logger.info(
-                    "Reconciled stale active markets: %s refreshed via direct lookup",
-                    reconciled_markets,
-                )
-        finally:
-            client.close()
-
-        all_markets = list(all_markets_by_id.values())
-        logger.info(f"Fetched {len(all_markets)} markets from Polymarket")
-
-        if not all_markets:
+        logger.info(
+            f"Fetched {batcher.markets_written} markets from Polymarket "
+            f"({'full sweep' if full_sweep else 'delta'})"
+        )
+
+        if not batcher.markets_written and full_sweep:
             logger.warning("No markets fetched, skipping ingestion")
             return
 
-        errors = 0
+        failures = batcher.failures
+        for market_id, error_message in failures:
+            logger.error(f"Error ingesting market {market_id}: {error_message}")
+        errors = len(failures) + len(reconcile_failures)
 
-        # Write to database
-        with Session(engine) as session:
-            for market_data in all_markets:
-                try:
-                    # Upsert market
-                    session.execute(
-                        text("""
-                            INSERT INTO markets (id, question, description, category,
-                                resolution_date, closed_time, resolution_status,
-                                created_at, status, last_updated, outcomes, image_url, slug)
-                            VALUES (:id, :question, :description, :category,
-                                :resolution_date, :closed_time, :resolution_status,
-                                :created_at, :status, :last_updated, :outcomes, :image_url, :slug)
-                            ON CONFLICT (id) DO UPDATE SET
-                                question = EXCLUDED.question,
-                                description = EXCLUDED.description,
-                                category = EXCLUDED.category,
-                                resolution_date = EXCLUDED.resolution_date,
-                                closed_time = EXCLUDED.closed_time,
-                                resolution_status = EXCLUDED.resolution_status,
-                                status = EXCLUDED.status,
-                                last_updated = EXCLUDED.last_updated,
-                                outcomes = EXCLUDED.outcomes,
-                                image_url = EXCLUDED.image_url,
-                                slug = EXCLUDED.slug
-                        """),
-                        {
-                            "id": market_data["id"],
-                            "question": market_data["question"],
-                            "description": market_data.get("description"),
-                            "category": market_data["category"],
-                            "resolution_date": market_data.get("resolution_date"),
-                            "closed_time": market_data.get("closed_time"),
-                            "resolution_status": market_data.get("resolution_status"),
-                            "created_at": market_data.get("created_at", now),
-                            "status": market_data.get("status", "active"),
-                            "last_updated": now,
-                            "outcomes": json.dumps(market_data.get("outcomes")) if market_data.get("outcomes") else None,
-                            "image_url": market_data.get("image_url"),
-                            "slug": market_data.get("slug"),
-                        },
-                    )
-
-                    # Insert snapshot (append-only)
-                    session.execute(
-                        text("""
-                            INSERT INTO snapshots (market_id, timestamp, yes_price, no_price, volume, open_interest)
-                            VALUES (:market_id, :timestamp, :yes_price, :no_price, :volume, :open_interest)
-                            ON CONFLICT (market_id, timestamp) DO NOTHING
-                        """),
-                        {
-                            "market_id": market_data["id"],
-                            "timestamp": now,
-                            "yes_price": market_data["yes_price"],
-                            "no_price": market_data["no_price"],
-                            "volume": market_data["volume"],
-                            "open_interest": market_data["open_interest"],
-                        },
-                    )
-
-                except Exception as e:
-                    errors += 1
-                    logger.error(f"Error ingesting market {market_data.get('id', 'unknown')}: {e}")
-
-                    # Log ingestion error
-                    try:
-                        session.execute(
-                            text("""
-                                INSERT INTO ingestion_errors (market_id, error_message, retry_count)
-                                VALUES (:market_id, :error_message, 0)
-                            """),
-                            {
-                                "market_id": market_data.get("id", "unknown"),
-                                "error_message": str(e)[:500],
-                            },
-                        )
-                    except Exception:
-                        pass
+        # Markets that failed to write are re-read next run from the old watermark.
+        if not failures:
+            _save_watermarks(rds, now, full_sweep, active_volume_floor, delta_truncated)
 
-            session.commit()
+        # Every live market was just seen, so entries older than the heartbeat
+        # belong to markets that left the feeds.
+        if full_sweep:
+            pruned = fingerprints.prune(now)
+            if pruned:
+                logger.info("Pruned %s snapshot fingerprints not seen in the full sweep", pruned)
+
+        # Advance the 1h/24h/7d price baselines past this run's snapshots
+        try:
+            with Session(engine) as session:
+                update_baselines(session, now)
+                session.commit()
+        except Exception as e:
+            logger.error(f"Error updating price baselines: {e}")
+
+        # Parse cluster keys for new or changed questions only, then group
+        # the remaining active markets into related clusters
+        try:
+            with Session(engine) as session:
+                update_clusters(session)
+                session.commit()
+                update_related_clusters(session)
+                session.commit()
+        except Exception as e:
+            logger.error(f"Error updating story clusters: {e}")
 
         with Session(engine) as session:
             _log_data_quality_metrics(session)
@@ -247,20 +175,32 @@ def ingest_markets_task():
         except Exception as e:
             logger.error(f"Error refreshing trending view: {e}")
 
+        # Prebuild every editorial feed layout under a new cache generation,
+        # which also invalidates every other cached response in one step
+        try:
+            with Session(engine) as session:
+                generation = publish_editorial_feeds(session, rds)
+            logger.info(f"Published editorial feed layouts for cache generation {generation}")
+        except Exception as e:
+            logger.error(f"Error publishing editorial feeds: {e}")
+            try:
+                generation = advance_generation(rds, reserve_generation(rds))
+            except Exception:
+                logger.exception("Failed to advance cache generation")
+                generation = None
+        if generation is not None:
+            _publish_generation(rds, generation)
+
         # Update last ingestion timestamp (sync Redis)
         rds.set("polynews:last_ingestion", now.isoformat())
 
-        # Clear feed caches so new data is served
-        _delete_keys_by_pattern(rds, "polynews:feed:*")
-        _delete_keys_by_pattern(rds, "polynews:market:*")
-        rds.delete("polynews:categories")
-
         # Track errors
         if errors > 0:
             _increment_counter(rds, "polynews:errors:hourly", count=errors, ttl=3600)
 
         logger.info(
-            f"Ingestion complete: {len(all_markets)} markets processed, {errors} errors"
+            f"Ingestion complete: {batcher.markets_written} markets processed, "
+            f"{batcher.snapshots_written} snapshots written, {errors} errors"
         )
 
     except Exception as e:
@@ -268,9 +208,43 @@ def ingest_markets_task():
         _increment_counter(rds, "polynews:errors:hourly", ttl=3600)
         raise
 
-    finally:
-        engine.dispose()
-        rds.close()
+
+def rollup_snapshots_task():
+    """
+    Roll raw snapshots into hourly/daily OHLC tiers, then apply retention.
+
+    Runs hourly via Celery Beat. Raw snapshots older than
+    SNAPSHOT_RETENTION_DAYS are dropped only once the hourly tier covers them.
+    """
+    logger.info("Starting snapshot rollup...")
+    engine = get_sync_engine()
+    now = datetime.now(timezone.utc)
+
+    with Session(engine) as session:
+        _ensure_markets_schema(session)
+        session.commit()
+
+        rolled_through = rollup_pending(session, now)
+        session.commit()
+        if rolled_through is None:
+            logger.info("No snapshots to roll up")
+            return
+
+        # Keep at least the 7-day baseline window plus the partition in progress.
+        apply_retention(
+            session,
+            now,
+            raw_retention_days=(
+                max(settings.SNAPSHOT_RETENTION_DAYS, 8)
+                if settings.SNAPSHOT_RETENTION_DAYS > 0
+                else 0
+            ),
+            hourly_retention_days=settings.ROLLUP_HOURLY_RETENTION_DAYS,
+            rolled_through=rolled_through,
+        )
+        session.commit()
+
+    logger.info("Snapshot rollup complete through %s", rolled_through.isoformat())
 
 
 def _increment_counter(rds, key: str, count: int = 1, ttl: int = 3600):
@@ -285,12 +259,58 @@ def _increment_counter(rds, key: str, count: int = 1, ttl: int = 3600):
 
 
 def _ensure_markets_schema(session: Session):
-    """Create additive schema columns used for resolution correctness."""
+    """Create additive schema (columns and derived tables) the ingestion path writes to."""
     session.execute(text("ALTER TABLE markets ADD COLUMN IF NOT EXISTS closed_time TIMESTAMPTZ"))
     session.execute(text("ALTER TABLE markets ADD COLUMN IF NOT EXISTS resolution_status TEXT"))
     session.execute(
         text("CREATE INDEX IF NOT EXISTS idx_markets_closed_time ON markets(closed_time DESC)")
     )
+    _ensure_market_latest(session)
+    ensure_baseline_tables(session)
+    ensure_rollup_tables(session)
+    ensure_cluster_tables(session)
+    ensure_trending_view(session)
+
+
+def _ensure_market_latest(session: Session):
+    """Create market_latest and seed it from snapshot history on first use."""
+    session.execute(text("""
+        CREATE TABLE IF NOT EXISTS market_latest (
+            market_id TEXT PRIMARY KEY REFERENCES markets(id) ON DELETE CASCADE,
+            yes_price DECIMAL(5,4) NOT NULL,
+            no_price DECIMAL(5,4) NOT NULL,
+            volume DECIMAL(20,2) NOT NULL DEFAULT 0,
+            open_interest DECIMAL(20,2) NOT NULL DEFAULT 0,
+            timestamp TIMESTAMPTZ NOT NULL
+        )
+    """))
+    session.execute(
+        text("CREATE INDEX IF NOT EXISTS idx_market_latest_volume ON market_latest(volume DESC)")
+    )
+    session.execute(
+        text("CREATE INDEX IF NOT EXISTS idx_market_latest_timestamp ON market_latest(timestamp DESC)")
+    )
+
+    seeded = session.execute(text("SELECT EXISTS (SELECT 1 FROM market_latest)")).scalar()
+    if not seeded:
+        session.execute(text("""
+            INSERT INTO market_latest (market_id, yes_price, no_price, volume, open_interest, timestamp)
+            SELECT DISTINCT ON (market_id)
+                market_id, yes_price, no_price, volume, open_interest, timestamp
+            FROM snapshots
+            ORDER BY market_id, timestamp DESC
+            ON CONFLICT (market_id) DO NOTHING
+        """))
+
+
+def _maintain_snapshot_partitions(session: Session, now: datetime):
+    """Create upcoming daily snapshot partitions."""
+    today = now.date()
+    ensure_snapshot_partitions(
+        session,
+        today,
+        today + timedelta(days=settings.SNAPSHOT_PARTITION_DAYS_AHEAD),
+    )
 
 
 def _get_stale_active_market_ids(
@@ -336,15 +356,141 @@ def _log_data_quality_metrics(session: Session):
         )
 
 
-def _delete_keys_by_pattern(rds, pattern: str):
-    """Delete all Redis keys matching a pattern."""
+def _publish_generation(rds, generation: int):
+    """Tell every API worker to switch to a new cache generation."""
     try:
-        cursor = 0
-        while True:
-            cursor, keys = rds.scan(cursor=cursor, match=pattern, count=100)
-            if keys:
-                rds.delete(*keys)
-            if cursor == 0:
-                break
+        rds.publish(INVALIDATION_CHANNEL, generation)
     except Exception:
-        logger.exception("Failed to delete Redis keys for pattern: %s", pattern)
+        logger.exception("Failed to publish cache generation %s", generation)
+
+
+def _load_watermarks(rds) -> dict:
+    """Read the per-feed updatedAt watermarks and the last full sweep time."""
+    try:
+        raw = rds.hgetall(WATERMARKS_KEY)
+        watermarks = {
+            field: datetime.fromisoformat(raw[field])
+            for field in ("active", "resolved", "full_sweep_at")
+            if raw.get(field)
+        }
+        watermarks["active_volume_floor"] = float(raw.get("active_volume_floor") or 0)
+        return watermarks
+    except Exception:
+        logger.exception("Failed to read ingestion watermarks, running a full sweep")
+        return {}
+
+
+def _full_sweep_due(watermarks: dict, now: datetime) -> bool:
+    """Decide whether this run re-fetches everything instead of a delta."""
+    if not settings.INGESTION_DELTA_ENABLED:
+        return True
+    if not all(field in watermarks for field in ("active", "resolved", "full_sweep_at")):
+        return True
+    return now - watermarks["full_sweep_at"] >= timedelta(minutes=settings.INGESTION_FULL_SWEEP_MINUTES)
+
+
+def _save_watermarks(
+    rds,
+    now: datetime,
+    full_sweep: bool,
+    active_volume_floor: float,
+    delta_truncated: bool,
+):
+    """Advance the watermarks to this run's start once its writes have landed."""
+    mapping = {"active": now.isoformat(), "resolved": now.isoformat()}
+    if full_sweep:
+        mapping["full_sweep_at"] = now.isoformat()
+        mapping["active_volume_floor"] = active_volume_floor
+    try:
+        pipe = rds.pipeline()
+        pipe.hset(WATERMARKS_KEY, mapping=mapping)
+        if delta_truncated:
+            # The delta did not reach the watermark; sweep everything next run.
+            pipe.hdel(WATERMARKS_KEY, "full_sweep_at")
+        pipe.execute()
+    except Exception:
+        logger.exception("Failed to save ingestion watermarks")
+
+
+def _fetch_full_sweep(client, resolved_cutoff: datetime, batcher: MarketWriteBatcher) -> float:
+    """
+    Stream the top active markets by volume and every recently resolved one.
+
+    Returns the lowest active volume fetched when the page limit was hit, so
+    delta runs follow the same set of markets.
+    """
+    active_count = 0
+    active_volume_floor = None
+    for markets in client.iter_active_pages(
+        batch_size=100,
+        max_pages=settings.MAX_ACTIVE_PAGES,
+    ):
+        active_count += len(markets)
+        page_floor = min(market.volume for market in markets)
+        if active_volume_floor is None or page_floor < active_volume_floor:
+            active_volume_floor = page_floor
+        batcher.extend(markets)
+
+    for markets in client.iter_resolved_pages(
+        batch_size=settings.RESOLVED_FETCH_BATCH_SIZE,
+        max_pages=settings.MAX_RESOLVED_PAGES,
+        cutoff=resolved_cutoff,
+    ):
+        batcher.extend(markets)
+
+    if active_count >= 100 * settings.MAX_ACTIVE_PAGES:
+        return active_volume_floor
+    return 0.0
+
+
+def _fetch_delta(
+    client,
+    watermarks: dict,
+    active_volume_floor: float,
+    resolved_cutoff: datetime,
+    batcher: MarketWriteBatcher,
+) -> bool:
+    """
+    Stream markets updated since the stored watermarks.
+
+    Returns whether either feed hit its page limit before reaching its
+    watermark.
+    """
+    overlap = timedelta(seconds=settings.INGESTION_DELTA_OVERLAP_SECONDS)
+
+    active_reached = _stream_pages(
+        client.iter_updated_pages(
+            closed=False,
+            since=watermarks["active"] - overlap,
+            batch_size=100,
+            max_pages=settings.MAX_ACTIVE_PAGES,
+            volume_min=active_volume_floor or None,
+        ),
+        batcher.extend,
+    )
+
+    # Same window as a full sweep: only markets resolved recently.
+    resolved_reached = _stream_pages(
+        client.iter_updated_pages(
+            closed=True,
+            since=watermarks["resolved"] - overlap,
+            batch_size=settings.RESOLVED_FETCH_BATCH_SIZE,
+            max_pages=settings.MAX_RESOLVED_PAGES,
+        ),
+        lambda markets: batcher.extend([
+            market for market in markets
+            if market.closed_time is None or market.closed_time >= resolved_cutoff
+        ]),
+    )
+
+    return not (active_reached and resolved_reached)
+
+
+def _stream_pages(pages, handle) -> bool:
+    """Pass every page to ``handle`` and return the generator's reached-watermark flag."""
+    while True:
+        try:
+            markets = next(pages)
+        except StopIteration as done:
+            return bool(done.value)
+        handle(markets)
@@ -0,0 +1,73 @@
+"""Precomputed ranking surface for the feed endpoints.
+
+``trending_view`` holds one row per market with everything the list and
+editorial feeds filter and sort on: status, category, current price, 24h
+baseline and delta, volume and volume rank. It is refreshed concurrently at
+the end of every ingestion run, so a feed cache miss is an index scan on the
+view joined to ``markets`` by primary key for display columns.
+"""
+
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Keep in sync with init.sql.
+TRENDING_VIEW_SQL = """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS trending_view AS
+    WITH vol_rank AS (
+        -- Volume is cumulative and snapshots are only written on change,
+        -- so rank by the newest 24h volume rather than a sum over rows.
+        SELECT
+            market_id,
+            RANK() OVER (ORDER BY MAX(volume) DESC) AS volume_rank
+        FROM snapshots
+        WHERE timestamp >= NOW() - INTERVAL '24 hours'
+        GROUP BY market_id
+    )
+    SELECT
+        m.id AS market_id,
+        m.category,
+        m.status,
+        m.resolution_date,
+        COALESCE(m.closed_time, m.last_updated) AS activity_at,
+        COALESCE(l.yes_price, 0.5) AS current_price,
+        b.price_24h_ago,
+        ABS(COALESCE(l.yes_price, 0.5) - COALESCE(b.price_24h_ago, l.yes_price, 0.5)) AS delta,
+        COALESCE(l.volume, 0) AS volume,
+        COALESCE(v.volume_rank, 9999) AS volume_rank
+    FROM markets m
+    LEFT JOIN market_latest l ON m.id = l.market_id
+    LEFT JOIN market_baselines b ON m.id = b.market_id
+    LEFT JOIN vol_rank v ON m.id = v.market_id
+"""
+
+TRENDING_INDEXES = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_trending_market ON trending_view(market_id)",
+    "CREATE INDEX IF NOT EXISTS idx_trending_status_volume ON trending_view(status, volume DESC, delta DESC, market_id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_trending_status_delta ON trending_view(status, delta DESC, volume DESC, market_id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_trending_status_activity ON trending_view(status, activity_at DESC, market_id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_trending_category ON trending_view(category, status)",
+)
+
+
+def ensure_trending_view(session: Session):
+    """Create trending_view, replacing the older price-only definition if present."""
+    outdated = session.execute(text("""
+        SELECT to_regclass('trending_view') IS NOT NULL
+            AND NOT EXISTS (
+                SELECT 1 FROM pg_attribute
+                WHERE attrelid = to_regclass('trending_view')
+                    AND attname = 'activity_at'
+                    AND NOT attisdropped
+            )
+    """)).scalar()
+    if outdated:
+        logger.info("Rebuilding trending_view with feed ranking columns")
+        session.execute(text("DROP MATERIALIZED VIEW trending_view"))
+
+    session.execute(text(TRENDING_VIEW_SQL))
+    for statement in TRENDING_INDEXES:
+        session.execute(text(statement))
@@ -0,0 +1,311 @@
+"""Set-based database writes for market ingestion.
+
+Markets and snapshots are written in batches: each table receives one
+multi-row statement per batch (``unnest`` over array parameters), and each
+batch commits in its own short transaction. If a batch statement fails, the
+batch is replayed row by row inside savepoints so that a single bad market
+is recorded in ``ingestion_errors`` without dropping the rest of the batch.
+
+Every snapshot insert is paired with an upsert into ``market_latest`` in the
+same transaction, so the latest-values table never disagrees with history.
+
+MarketWriteBatcher accepts markets one at a time as pages are decoded and
+writes each full batch immediately, so a run holds at most one batch of
+normalized markets in memory rather than everything it fetched.
+
+When a SnapshotFingerprints tracker is supplied, snapshots are only appended
+for markets whose values changed (or whose heartbeat is due); the markets
+upsert still covers every fetched market.
+"""
+
+import logging
+from datetime import datetime
+from typing import Optional
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.ingestion.fingerprints import SnapshotFingerprints
+from app.ingestion.normalize import NormalizedMarket
+
+logger = logging.getLogger(__name__)
+
+UPSERT_MARKETS_SQL = text("""
+    INSERT INTO markets (id, question, description, category,
+        resolution_date, closed_time, resolution_status,
+        created_at, status, last_updated, outcomes, image_url, slug)
+    SELECT
+        t.id, t.question, t.description, t.category,
+        t.resolution_date, t.closed_time, t.resolution_status,
+        t.created_at, t.status, t.last_updated, CAST(t.outcomes AS JSONB), t.image_url, t.slug
+    FROM unnest(
+        CAST(:id AS TEXT[]),
+        CAST(:question AS TEXT[]),
+        CAST(:description AS TEXT[]),
+        CAST(:category AS TEXT[]),
+        CAST(:resolution_date AS TIMESTAMPTZ[]),
+        CAST(:closed_time AS TIMESTAMPTZ[]),
+        CAST(:resolution_status AS TEXT[]),
+        CAST(:created_at AS TIMESTAMPTZ[]),
+        CAST(:status AS TEXT[]),
+        CAST(:last_updated AS TIMESTAMPTZ[]),
+        CAST(:outcomes AS TEXT[]),
+        CAST(:image_url AS TEXT[]),
+        CAST(:slug AS TEXT[])
+    ) AS t(id, question, description, category,
+        resolution_date, closed_time, resolution_status,
+        created_at, status, last_updated, outcomes, image_url, slug)
+    ON CONFLICT (id) DO UPDATE SET
+        question = EXCLUDED.question,
+        description = EXCLUDED.description,
+        category = EXCLUDED.category,
+        resolution_date = EXCLUDED.resolution_date,
+        closed_time = EXCLUDED.closed_time,
+        resolution_status = EXCLUDED.resolution_status,
+        status = EXCLUDED.status,
+        last_updated = EXCLUDED.last_updated,
+        outcomes = EXCLUDED.outcomes,
+        image_url = EXCLUDED.image_url,
+        slug = EXCLUDED.slug
+""")
+
+INSERT_SNAPSHOTS_SQL = text("""
+    INSERT INTO snapshots (market_id, timestamp, yes_price, no_price, volume, open_interest)
+    SELECT t.market_id, t.timestamp, t.yes_price, t.no_price, t.volume, t.open_interest
+    FROM unnest(
+        CAST(:market_id AS TEXT[]),
+        CAST(:timestamp AS TIMESTAMPTZ[]),
+        CAST(:yes_price AS NUMERIC[]),
+        CAST(:no_price AS NUMERIC[]),
+        CAST(:volume AS NUMERIC[]),
+        CAST(:open_interest AS NUMERIC[])
+    ) AS t(market_id, timestamp, yes_price, no_price, volume, open_interest)
+    ON CONFLICT (market_id, timestamp) DO NOTHING
+""")
+
+UPSERT_LATEST_SQL = text("""
+    INSERT INTO market_latest (market_id, yes_price, no_price, volume, open_interest, timestamp)
+    SELECT t.market_id, t.yes_price, t.no_price, t.volume, t.open_interest, t.timestamp
+    FROM unnest(
+        CAST(:market_id AS TEXT[]),
+        CAST(:timestamp AS TIMESTAMPTZ[]),
+        CAST(:yes_price AS NUMERIC[]),
+        CAST(:no_price AS NUMERIC[]),
+        CAST(:volume AS NUMERIC[]),
+        CAST(:open_interest AS NUMERIC[])
+    ) AS t(market_id, timestamp, yes_price, no_price, volume, open_interest)
+    ON CONFLICT (market_id) DO UPDATE SET
+        yes_price = EXCLUDED.yes_price,
+        no_price = EXCLUDED.no_price,
+        volume = EXCLUDED.volume,
+        open_interest = EXCLUDED.open_interest,
+        timestamp = EXCLUDED.timestamp
+    WHERE market_latest.timestamp <= EXCLUDED.timestamp
+""")
+
+INSERT_ERRORS_SQL = text("""
+    INSERT INTO ingestion_errors (market_id, error_message, retry_count)
+    SELECT t.market_id, t.error_message, 0
+    FROM unnest(
+        CAST(:market_id AS TEXT[]),
+        CAST(:error_message AS TEXT[])
+    ) AS t(market_id, error_message)
+""")
+
+MARKET_COLUMNS = (
+    "id", "question", "description", "category",
+    "resolution_date", "closed_time", "resolution_status",
+    "created_at", "status", "last_updated", "outcomes", "image_url", "slug",
+)
+SNAPSHOT_COLUMNS = ("market_id", "timestamp", "yes_price", "no_price", "volume", "open_interest")
+
+
+def write_markets(
+    engine,
+    markets: list[NormalizedMarket],
+    now: datetime,
+    batch_size: int = 500,
+    fingerprints: Optional[SnapshotFingerprints] = None,
+) -> tuple[list[tuple[str, str]], int]:
+    """
+    Upsert markets and append snapshots in set-based batches.
+
+    Returns (failures, snapshots_written) where failures is a list of
+    (market_id, error_message) already recorded in ingestion_errors.
+    """
+    batcher = MarketWriteBatcher(engine, now, batch_size=batch_size, fingerprints=fingerprints)
+    batcher.extend(markets)
+    batcher.flush()
+    return batcher.failures, batcher.snapshots_written
+
+
+class MarketWriteBatcher:
+    """Write markets in batches as they arrive, one market ID per run."""
+
+    def __init__(
+        self,
+        engine,
+        now: datetime,
+        batch_size: int = 500,
+        fingerprints: Optional[SnapshotFingerprints] = None,
+    ):
+        self.engine = engine
+        self.now = now
+        self.batch_size = max(batch_size, 1)
+        self.fingerprints = fingerprints
+        self.failures: list[tuple[str, str]] = []
+        self.snapshots_written = 0
+        self.markets_written = 0
+        self._pending: dict[str, NormalizedMarket] = {}
+        self._flushed_ids: set[str] = set()
+
+    def add(self, market_data: NormalizedMarket) -> None:
+        """Queue a market, writing the batch once it is full.
+
+        A later copy of a market replaces a queued one; copies arriving after
+        the market's batch was written are dropped.
+        """
+        market_id = market_data.id
+        if market_id in self._flushed_ids:
+            return
+        self._pending[market_id] = market_data
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def extend(self, markets: list[NormalizedMarket]) -> None:
+        for market_data in markets:
+            self.add(market_data)
+
+    def flush(self) -> None:
+        """Write whatever is queued."""
+        if not self._pending:
+            return
+        batch = list(self._pending.values())
+        self._pending = {}
+        self._flushed_ids.update(market_data.id for market_data in batch)
+
+        batch_failures, written = _write_batch(self.engine, batch, self.now, self.fingerprints)
+        self.failures.extend(batch_failures)
+        self.snapshots_written += len(written)
+        self.markets_written += len(batch)
+        if self.fingerprints is not None:
+            self.fingerprints.remember(written, self.now)
+
+
+def record_ingestion_errors(session: Session, failures: list[tuple[str, str]]) -> None:
+    """Insert (market_id, error_message) pairs into ingestion_errors in one statement."""
+    if not failures:
+        return
+    session.execute(
+        INSERT_ERRORS_SQL,
+        {
+            "market_id": [market_id for market_id, _ in failures],
+            "error_message": [message[:500] for _, message in failures],
+        },
+    )
+
+
+def _write_batch(
+    engine,
+    batch: list[NormalizedMarket],
+    now: datetime,
+    fingerprints: Optional[SnapshotFingerprints],
+) -> tuple[list[tuple[str, str]], list[NormalizedMarket]]:
+    """
+    Write one batch in its own transaction, isolating bad rows on failure.
+
+    Returns (failures, markets whose snapshot was committed).
+    """
+    failures: list[tuple[str, str]] = []
+    changed_ids = fingerprints.changed(batch, now) if fingerprints is not None else None
+
+    rows = []
+    for market_data in batch:
+        try:
+            market_row = _market_row(market_data, now)
+            snapshot_row = None
+            if changed_ids is None or market_data.id in changed_ids:
+                snapshot_row = _snapshot_row(market_data, now)
+            rows.append((market_data, market_row, snapshot_row))
+        except Exception as e:
+            failures.append((str(getattr(market_data, "id", "unknown")), str(e)))
+
+    written = [market_data for market_data, _, snapshot_row in rows if snapshot_row]
+
+    with Session(engine) as session:
+        try:
+            with session.begin_nested():
+                _execute_rows(session, rows)
+        except Exception as e:
+            logger.warning(
+                "Batch write of %s markets failed, retrying row by row: %s",
+                len(rows),
+                e,
+            )
+            written = []
+            for row in rows:
+                try:
+                    with session.begin_nested():
+                        _execute_rows(session, [row])
+                except Exception as row_error:
+                    failures.append((row[1]["id"], str(row_error)))
+                else:
+                    if row[2]:
+                        written.append(row[0])
+
+        try:
+            with session.begin_nested():
+                record_ingestion_errors(session, failures)
+        except Exception:
+            logger.exception("Failed to record %s ingestion errors", len(failures))
+
+        session.commit()
+
+    return failures, written
+
+
+def _execute_rows(session: Session, rows: list[tuple[NormalizedMarket, dict, Optional[dict]]]) -> None:
+    market_rows = [market_row for _, market_row, _ in rows]
+    snapshot_rows = [snapshot_row for _, _, snapshot_row in rows if snapshot_row]
+    if market_rows:
+        session.execute(UPSERT_MARKETS_SQL, _to_columns(market_rows, MARKET_COLUMNS))
+    if snapshot_rows:
+        snapshot_columns = _to_columns(snapshot_rows, SNAPSHOT_COLUMNS)
+        session.execute(INSERT_SNAPSHOTS_SQL, snapshot_columns)
+        session.execute(UPSERT_LATEST_SQL, snapshot_columns)
+
+
+def _market_row(market_data: NormalizedMarket, now: datetime) -> dict:
+    return {
+        "id": market_data.id,
+        "question": market_data.question,
+        "description": market_data.description,
+        "category": market_data.category,
+        "resolution_date": market_data.resolution_date,
+        "closed_time": market_data.closed_time,
+        "resolution_status": market_data.resolution_status,
+        "created_at": market_data.created_at or now,
+        "status": market_data.status,
+        "last_updated": now,
+        "outcomes": orjson.dumps(market_data.outcomes).decode() if market_data.outcomes else None,
+        "image_url": market_data.image_url,
+        "slug": market_data.slug,
+    }
+
+
+def _snapshot_row(market_data: NormalizedMarket, now: datetime) -> dict:
+    return {
+        "market_id": market_data.id,
+        "timestamp": now,
+        "yes_price": market_data.yes_price,
+        "no_price": market_data.no_price,
+        "volume": market_data.volume,
+        "open_interest": market_data.open_interest,
+    }
+
+
+def _to_columns(rows: list[dict], columns: tuple[str, ...]) -> dict[str, list]:
+    """Pivot row dicts into one array parameter per column."""
+    return {column: [row[column] for row in rows] for column in columns}
+
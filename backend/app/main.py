@@ -1,11 +1,13 @@
+import asyncio
 import logging
 from threading import Thread
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from app.config import get_settings
+from app.cache import close_clients, listen_for_invalidations
 from app.api.markets import router as markets_router
 from app.api.categories import router as categories_router
 from app.api.health import router as health_router
@@ -34,10 +36,16 @@ async def lifespan(app: FastAPI):
     # Startup: kick off first ingestion in background thread
     thread = Thread(target=_run_initial_ingestion, daemon=True)
     thread.start()
+    # Keep this worker's in-process cache in step with ingestion runs
+    invalidation_listener = asyncio.create_task(listen_for_invalidations())
     yield
     # Shutdown
-    from app.cache import redis_client
-    await redis_client.close()
+    invalidation_listener.cancel()
+    with suppress(asyncio.CancelledError):
+        await invalidation_listener
+    await close_clients()
+    from app.ingestion.resources import close_resources
+    close_resources()
 
 
 app = FastAPI(
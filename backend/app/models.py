@@ -3,6 +3,7 @@ from sqlalchemy import (
     Text,
     Boolean,
     Integer,
+    BigInteger,
     Float,
     Numeric,
     String,
@@ -57,6 +58,84 @@ class Snapshot(Base):
     )
 
 
+class MarketLatest(Base):
+    __tablename__ = "market_latest"
+
+    market_id = Column(Text, ForeignKey("markets.id", ondelete="CASCADE"), primary_key=True)
+    yes_price = Column(Numeric(5, 4), nullable=False)
+    no_price = Column(Numeric(5, 4), nullable=False)
+    volume = Column(Numeric(20, 2), nullable=False, default=0)
+    open_interest = Column(Numeric(20, 2), nullable=False, default=0)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("idx_market_latest_volume", "volume"),
+        Index("idx_market_latest_timestamp", "timestamp"),
+    )
+
+
+class MarketBaseline(Base):
+    __tablename__ = "market_baselines"
+
+    market_id = Column(Text, ForeignKey("markets.id", ondelete="CASCADE"), primary_key=True)
+    price_24h_ago = Column(Numeric(5, 4))
+    price_7d_ago = Column(Numeric(5, 4))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class BaselineWatermark(Base):
+    __tablename__ = "baseline_watermarks"
+
+    lookback = Column(Text, primary_key=True)  # market_baselines column name
+    cutoff = Column(DateTime(timezone=True), nullable=False)
+
+
+class SnapshotRollupHourly(Base):
+    __tablename__ = "snapshot_rollups_hourly"
+
+    market_id = Column(Text, ForeignKey("markets.id", ondelete="CASCADE"), primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    open_price = Column(Numeric(5, 4), nullable=False)
+    high_price = Column(Numeric(5, 4), nullable=False)
+    low_price = Column(Numeric(5, 4), nullable=False)
+    close_price = Column(Numeric(5, 4), nullable=False)
+    volume = Column(Numeric(20, 2), nullable=False, default=0)
+    open_interest = Column(Numeric(20, 2), nullable=False, default=0)
+    samples = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_snapshot_rollups_hourly_bucket", "bucket"),
+    )
+
+
+class SnapshotRollupDaily(Base):
+    __tablename__ = "snapshot_rollups_daily"
+
+    market_id = Column(Text, ForeignKey("markets.id", ondelete="CASCADE"), primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    open_price = Column(Numeric(5, 4), nullable=False)
+    high_price = Column(Numeric(5, 4), nullable=False)
+    low_price = Column(Numeric(5, 4), nullable=False)
+    close_price = Column(Numeric(5, 4), nullable=False)
+    volume = Column(Numeric(20, 2), nullable=False, default=0)
+    open_interest = Column(Numeric(20, 2), nullable=False, default=0)
+    samples = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_snapshot_rollups_daily_bucket", "bucket"),
+    )
+
+
+class BackfillCheckpoint(Base):
+    __tablename__ = "backfill_checkpoints"
+
+    name = Column(Text, primary_key=True)
+    position = Column(BigInteger, nullable=False, default=0)
+    rows_loaded = Column(BigInteger, nullable=False, default=0)
+    completed = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
 class IngestionError(Base):
     __tablename__ = "ingestion_errors"
 
@@ -73,6 +152,7 @@ class MarketCluster(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(Text, nullable=False)
     cluster_type = Column(String(50), default="threshold")  # threshold, related, manual
+    cluster_key = Column(Text, unique=True)  # normalized title for threshold clusters
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -89,6 +169,16 @@ class ClusterMarket(Base):
     cluster = relationship("MarketCluster", back_populates="cluster_markets")
 
 
+class MarketClusterKey(Base):
+    __tablename__ = "market_cluster_keys"
+
+    market_id = Column(Text, ForeignKey("markets.id", ondelete="CASCADE"), primary_key=True)
+    question = Column(Text, nullable=False)  # question the key was parsed from
+    cluster_key = Column(Text, index=True)
+    sort_value = Column(Float)
+    subject = Column(Text)
+
+
 class MarketContext(Base):
     __tablename__ = "market_contexts"
 
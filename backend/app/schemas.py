@@ -47,9 +47,11 @@ class MarketDetail(BaseModel):
     category: str
     current_price: float
     price_24h_ago: Optional[float] = None
+    price_7d_ago: Optional[float] = None
     delta: Optional[float] = None
     volume: float
     open_interest: float
+    summary: Optional[str] = None
     resolution_date: Optional[datetime] = None
     created_at: datetime
     status: str
@@ -76,6 +78,7 @@ class FeedResponse(BaseModel):
     total: int
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
 
 
 class HealthResponse(BaseModel):
@@ -4,6 +4,8 @@ from datetime import datetime, timezone
 from typing import Optional
 import math
 
+import numpy as np
+
 
 def calculate_interesting_score(
     delta: float,
@@ -60,6 +62,40 @@ def calculate_interesting_score(
     return round(normalized, 2)
 
 
+def interesting_scores(
+    delta: np.ndarray,
+    volume_rank: np.ndarray,
+    resolution_ts: np.ndarray,
+    current_price: np.ndarray,
+    total_markets: int = 100,
+    now: Optional[datetime] = None,
+) -> np.ndarray:
+    """
+    Batch form of ``calculate_interesting_score`` over column arrays.
+
+    ``resolution_ts`` holds resolution dates as POSIX seconds, NaN where a
+    market has none. Every market is scored against the same ``now``.
+    """
+    now_ts = (now or datetime.now(timezone.utc)).timestamp()
+    delta = np.asarray(delta, dtype=np.float64)
+    volume_rank = np.asarray(volume_rank, dtype=np.float64)
+    resolution_ts = np.asarray(resolution_ts, dtype=np.float64)
+    current_price = np.asarray(current_price, dtype=np.float64)
+
+    delta_score = np.minimum(np.abs(delta) / 0.30, 1.0)
+    volume_score = np.maximum(0.0, 1.0 - volume_rank / max(total_markets, 1))
+
+    days_until = np.maximum((resolution_ts - now_ts) / 86400, 0)
+    with np.errstate(divide="ignore"):
+        urgency_score = np.where(days_until > 0, np.minimum(1.0 / days_until, 1.0), 1.0)
+    urgency_score[np.isnan(resolution_ts)] = 0.0
+
+    uncertainty_score = 1.0 - np.abs(current_price - 0.5) * 2
+
+    score = delta_score * 2.0 + volume_score * 1.0 + urgency_score * 1.0 + uncertainty_score * 0.5
+    return np.round(score / 4.5 * 100, 2)
+
+
 def calculate_featured_score(volume: float, last_updated: datetime) -> float:
     """
     Score for determining featured markets per category.
@@ -0,0 +1,81 @@
+"""Micro-benchmark for story-cluster key extraction and feed grouping.
+
+Run from backend/:
+
+    python -m benchmarks.cluster_keys [--titles 10000] [--repeat 5]
+
+Extracts cluster keys from synthetic market questions (a mix of price
+threshold questions and plain ones), uncached and through the memo, then
+groups the same number of feed rows by their stored cluster.
+"""
+
+import argparse
+import random
+import time
+
+from app.clustering import cluster_key, cluster_markets
+
+SUBJECTS = ["Bitcoin", "Ethereum", "Solana", "XRP", "Dogecoin", "Nvidia", "Tesla", "Gold"]
+MONTHS = ["January", "February", "March", "April", "May", "June"]
+
+
+def make_titles(count: int) -> list[str]:
+    rnd = random.Random(42)
+    titles = []
+    for i in range(count):
+        subject = rnd.choice(SUBJECTS)
+        kind = i % 4
+        if kind == 0:
+            titles.append(
+                f"Will the price of {subject} be above ${rnd.randint(1, 200) * 500:,} "
+                f"on {rnd.choice(MONTHS)} {rnd.randint(1, 28)}?"
+            )
+        elif kind == 1:
+            titles.append(f"Will {subject} exceed ${rnd.randint(1, 90) * 1000:,} by end of year?")
+        else:
+            titles.append(f"Will candidate {i} win the election in district {i % 97}?")
+    return titles
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(count: int, repeat: int):
+    titles = make_titles(count)
+
+    uncached = _best(lambda: [cluster_key.__wrapped__(t) for t in titles], repeat)
+    cluster_key.cache_clear()
+    cold = _best(lambda: [cluster_key(t) for t in titles], 1)
+    warm = _best(lambda: [cluster_key(t) for t in titles], repeat)
+
+    rows = []
+    for i, title in enumerate(titles):
+        parsed = cluster_key(title)
+        rows.append({
+            "id": str(i),
+            "headline": title,
+            "_cluster": (hash(parsed[0]) % 1000, "Outlook", parsed[1], "threshold") if parsed else None,
+        })
+    grouping = _best(lambda: cluster_markets(rows), repeat)
+
+    for label, elapsed in (
+        ("extract (uncached)", uncached),
+        ("extract (cold memo)", cold),
+        ("extract (warm memo)", warm),
+        ("feed grouping", grouping),
+    ):
+        print(f"{label:22s} {count} titles in {elapsed * 1000:7.2f} ms, {elapsed / count * 1e6:6.2f} us/title")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--titles", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.titles, args.repeat)
@@ -0,0 +1,74 @@
+"""Micro-benchmark for the editorial hero/section/ticker/movers selection.
+
+Run from backend/:
+
+    python -m benchmarks.feed_selection [--markets 20000] [--repeat 5]
+
+Runs the selectors the way ``assemble_editorial_feed`` does, once with a
+shared ``FeedRanking`` and once letting each selector rank on its own.
+"""
+
+import argparse
+import random
+import time
+
+from app.editorial import (
+    FeedRanking,
+    assign_sections,
+    select_hero_markets,
+    select_movers,
+    select_ticker,
+)
+
+CATEGORIES = ["politics", "crypto", "sports", "tech", "other"]
+WORDS = ["war", "election", "nvidia", "bitcoin", "final", "rate", "cup", "launch"]
+
+
+def make_markets(count: int) -> list[dict]:
+    rnd = random.Random(42)
+    return [
+        {
+            "id": str(i),
+            "question": f"Will the {rnd.choice(WORDS)} {rnd.choice(WORDS)} happen?",
+            "category": rnd.choice(CATEGORIES),
+            "change_pct": round(abs(rnd.gauss(0, 6)), 1),
+            "volume": 10 ** rnd.uniform(0, 8),
+            "probability": rnd.randint(0, 100),
+            "cluster_id": None,
+        }
+        for i in range(count)
+    ]
+
+
+def _select(markets: list[dict], ranking):
+    primary, secondary = select_hero_markets(markets, ranking)
+    hero_ids = {m["id"] for m in [primary, *secondary] if m}
+    assign_sections(markets, hero_ids, ranking)
+    select_ticker(markets, ranking=ranking)
+    select_movers(markets, ranking=ranking)
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(count: int, repeat: int):
+    markets = make_markets(count)
+    for label, elapsed in (
+        ("shared ranking", _best(lambda: _select(markets, FeedRanking(markets)), repeat)),
+        ("per-selector ranking", _best(lambda: _select(markets, None), repeat)),
+    ):
+        print(f"{label:22s} {count} markets in {elapsed * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--markets", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.markets, args.repeat)
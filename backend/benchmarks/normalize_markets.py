@@ -0,0 +1,76 @@
+"""Micro-benchmark for ingestion-side market normalization.
+
+Run from backend/:
+
+    python -m benchmarks.normalize_markets [--markets 5000] [--cycles 5]
+
+Decodes a synthetic Gamma page body with orjson and normalizes every market,
+reporting the per-market cost of the first cycle (cold memo caches) and of
+later cycles, where timestamps, outcomes and categories repeat.
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import orjson
+
+from app.ingestion.normalize import _map_category, _parse_outcomes, normalize_market, parse_timestamp
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def make_page(count: int, cycle: int) -> bytes:
+    """Build a Gamma-shaped /markets response body; prices move every cycle."""
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    markets = []
+    for i in range(count):
+        rnd = random.Random(i * 7919 + cycle)
+        price = round(rnd.random(), 3)
+        markets.append({
+            "id": str(500000 + i),
+            "question": f"Will candidate {i} win the election in district {i % 17}?",
+            "description": "Resolves according to the official certified result. " * 8,
+            "category": ["Politics", "Crypto", "Sports", "Tech", "Pop Culture"][i % 5],
+            "outcomePrices": orjson.dumps([str(price), str(round(1 - price, 3))]).decode(),
+            "outcomes": '["Yes", "No"]',
+            "volume": f"{1_000_000 - i * 37.5:.4f}",
+            "liquidity": f"{5000 + rnd.random() * 1000:.4f}",
+            "endDate": _iso(base + timedelta(days=i % 90)),
+            "closedTime": None,
+            "createdAt": _iso(base - timedelta(days=30, minutes=i)),
+            "updatedAt": _iso(base + timedelta(minutes=cycle * 2)),
+            "active": True,
+            "closed": False,
+            "image": f"https://example.com/{i}.png",
+            "slug": f"market-{i}",
+        })
+    return orjson.dumps(markets)
+
+
+def run(markets: int, cycles: int):
+    for cache in (parse_timestamp, _parse_outcomes, _map_category):
+        cache.cache_clear()
+
+    pages = [make_page(markets, cycle) for cycle in range(cycles)]
+    for cycle, body in enumerate(pages):
+        start = time.perf_counter()
+        records = [normalize_market(raw) for raw in orjson.loads(body) if raw.get("question")]
+        elapsed = time.perf_counter() - start
+        label = "cold" if cycle == 0 else "warm"
+        print(
+            f"cycle {cycle} ({label}): {len(records)} markets in {elapsed * 1000:.1f} ms, "
+            f"{elapsed / len(records) * 1e6:.2f} us/market"
+        )
+    print(f"timestamp cache: {parse_timestamp.cache_info()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--markets", type=int, default=5000)
+    parser.add_argument("--cycles", type=int, default=5)
+    args = parser.parse_args()
+    run(args.markets, args.cycles)
@@ -0,0 +1,75 @@
+"""Micro-benchmark for per-market versus batch feed scoring.
+
+Run from backend/:
+
+    python -m benchmarks.scoring [--markets 20000] [--repeat 5]
+
+Scores synthetic markets with the scalar ``compute_newsworthiness`` /
+``calculate_interesting_score`` loops and with their NumPy batch forms.
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.editorial import compute_newsworthiness, newsworthiness_scores
+from app.scoring import calculate_interesting_score, interesting_scores
+
+
+def make_columns(count: int) -> dict:
+    rnd = random.Random(42)
+    now = datetime.now(timezone.utc)
+    dates = [
+        now + timedelta(days=rnd.uniform(-5, 365)) if rnd.random() < 0.9 else None
+        for _ in range(count)
+    ]
+    return {
+        "change_pct": [rnd.uniform(-40, 40) for _ in range(count)],
+        "volume": [10 ** rnd.uniform(0, 8) for _ in range(count)],
+        "volume_rank": list(range(1, count + 1)),
+        "resolution_date": dates,
+        "resolution_ts": [d.timestamp() if d else np.nan for d in dates],
+        "price": [rnd.random() for _ in range(count)],
+    }
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(count: int, repeat: int):
+    c = make_columns(count)
+
+    timings = (
+        ("newsworthiness (loop)", _best(lambda: [
+            compute_newsworthiness(ch, v) for ch, v in zip(c["change_pct"], c["volume"])
+        ], repeat)),
+        ("newsworthiness (batch)", _best(lambda: newsworthiness_scores(c["change_pct"], c["volume"]), repeat)),
+        ("interesting (loop)", _best(lambda: [
+            calculate_interesting_score(ch / 100, v, r, d, p, count)
+            for ch, v, r, d, p in zip(
+                c["change_pct"], c["volume"], c["volume_rank"], c["resolution_date"], c["price"]
+            )
+        ], repeat)),
+        ("interesting (batch)", _best(lambda: interesting_scores(
+            np.divide(c["change_pct"], 100), c["volume_rank"], c["resolution_ts"], c["price"], count
+        ), repeat)),
+    )
+    for label, elapsed in timings:
+        print(f"{label:24s} {count} markets in {elapsed * 1000:7.2f} ms, {elapsed / count * 1e6:6.3f} us/market")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--markets", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.markets, args.repeat)
@@ -30,11 +30,98 @@ CREATE TABLE IF NOT EXISTS snapshots (
     volume DECIMAL(20,2) NOT NULL DEFAULT 0,
     open_interest DECIMAL(20,2) NOT NULL DEFAULT 0,
     PRIMARY KEY (market_id, timestamp)
-);
+) PARTITION BY RANGE (timestamp);
 
 CREATE INDEX idx_snapshots_timestamp ON snapshots(timestamp DESC);
 CREATE INDEX idx_snapshots_market_time ON snapshots(market_id, timestamp DESC);
 
+-- One partition per UTC day (snapshots_pYYYYMMDD). Ingestion keeps creating
+-- partitions ahead of time; these cover the first week after setup.
+DO $$
+DECLARE
+    day DATE;
+BEGIN
+    FOR day IN
+        SELECT generate_series((NOW() AT TIME ZONE 'UTC')::date - 1, (NOW() AT TIME ZONE 'UTC')::date + 7, INTERVAL '1 day')::date
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF snapshots FOR VALUES FROM (%L) TO (%L)',
+            'snapshots_p' || to_char(day, 'YYYYMMDD'),
+            day::timestamp AT TIME ZONE 'UTC',
+            (day + 1)::timestamp AT TIME ZONE 'UTC'
+        );
+    END LOOP;
+END $$;
+
+-- Current values per market, upserted alongside each snapshot insert so
+-- read paths never have to scan snapshot history for the latest row.
+CREATE TABLE IF NOT EXISTS market_latest (
+    market_id TEXT PRIMARY KEY REFERENCES markets(id) ON DELETE CASCADE,
+    yes_price DECIMAL(5,4) NOT NULL,
+    no_price DECIMAL(5,4) NOT NULL,
+    volume DECIMAL(20,2) NOT NULL DEFAULT 0,
+    open_interest DECIMAL(20,2) NOT NULL DEFAULT 0,
+    timestamp TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX idx_market_latest_volume ON market_latest(volume DESC);
+CREATE INDEX idx_market_latest_timestamp ON market_latest(timestamp DESC);
+
+-- Per-market price at fixed lookbacks, advanced incrementally at ingest time
+-- from the snapshots that crossed each cutoff since the previous run.
+CREATE TABLE IF NOT EXISTS market_baselines (
+    market_id TEXT PRIMARY KEY REFERENCES markets(id) ON DELETE CASCADE,
+    price_24h_ago DECIMAL(5,4),
+    price_7d_ago DECIMAL(5,4),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS baseline_watermarks (
+    lookback TEXT PRIMARY KEY,
+    cutoff TIMESTAMPTZ NOT NULL
+);
+
+-- Rollup tiers: hourly OHLC from raw snapshots, daily OHLC from hourly.
+-- Raw snapshots past SNAPSHOT_RETENTION_DAYS are dropped once rolled up.
+CREATE TABLE IF NOT EXISTS snapshot_rollups_hourly (
+    market_id TEXT NOT NULL REFERENCES markets(id) ON DELETE CASCADE,
+    bucket TIMESTAMPTZ NOT NULL,
+    open_price DECIMAL(5,4) NOT NULL,
+    high_price DECIMAL(5,4) NOT NULL,
+    low_price DECIMAL(5,4) NOT NULL,
+    close_price DECIMAL(5,4) NOT NULL,
+    volume DECIMAL(20,2) NOT NULL DEFAULT 0,
+    open_interest DECIMAL(20,2) NOT NULL DEFAULT 0,
+    samples INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (market_id, bucket)
+);
+
+CREATE INDEX IF NOT EXISTS idx_snapshot_rollups_hourly_bucket ON snapshot_rollups_hourly(bucket DESC);
+
+CREATE TABLE IF NOT EXISTS snapshot_rollups_daily (
+    market_id TEXT NOT NULL REFERENCES markets(id) ON DELETE CASCADE,
+    bucket TIMESTAMPTZ NOT NULL,
+    open_price DECIMAL(5,4) NOT NULL,
+    high_price DECIMAL(5,4) NOT NULL,
+    low_price DECIMAL(5,4) NOT NULL,
+    close_price DECIMAL(5,4) NOT NULL,
+    volume DECIMAL(20,2) NOT NULL DEFAULT 0,
+    open_interest DECIMAL(20,2) NOT NULL DEFAULT 0,
+    samples INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (market_id, bucket)
+);
+
+CREATE INDEX IF NOT EXISTS idx_snapshot_rollups_daily_bucket ON snapshot_rollups_daily(bucket DESC);
+
+-- Progress of historical backfills (python -m app.ingestion.backfill).
+CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+    name TEXT PRIMARY KEY,
+    position BIGINT NOT NULL DEFAULT 0,
+    rows_loaded BIGINT NOT NULL DEFAULT 0,
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
 CREATE TABLE IF NOT EXISTS ingestion_errors (
     id SERIAL PRIMARY KEY,
     market_id TEXT,
@@ -52,10 +139,13 @@ CREATE TABLE IF NOT EXISTS market_clusters (
     id SERIAL PRIMARY KEY,
     title TEXT NOT NULL,
     cluster_type VARCHAR(50) DEFAULT 'threshold',
+    cluster_key TEXT,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMPTZ
 );
 
+CREATE UNIQUE INDEX IF NOT EXISTS idx_market_clusters_key ON market_clusters(cluster_key);
+
 CREATE TABLE IF NOT EXISTS cluster_markets (
     cluster_id INTEGER NOT NULL REFERENCES market_clusters(id) ON DELETE CASCADE,
     market_id TEXT NOT NULL REFERENCES markets(id) ON DELETE CASCADE,
@@ -65,6 +155,18 @@ CREATE TABLE IF NOT EXISTS cluster_markets (
 
 CREATE INDEX IF NOT EXISTS idx_cluster_markets_market ON cluster_markets(market_id);
 
+-- Cluster key parsed from each market's question at ingest time; only
+-- rows whose question changed are re-parsed.
+CREATE TABLE IF NOT EXISTS market_cluster_keys (
+    market_id TEXT PRIMARY KEY REFERENCES markets(id) ON DELETE CASCADE,
+    question TEXT NOT NULL,
+    cluster_key TEXT,
+    sort_value DOUBLE PRECISION,
+    subject TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_market_cluster_keys_key ON market_cluster_keys(cluster_key);
+
 -- ── Market Context (for Polymarket AI summaries) ──
 
 CREATE TABLE IF NOT EXISTS market_contexts (
@@ -84,44 +186,40 @@ CREATE TABLE IF NOT EXISTS market_contexts (
 
 CREATE INDEX IF NOT EXISTS idx_market_contexts_market ON market_contexts(market_id);
 
--- Materialized view for trending markets (24h price movement)
+-- Materialized view ranking every market for the feed endpoints
+-- (refreshed concurrently after each ingestion run)
 CREATE MATERIALIZED VIEW IF NOT EXISTS trending_view AS
-WITH latest AS (
-    SELECT DISTINCT ON (market_id)
-        market_id,
-        yes_price AS current_price,
-        timestamp AS current_timestamp
-    FROM snapshots
-    ORDER BY market_id, timestamp DESC
-),
-day_ago AS (
-    SELECT DISTINCT ON (market_id)
-        market_id,
-        yes_price AS price_24h_ago
-    FROM snapshots
-    WHERE timestamp <= NOW() - INTERVAL '24 hours'
-    ORDER BY market_id, timestamp DESC
-),
-vol_rank AS (
+WITH vol_rank AS (
+    -- Volume is cumulative and snapshots are only written on change,
+    -- so rank by the newest 24h volume rather than a sum over rows.
     SELECT
         market_id,
-        SUM(volume) AS total_volume,
-        RANK() OVER (ORDER BY SUM(volume) DESC) AS volume_rank
+        RANK() OVER (ORDER BY MAX(volume) DESC) AS volume_rank
     FROM snapshots
     WHERE timestamp >= NOW() - INTERVAL '24 hours'
     GROUP BY market_id
 )
 SELECT
-    l.market_id,
-    l.current_price,
-    COALESCE(d.price_24h_ago, l.current_price) AS price_24h_ago,
-    ABS(l.current_price - COALESCE(d.price_24h_ago, l.current_price)) AS delta,
+    m.id AS market_id,
+    m.category,
+    m.status,
+    m.resolution_date,
+    COALESCE(m.closed_time, m.last_updated) AS activity_at,
+    COALESCE(l.yes_price, 0.5) AS current_price,
+    b.price_24h_ago,
+    ABS(COALESCE(l.yes_price, 0.5) - COALESCE(b.price_24h_ago, l.yes_price, 0.5)) AS delta,
+    COALESCE(l.volume, 0) AS volume,
     COALESCE(v.volume_rank, 9999) AS volume_rank
-FROM latest l
-LEFT JOIN day_ago d ON l.market_id = d.market_id
-LEFT JOIN vol_rank v ON l.market_id = v.market_id;
+FROM markets m
+LEFT JOIN market_latest l ON m.id = l.market_id
+LEFT JOIN market_baselines b ON m.id = b.market_id
+LEFT JOIN vol_rank v ON m.id = v.market_id;
 
 CREATE UNIQUE INDEX IF NOT EXISTS idx_trending_market ON trending_view(market_id);
+CREATE INDEX IF NOT EXISTS idx_trending_status_volume ON trending_view(status, volume DESC, delta DESC, market_id DESC);
+CREATE INDEX IF NOT EXISTS idx_trending_status_delta ON trending_view(status, delta DESC, volume DESC, market_id DESC);
+CREATE INDEX IF NOT EXISTS idx_trending_status_activity ON trending_view(status, activity_at DESC, market_id DESC);
+CREATE INDEX IF NOT EXISTS idx_trending_category ON trending_view(category, status);
 
 -- Function to refresh materialized view concurrently
 CREATE OR REPLACE FUNCTION refresh_trending_view()
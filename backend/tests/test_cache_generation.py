@@ -0,0 +1,26 @@
+import fakeredis
+
+from app.cache import GENERATION_KEY, advance_generation, reserve_generation
+
+
+def test_reserved_generations_are_unique_and_newer():
+    rds = fakeredis.FakeRedis()
+    rds.set(GENERATION_KEY, 7)
+    first, second = reserve_generation(rds), reserve_generation(rds)
+    assert (first, second) == (8, 9)
+    # Nothing is switched to until a reservation is advanced
+    assert int(rds.get(GENERATION_KEY)) == 7
+
+
+def test_slower_run_never_moves_generation_backwards():
+    rds = fakeredis.FakeRedis()
+    slow, fast = reserve_generation(rds), reserve_generation(rds)
+
+    assert advance_generation(rds, fast, {"feed:g2": b"new"}, ttl=60) == fast
+    assert advance_generation(rds, slow, {"feed:g1": b"old"}, ttl=60) == fast
+    assert int(rds.get(GENERATION_KEY)) == fast
+    assert rds.get("feed:g2") == b"new"
+    assert 0 < rds.ttl("feed:g2") <= 60
+
+    # A plain bump after both still moves forward
+    assert advance_generation(rds, reserve_generation(rds)) == fast + 1
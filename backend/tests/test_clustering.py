@@ -0,0 +1,88 @@
+import zlib
+
+import numpy as np
+
+from app.clustering import (
+    RELATED_MAX_BUCKET,
+    RELATED_MAX_CLUSTER,
+    RELATED_NUM_PERM,
+    cluster_markets,
+    lsh_candidate_pairs,
+    minhash_signatures,
+    related_groups,
+)
+import app.clustering as clustering
+
+
+def _direct_signature(tokens: set[str], seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**63, size=RELATED_NUM_PERM, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63, size=RELATED_NUM_PERM, dtype=np.uint64)
+    hashes = np.array([zlib.crc32(t.encode()) for t in tokens], dtype=np.uint64)
+    return ((hashes[:, None] * a + b) >> np.uint64(32)).astype(np.uint32).min(axis=0)
+
+
+def test_minhash_signatures_match_direct_computation(monkeypatch):
+    token_sets = [{"fed", "cut", "rates"}, set(), {"bitcoin"}, {"fed", "rates", "cut"}, {"nba", "finals"}]
+    # Tiny chunks so documents are spread over several reduceat passes
+    monkeypatch.setattr(clustering, "RELATED_CHUNK_TOKENS", 3)
+    signatures = minhash_signatures(token_sets)
+
+    assert signatures.shape == (5, RELATED_NUM_PERM)
+    assert (signatures[1] == np.iinfo(np.uint32).max).all()
+    for i in (0, 2, 4):
+        np.testing.assert_array_equal(signatures[i], _direct_signature(token_sets[i]))
+    np.testing.assert_array_equal(signatures[0], signatures[3])
+
+
+def test_lsh_candidate_pairs():
+    rng = np.random.default_rng(0)
+    signatures = rng.integers(0, 2**32, size=(6, RELATED_NUM_PERM), dtype=np.uint32)
+    signatures[4] = signatures[1]
+    signatures[5, :4] = signatures[0, :4]  # one shared band
+
+    assert lsh_candidate_pairs(signatures).tolist() == [[0, 5], [1, 4]]
+
+    # Buckets past RELATED_MAX_BUCKET are treated as noise
+    crowded = np.zeros((RELATED_MAX_BUCKET + 1, RELATED_NUM_PERM), dtype=np.uint32)
+    assert lsh_candidate_pairs(crowded).shape == (0, 2)
+
+
+def test_related_groups_small_candidate_set():
+    documents = [
+        ("Will the Celtics win the 2026 NBA Finals?", None),
+        ("Will the Lakers win the 2026 NBA Finals?", None),
+        ("Will the Knicks win the 2026 NBA Finals?", None),
+        ("Will it rain in London tomorrow?", None),
+    ]
+    assert related_groups(documents) == [[0, 1, 2]]
+
+
+def test_related_groups_caps_chained_clusters():
+    # Each document overlaps its neighbours heavily but not distant ones
+    documents = [(" ".join(f"tok{k + i}" for i in range(8)), None) for k in range(80)]
+    groups = related_groups(documents)
+
+    assert groups
+    assert max(len(group) for group in groups) <= RELATED_MAX_CLUSTER
+
+
+def test_cluster_markets_keeps_related_headlines_in_volume_order():
+    markets = [
+        {"id": "a", "headline": "Fed cuts in March", "_cluster": (7, "Fed cuts", 2.0, "related")},
+        {"id": "b", "headline": "Fed cuts in January", "_cluster": (7, "Fed cuts", 1.0, "related")},
+        {"id": "e", "headline": "Fed cuts in May", "_cluster": (7, "Fed cuts", 3.0, "related")},
+        {"id": "c", "headline": "BTC 100k", "_cluster": (3, "Bitcoin", 100000.0, "threshold")},
+        {"id": "d", "headline": "BTC 90k", "_cluster": (3, "Bitcoin", 90000.0, "threshold")},
+        {"id": "f", "headline": "BTC 80k", "_cluster": (3, "Bitcoin", 80000.0, "threshold")},
+    ]
+    clusters = {c["id"]: c for c in cluster_markets(markets)}
+
+    assert clusters[7]["tag"] == "RELATED"
+    assert [m["headline"] for m in clusters[7]["markets"]] == [
+        "Fed cuts in January",
+        "Fed cuts in March",
+        "Fed cuts in May",
+    ]
+    assert clusters[3]["tag"] == "STORY"
+    assert [m["headline"] for m in clusters[3]["markets"]] == ["Above $80,000", "Above $90,000", "Above $100,000"]
@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta, timezone
+
+import fakeredis
+
+from app.ingestion import fingerprints as fp
+from app.ingestion.fingerprints import FINGERPRINTS_KEY, SnapshotFingerprints
+
+
+def test_prune_drops_only_entries_older_than_the_heartbeat(monkeypatch):
+    rds = fakeredis.FakeRedis(decode_responses=True)
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    fresh = (now - timedelta(minutes=5)).timestamp()
+    stale = (now - timedelta(hours=2)).timestamp()
+    rds.hset(FINGERPRINTS_KEY, mapping={
+        **{f"old{i}": f"0.5000:0.5000:1.00:0.00|{stale}" for i in range(5)},
+        "live": f"0.5000:0.5000:1.00:0.00|{fresh}",
+        "garbled": "not-a-fingerprint",
+    })
+    # Small batches so deletes happen mid-scan as well as at the end
+    monkeypatch.setattr(fp, "PRUNE_BATCH_SIZE", 2)
+
+    removed = SnapshotFingerprints(rds, heartbeat_seconds=3600).prune(now)
+
+    assert removed == 6
+    assert rds.hkeys(FINGERPRINTS_KEY) == ["live"]
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+from app.ingestion.polymarket import PolymarketClient, RateLimitError
+
+
+def _client(monkeypatch, batch, single):
+    client = PolymarketClient(max_workers=1)
+    monkeypatch.setattr(client, "fetch_markets_by_ids", batch)
+    monkeypatch.setattr(client, "_fetch_market_or_raise", single)
+    return client
+
+
+def test_rate_limited_batch_lookup_stops_without_raising(monkeypatch):
+    def batch(ids):
+        if "3" in ids:
+            raise RateLimitError("budget exhausted")
+        return [SimpleNamespace(id=i) for i in ids]
+
+    client = _client(monkeypatch, batch, lambda market_id: SimpleNamespace(id=market_id))
+    try:
+        results = list(client.iter_markets_by_ids(["1", "2", "3", "4"], batch_size=2))
+    finally:
+        client.close()
+
+    assert all(market is not None and error is None for _, market, error in results)
+    assert {market_id for market_id, _, _ in results} <= {"1", "2"}
+
+
+def test_rate_limited_single_lookup_stops_instead_of_recording_an_error(monkeypatch):
+    def single(market_id):
+        if market_id == "2":
+            raise RateLimitError("budget exhausted")
+        raise LookupError(f"Market {market_id} not found")
+
+    # The batch finds nothing, so every ID falls back to a direct lookup.
+    client = _client(monkeypatch, lambda ids: [], single)
+    try:
+        results = list(client.iter_markets_by_ids(["1", "2", "3"], batch_size=3))
+    finally:
+        client.close()
+
+    # Ordinary failures are reported per ID; the rate limit on "2" is not,
+    # it just ends the run.
+    assert "2" not in {market_id for market_id, _, _ in results}
+    assert all(error == f"Market {market_id} not found" for market_id, _, error in results)
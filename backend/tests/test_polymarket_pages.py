@@ -0,0 +1,32 @@
+import threading
+import time
+
+from app.ingestion.polymarket import PolymarketClient
+
+
+def test_active_pages_keep_a_bounded_window_in_flight(monkeypatch):
+    client = PolymarketClient(max_workers=3)
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0, "offsets": []}
+
+    def fetch_markets(limit, offset, **params):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            state["offsets"].append(offset)
+        time.sleep(0.01)
+        with lock:
+            state["active"] -= 1
+        # Five full pages, then the feed runs dry
+        return [offset] * limit if offset < 5 * limit else []
+
+    monkeypatch.setattr(client, "fetch_markets", fetch_markets)
+    try:
+        pages = list(client.iter_active_pages(batch_size=10, max_pages=100))
+    finally:
+        client.close()
+
+    assert [page[0] for page in pages] == [0, 10, 20, 30, 40]
+    assert state["peak"] <= 3
+    # Only the pages up to the first empty one plus the read-ahead window
+    assert len(state["offsets"]) <= 6 + 2
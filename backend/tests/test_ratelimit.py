@@ -0,0 +1,61 @@
+import time
+
+import fakeredis
+import pytest
+
+from app.ingestion.polymarket import RateLimitError
+from app.ingestion.ratelimit import DAILY_COUNTER_KEY, RateLimiter
+
+
+@pytest.fixture
+def rds():
+    return fakeredis.FakeRedis()
+
+
+def _limiter(rds, **kwargs):
+    # Large bucket so acquire() never sleeps on the per-minute budget
+    return RateLimiter(rds, rate_per_minute=600000, burst=100000, **kwargs)
+
+
+def test_daily_counter_ttl_is_not_refreshed(rds):
+    limiter = _limiter(rds, daily_limit=0, daily_ttl=3600)
+    limiter.acquire()
+    assert 3590 <= rds.ttl(DAILY_COUNTER_KEY) <= 3600
+
+    # Close to the end of the window, further requests must not extend it
+    rds.expire(DAILY_COUNTER_KEY, 5)
+    for _ in range(200):
+        limiter.acquire()
+    assert int(rds.get(DAILY_COUNTER_KEY)) == 201
+    assert rds.ttl(DAILY_COUNTER_KEY) <= 5
+
+
+def test_daily_counter_without_ttl_gets_one(rds):
+    rds.set(DAILY_COUNTER_KEY, 10)
+    _limiter(rds, daily_limit=0, daily_ttl=3600).acquire()
+    assert int(rds.get(DAILY_COUNTER_KEY)) == 11
+    assert rds.ttl(DAILY_COUNTER_KEY) > 0
+
+
+def test_daily_budget_resets_across_ttl_boundary(rds):
+    limiter = _limiter(rds, daily_limit=50, daily_ttl=1)
+    for _ in range(3):
+        for _ in range(50):
+            limiter.acquire()
+        with pytest.raises(RateLimitError):
+            limiter.acquire()
+        time.sleep(1.1)
+    limiter.acquire()
+    assert int(rds.get(DAILY_COUNTER_KEY)) == 1
+
+
+def test_capped_limiter_counts_against_both_budgets(rds):
+    from app.ingestion.ratelimit import CappedRateLimiter
+
+    cap = _limiter(rds, daily_limit=3, bucket_key="test:cap", daily_counter_key="test:cap:daily")
+    limiter = CappedRateLimiter(cap, _limiter(rds, daily_limit=0))
+    for _ in range(3):
+        limiter.acquire()
+    with pytest.raises(RateLimitError):
+        limiter.acquire()
+    assert int(rds.get(DAILY_COUNTER_KEY)) == 3
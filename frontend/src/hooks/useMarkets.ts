@@ -7,13 +7,10 @@ import type { FeedFilters } from "@/lib/types";
 export function useMarketFeed(filters: FeedFilters) {
   return useInfiniteQuery({
     queryKey: ["markets", filters.category, filters.sort, filters.status ?? "active"],
-    queryFn: ({ pageParam = 0 }) =>
-      fetchMarkets({ ...filters, offset: pageParam }),
-    initialPageParam: 0,
-    getNextPageParam: (lastPage) => {
-      const nextOffset = lastPage.offset + lastPage.limit;
-      return nextOffset < lastPage.total ? nextOffset : undefined;
-    },
+    queryFn: ({ pageParam }) =>
+      fetchMarkets({ ...filters, offset: 0, cursor: pageParam }),
+    initialPageParam: null as string | null,
+    getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined,
     staleTime: 90 * 1000,
     refetchInterval: 2 * 60 * 1000,
   });
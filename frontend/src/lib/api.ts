@@ -27,6 +27,7 @@ export async function fetchMarkets(filters: FeedFilters): Promise<FeedResponse>
   if (filters.status) params.set("status", filters.status);
   params.set("limit", String(filters.limit));
   params.set("offset", String(filters.offset));
+  if (filters.cursor) params.set("cursor", filters.cursor);
 
   return fetchJSON<FeedResponse>(`${API_BASE}/api/markets?${params}`);
 }
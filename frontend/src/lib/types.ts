@@ -25,9 +25,11 @@ export interface MarketDetail {
   category: string;
   current_price: number;
   price_24h_ago: number | null;
+  price_7d_ago: number | null;
   delta: number | null;
   volume: number;
   open_interest: number;
+  summary: string | null;
   resolution_date: string | null;
   created_at: string;
   status: string;
@@ -51,6 +53,7 @@ export interface FeedResponse {
   total: number;
   limit: number;
   offset: number;
+  next_cursor: string | null;
 }
 
 export interface HealthResponse {
@@ -72,4 +75,5 @@ export interface FeedFilters {
   status?: MarketStatusFilter;
   limit: number;
   offset: number;
+  cursor?: string | null;
 }